@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.core.settings.db import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# кроки backup API: між ними письменники отримують базу назад
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE_SECONDS = 0.002
+# запис іншим з'єднанням перезапускає копіювання; після стількох перезапусків копіюємо одним кроком
+BACKUP_MAX_RESTARTS = 3
+BACKUP_CHUNK_SIZE = 256 * 1024
+BACKUP_GZIP_LEVEL = 6
+# 0 - без обмеження швидкості
+BACKUP_MAX_BYTES_PER_SECOND = int(os.environ.get("BACKUP_MAX_BYTES_PER_SECOND", "0"))
+
+
+class SnapshotRestarted(Exception):
+    pass
+
+
+def database_path(url: str = DATABASE_URL) -> str:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        raise ValueError(f"Online snapshots need a file-backed SQLite database, got {parsed.render_as_string()}")
+    return parsed.database
+
+
+class Throttle:
+    def __init__(self, bytes_per_second: int):
+        self.bytes_per_second = bytes_per_second
+        self._started = time.monotonic()
+        self._sent = 0
+
+    def delay(self, size: int) -> float:
+        # скільки почекати, щоб середня швидкість не перевищила ліміт
+        self._sent += size
+        if self.bytes_per_second <= 0:
+            return 0.0
+        return max(0.0, self._sent / self.bytes_per_second - (time.monotonic() - self._started))
+
+
+def snapshot(
+        source: str,
+        destination: str,
+        pages: int = BACKUP_PAGES_PER_STEP,
+        pause: float = BACKUP_STEP_PAUSE_SECONDS,
+        max_restarts: int = BACKUP_MAX_RESTARTS,
+) -> int:
+    # результат - узгоджений стан на момент останнього кроку; повертає розмір копії в байтах
+    remaining_before = None
+    restarts = 0
+
+    def progress(_status, remaining, _total):
+        nonlocal remaining_before, restarts
+        if remaining_before is not None and remaining > remaining_before:
+            restarts += 1
+            if restarts > max_restarts:
+                raise SnapshotRestarted()
+        remaining_before = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    source_connection = sqlite3.connect(source, timeout=5)
+    try:
+        target_connection = sqlite3.connect(destination)
+        try:
+            try:
+                source_connection.backup(target_connection, pages=pages, progress=progress)
+            except SnapshotRestarted:
+                # у WAL читач не блокує письменників, тож один крок лише довше тримає знімок
+                logger.info("Snapshot restarted %d times under writes, copying in one step", restarts)
+                source_connection.backup(target_connection, pages=-1)
+            # копія самодостатня: без -wal поруч
+            target_connection.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target_connection.close()
+    finally:
+        source_connection.close()
+    return os.path.getsize(destination)
+
+
+def compressed_chunks(path: str, chunk_size: int = BACKUP_CHUNK_SIZE) -> Iterator[bytes]:
+    compressor = zlib.compressobj(BACKUP_GZIP_LEVEL, zlib.DEFLATED, 31)
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    yield compressor.flush()
+
+
+async def stream_snapshot(
+        url: str = DATABASE_URL, bytes_per_second: int = BACKUP_MAX_BYTES_PER_SECOND
+) -> AsyncIterator[bytes]:
+    source = database_path(url)
+    fd, temporary = tempfile.mkstemp(prefix="snapshot-", suffix=".db")
+    os.close(fd)
+    try:
+        size = await asyncio.to_thread(snapshot, source, temporary)
+        logger.info("Snapshot of %s taken, %d bytes", source, size)
+        throttle = Throttle(bytes_per_second)
+        chunks = compressed_chunks(temporary)
+        while True:
+            # стиснення і читання файлу - у потоці, щоб не займати цикл подій
+            data = await asyncio.to_thread(next, chunks, None)
+            if data is None:
+                break
+            if data:
+                yield data
+                delay = throttle.delay(len(data))
+                if delay:
+                    await asyncio.sleep(delay)
+    finally:
+        os.remove(temporary)
+
+
+def write_snapshot(
+        output: str, url: str = DATABASE_URL, bytes_per_second: int = BACKUP_MAX_BYTES_PER_SECOND
+) -> int:
+    source = database_path(url)
+    target = Path(output)
+    fd, temporary = tempfile.mkstemp(prefix="snapshot-", suffix=".db")
+    os.close(fd)
+    partial = target.with_name(target.name + ".partial")
+    written = 0
+    try:
+        snapshot(source, temporary)
+        throttle = Throttle(bytes_per_second)
+        with open(partial, "wb") as file:
+            for data in compressed_chunks(temporary):
+                file.write(data)
+                written += len(data)
+                delay = throttle.delay(len(data))
+                if delay:
+                    time.sleep(delay)
+        os.replace(partial, target)
+    finally:
+        os.remove(temporary)
+        if partial.exists():
+            partial.unlink()
+    return written
+
+
+def restore(archive: str, url: str = DATABASE_URL, force: bool = False) -> str:
+    target = Path(database_path(url))
+    if target.exists() and not force:
+        raise FileExistsError(f"{target} already exists, pass --force to replace it")
+    # розпаковуємо поруч із ціллю: os.replace атомарний лише в межах однієї файлової системи
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(prefix=target.name + ".", suffix=".restore", dir=target.parent)
+    try:
+        decompressor = zlib.decompressobj(31)
+        with open(archive, "rb") as source, os.fdopen(fd, "wb") as file:
+            while chunk := source.read(BACKUP_CHUNK_SIZE):
+                file.write(decompressor.decompress(chunk))
+            file.write(decompressor.flush())
+        connection = sqlite3.connect(temporary)
+        try:
+            result = connection.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            connection.close()
+        if result != "ok":
+            raise ValueError(f"Snapshot {archive} failed integrity check: {result}")
+        # журнал старої бази не повинен застосуватись до нової
+        for suffix in ("-wal", "-shm"):
+            Path(str(target) + suffix).unlink(missing_ok=True)
+        os.replace(temporary, target)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+    return str(target)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.backup", description="Online SQLite snapshots")
+    parser.add_argument("--database", default=DATABASE_URL, help="database URL (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot_parser = commands.add_parser("snapshot", help="write a gzip-compressed snapshot of the live database")
+    snapshot_parser.add_argument("output")
+    snapshot_parser.add_argument("--rate", type=int, default=BACKUP_MAX_BYTES_PER_SECOND, help="bytes per second, 0 - unlimited")
+    restore_parser = commands.add_parser("restore", help="replace the database file with a snapshot")
+    restore_parser.add_argument("archive")
+    restore_parser.add_argument("--force", action="store_true", help="overwrite an existing database")
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot":
+        written = write_snapshot(args.output, args.database, args.rate)
+        print(f"Snapshot written to {args.output}, {written} bytes")
+    else:
+        target = restore(args.archive, args.database, args.force)
+        print(f"Database {target} restored from {args.archive}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
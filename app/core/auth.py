@@ -1,19 +1,27 @@
+import hashlib
+import os
+import secrets
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.models.user import UserModel
+from app.core.queries import USER_BY_USERNAME
+from app.core.revocation import revoked_tokens
 from app.core.settings.db import db
 
 
 SECRET_KEY = "key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+# через кому: користувачі з доступом до /admin
+ADMIN_USERNAMES = frozenset(name.strip() for name in os.environ.get("ADMIN_USERNAMES", "").split(",") if name.strip())
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -25,15 +33,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
 
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def access_token_required(
-        token: str = Depends(oauth2_scheme),
-        session: AsyncSession = Depends(db.get_session)
-):
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_refresh_token() -> Tuple[str, str, datetime]:
+    token = secrets.token_urlsafe(32)
+    # naive UTC, як і решта DateTime колонок у моделях
+    expires_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    return token, hash_refresh_token(token), expires_at
+
+
+def decode_access_token(token: str) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -42,17 +58,40 @@ async def access_token_required(
 
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    query = select(UserModel).where(UserModel.username == username)
-    result = await session.execute(query)
+    if payload.get("sub") is None or payload.get("jti") is None:
+        raise credentials_exception
+    # перевірка відкликання без I/O
+    if revoked_tokens.is_revoked(payload["jti"]):
+        raise credentials_exception
+
+    return payload
+
+
+async def access_token_required(
+        token: str = Depends(oauth2_scheme),
+        session: AsyncSession = Depends(db.get_session)
+):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    username: str = decode_access_token(token)["sub"]
+
+    result = await session.execute(USER_BY_USERNAME, {"username": username})
     user = result.scalars().first()
 
     if user is None:
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    return user
+
+
+async def admin_required(current_user: UserModel = Depends(access_token_required)):
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
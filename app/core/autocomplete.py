@@ -0,0 +1,224 @@
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.ingredient import IngredientModel
+from app.core.models.recipe import RecipeModel
+from app.core.models.recipe_ingredient import RecipeIngredientModel
+from app.core.models.saved_recipe import SavedRecipeModel
+
+AUTOCOMPLETE_MIN_SIMILARITY = 0.3
+# короткий префікс збігається з тисячами ключів: для нього тримаємо готовий топ за популярністю
+AUTOCOMPLETE_SHORT_PREFIX = 3
+AUTOCOMPLETE_PREFIX_TOP_K = 50
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    # як у pg_trgm: кожне слово доповнюється пробілами з обох боків
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    def __init__(self):
+        # відсортовані (хвіст назви з початку кожного слова, id) для пошуку префікса бісекцією
+        self._keys: List[Tuple[str, int]] = []
+        self._names: Dict[int, str] = {}
+        self._popularity: Dict[int, int] = {}
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._trigram_counts: Dict[int, int] = {}
+        # id з кожним коротким префіксом і ліниво побудований топ-K серед них
+        self._prefix_items: Dict[str, Set[int]] = {}
+        self._prefix_top: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def load(self, rows: Iterable[Tuple[int, str, int]]) -> None:
+        keys, names, popularity, postings, counts, prefix_items = [], {}, {}, {}, {}, {}
+        for item_id, name, item_popularity in rows:
+            names[item_id] = name
+            popularity[item_id] = item_popularity or 0
+            keys.extend((key, item_id) for key in self._word_keys(normalize(name)))
+            for prefix in self._short_prefixes(normalize(name)):
+                prefix_items.setdefault(prefix, set()).add(item_id)
+            grams = trigrams(normalize(name))
+            counts[item_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, set()).add(item_id)
+        keys.sort()
+        self._keys, self._names, self._popularity, self._trigrams, self._trigram_counts = (
+            keys, names, popularity, postings, counts
+        )
+        self._prefix_items, self._prefix_top = prefix_items, {}
+
+    def add(self, item_id: int, name: str) -> None:
+        popularity = self._popularity.get(item_id, 0)
+        self.remove(item_id)
+        self._names[item_id] = name
+        self._popularity[item_id] = popularity
+        for key in self._word_keys(normalize(name)):
+            insort(self._keys, (key, item_id))
+        for prefix in self._short_prefixes(normalize(name)):
+            self._prefix_items.setdefault(prefix, set()).add(item_id)
+            self._prefix_top.pop(prefix, None)
+        grams = trigrams(normalize(name))
+        self._trigram_counts[item_id] = len(grams)
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(item_id)
+
+    def remove(self, item_id: int) -> None:
+        name = self._names.pop(item_id, None)
+        self._popularity.pop(item_id, None)
+        self._trigram_counts.pop(item_id, None)
+        if name is None:
+            return
+        for key in self._word_keys(normalize(name)):
+            position = bisect_left(self._keys, (key, item_id))
+            if position < len(self._keys) and self._keys[position] == (key, item_id):
+                del self._keys[position]
+        for prefix in self._short_prefixes(normalize(name)):
+            items = self._prefix_items.get(prefix)
+            if items is not None:
+                items.discard(item_id)
+                if not items:
+                    del self._prefix_items[prefix]
+            if item_id in self._prefix_top.get(prefix, ()):
+                del self._prefix_top[prefix]
+        for gram in trigrams(normalize(name)):
+            postings = self._trigrams.get(gram)
+            if postings is not None:
+                postings.discard(item_id)
+                if not postings:
+                    del self._trigrams[gram]
+
+    def bump(self, item_id: int, delta: int = 1) -> None:
+        if item_id in self._popularity:
+            self._popularity[item_id] = max(0, self._popularity[item_id] + delta)
+            self._rerank(item_id)
+
+    def _rank(self, item_id: int) -> Tuple[int, int]:
+        return self._popularity[item_id], -item_id
+
+    def _top(self, prefix: str) -> List[int]:
+        top = self._prefix_top.get(prefix)
+        if top is None:
+            top = heapq.nlargest(AUTOCOMPLETE_PREFIX_TOP_K, self._prefix_items.get(prefix, ()), key=self._rank)
+            self._prefix_top[prefix] = top
+        return top
+
+    def _rerank(self, item_id: int) -> None:
+        # збереження змінюють популярність часто: оновлюємо готові топи на місці, без перебудови
+        rank = self._rank(item_id)
+        for prefix in self._short_prefixes(normalize(self._names[item_id])):
+            top = self._prefix_top.get(prefix)
+            if top is None:
+                continue
+            complete = len(top) == len(self._prefix_items[prefix])
+            if item_id in top:
+                top.remove(item_id)
+                if not complete and top and rank < self._rank(top[-1]):
+                    # за межею топу може бути кращий кандидат
+                    del self._prefix_top[prefix]
+                    continue
+            elif not top or rank <= self._rank(top[-1]):
+                continue
+            position = 0
+            while position < len(top) and self._rank(top[position]) > rank:
+                position += 1
+            top.insert(position, item_id)
+            del top[AUTOCOMPLETE_PREFIX_TOP_K:]
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        query = normalize(query)
+        if not query:
+            return []
+
+        if len(query) <= AUTOCOMPLETE_SHORT_PREFIX and limit <= AUTOCOMPLETE_PREFIX_TOP_K:
+            matches = self._prefix_items.get(query, set())
+            ranked = self._top(query)[:limit]
+        else:
+            # довший префікс відсікає більшість ключів, тож переглядаємо всі збіги
+            matches = set()
+            position = bisect_left(self._keys, (query,))
+            while position < len(self._keys) and self._keys[position][0].startswith(query):
+                matches.add(self._keys[position][1])
+                position += 1
+            ranked = heapq.nlargest(limit, matches, key=self._rank)
+
+        # для одного-двох символів триграми нічого не дають
+        if len(ranked) < limit and len(query) >= 3:
+            ranked.extend(self._fuzzy(query, limit - len(ranked), exclude=matches))
+
+        return [
+            {"id": item_id, "name": self._names[item_id], "popularity": self._popularity[item_id]}
+            for item_id in ranked
+        ]
+
+    def _fuzzy(self, query: str, limit: int, exclude: Set[int]) -> List[int]:
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._trigrams.get(gram, ()))
+
+        scored = []
+        for item_id, count in shared.items():
+            if item_id in exclude:
+                continue
+            similarity = count / (len(query_grams) + self._trigram_counts[item_id] - count)
+            if similarity >= AUTOCOMPLETE_MIN_SIMILARITY:
+                scored.append((similarity, self._popularity[item_id], -item_id))
+        return [-negated_id for _similarity, _popularity, negated_id in heapq.nlargest(limit, scored)]
+
+    @classmethod
+    def _short_prefixes(cls, name: str) -> Set[str]:
+        return {
+            key[:length]
+            for key in cls._word_keys(name)
+            for length in range(1, min(len(key), AUTOCOMPLETE_SHORT_PREFIX) + 1)
+        }
+
+    @staticmethod
+    def _word_keys(name: str) -> List[str]:
+        keys = [name]
+        for position, char in enumerate(name):
+            if char == " ":
+                keys.append(name[position + 1:])
+        return keys
+
+
+class Autocomplete:
+    def __init__(self):
+        self.recipes = NameIndex()
+        self.ingredients = NameIndex()
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        recipes = await session.execute(
+            select(RecipeModel.id, RecipeModel.name, func.count(SavedRecipeModel.id))
+            .outerjoin(SavedRecipeModel, SavedRecipeModel.recipe_id == RecipeModel.id)
+            .group_by(RecipeModel.id)
+        )
+        self.recipes.load(recipes.all())
+
+        ingredients = await session.execute(
+            select(IngredientModel.id, IngredientModel.name, func.count(RecipeIngredientModel.recipe_id))
+            .outerjoin(RecipeIngredientModel, RecipeIngredientModel.ingredient_id == IngredientModel.id)
+            .group_by(IngredientModel.id)
+        )
+        self.ingredients.load(ingredients.all())
+
+
+autocomplete = Autocomplete()
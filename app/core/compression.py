@@ -0,0 +1,245 @@
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# менші відповіді стискати невигідно: заголовки і CPU коштують більше за виграш
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+# GET-запити каталогу отримують ETag - хеш готового тіла: 304 економить трафік, але не роботу обробника
+ETAG_PREFIXES = ("/recipes/", "/ingredients/", "/categories/")
+COMPRESSION_CACHE_ENTRIES = 256
+COMPRESSIBLE_TYPES = {"application/json", "application/msgpack", "text/plain", "text/html", "text/csv"}
+
+
+def available_encodings() -> Tuple[str, ...]:
+    # у порядку переваги сервера
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return tuple(encodings)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        weights[coding.lower()] = quality
+    best, best_quality = None, 0.0
+    for coding in available_encodings():
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0: однакове тіло - однакові байти
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes, final: bool) -> bytes:
+        # кожен шматок скидаємо одразу: клієнт має отримати його, не чекаючи кінця потоку
+        if self.encoding == "zstd":
+            flush_mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            return self._compressor.compress(chunk) + self._compressor.flush(flush_mode)
+        if self.encoding == "br":
+            data = self._compressor.process(chunk)
+            return data + (self._compressor.finish() if final else self._compressor.flush())
+        data = self._compressor.compress(chunk)
+        return data + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # стиснений варіант має суфікс кодування, але описує те саме тіло
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        candidate = candidate.removeprefix("W/").strip('"')
+        if candidate == base or candidate.rsplit("-", 1)[0] == base:
+            return True
+    return False
+
+
+class CompressionCache:
+    # кеш стиснення, а не відповідей: ключ - ETag уже зібраного тіла, тож обробник і sha1 виконуються
+    # на кожен запит, а повтор пропускає лише повторне стиснення
+    def __init__(self, max_entries: int = COMPRESSION_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self.compressions = 0
+        self.hits = 0
+        self.not_modified = 0
+
+    def get(self, etag: str, encoding: str, body: bytes) -> bytes:
+        key = (etag, encoding)
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return compressed
+        compressed = self.compress(body, encoding)
+        self._entries[key] = compressed
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return compressed
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        self.compressions += 1
+        return compress(body, encoding)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "encodings": list(available_encodings()),
+            "compressions": self.compressions,
+            "cache_hits": self.hits,
+            "cached": len(self._entries),
+            "not_modified": self.not_modified,
+        }
+
+
+compression_cache = CompressionCache()
+
+
+def _header(headers: list, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers: list, *names: bytes) -> list:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+def _vary_on_encoding(headers: list) -> list:
+    # дописуємо до наявного Vary (наприклад, Accept від negotiation), а не додаємо другий заголовок
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower() or vary.strip() == b"*":
+        return headers
+    return _without(headers, b"vary") + [(b"vary", vary + b", Accept-Encoding")]
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_headers = dict(scope["headers"])
+        encoding = choose_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        tagged = scope["method"] == "GET" and scope["path"].startswith(ETAG_PREFIXES)
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+
+        start_message = None
+        stream: Optional[StreamCompressor] = None
+
+        async def compressing_send(message):
+            nonlocal start_message, stream
+            if message["type"] == "http.response.start":
+                # рішення приймаємо на першому шматку тіла, коли відомо, чи відповідь потокова
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+            if start_message is None:
+                if stream is not None:
+                    final = not message.get("more_body", False)
+                    message = {**message, "body": stream.compress(message.get("body", b""), final)}
+                return await send(message)
+
+            start, start_message = start_message, None
+            headers = list(start.get("headers", []))
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            content_type = (_header(headers, b"content-type") or b"").split(b";")[0].strip().decode("latin-1")
+            # Vary потрібен і без стиснення: інший клієнт отримав би інше представлення
+            negotiable = (
+                start["status"] != 204
+                and _header(headers, b"content-encoding") is None
+                and content_type in COMPRESSIBLE_TYPES
+            )
+            compressible = negotiable and encoding is not None and start["status"] != 304
+            if negotiable:
+                headers = _vary_on_encoding(headers)
+
+            if more_body:
+                if compressible:
+                    stream = StreamCompressor(encoding)
+                    headers = _without(headers, b"content-length") + [(b"content-encoding", encoding.encode())]
+                    body = stream.compress(body, False)
+                await send({**start, "headers": headers})
+                return await send({**message, "body": body})
+
+            etag = None
+            if tagged and start["status"] == 200:
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if if_none_match and etag_matches(if_none_match, etag):
+                    compression_cache.not_modified += 1
+                    headers = _without(headers, b"content-length", b"content-type") + [(b"etag", etag.encode())]
+                    await send({**start, "status": 304, "headers": headers})
+                    return await send({"type": "http.response.body", "body": b""})
+            if compressible and len(body) >= COMPRESSION_MIN_SIZE:
+                if etag is not None:
+                    body = compression_cache.get(etag, encoding, body)
+                    # інше кодування - інше представлення, тож і сильний ETag інший
+                    etag = f'{etag[:-1]}-{encoding}"'
+                else:
+                    body = compression_cache.compress(body, encoding)
+                headers = _without(headers, b"content-length") + [
+                    (b"content-encoding", encoding.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                ]
+            if etag is not None:
+                headers.append((b"etag", etag.encode()))
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, compressing_send)
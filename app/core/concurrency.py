@@ -0,0 +1,152 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Dict, List, Tuple
+
+from starlette.responses import JSONResponse
+
+CONCURRENCY_INITIAL_LIMIT = 20
+CONCURRENCY_MIN_LIMIT = 2
+CONCURRENCY_MAX_LIMIT = 200
+# відповідь повільніша за ціль - ознака черги за пулом з'єднань, ліміт зменшується
+CONCURRENCY_LATENCY_TARGET_MS = 250
+CONCURRENCY_BACKOFF = 0.9
+
+CRITICAL = 0
+NORMAL = 1
+LOW = 2
+PRIORITY_NAMES = {CRITICAL: "critical", NORMAL: "normal", LOW: "low"}
+# скільки запит може чекати на слот, перш ніж отримати 503
+QUEUE_TIMEOUT_MS = {CRITICAL: 2000, NORMAL: 500, LOW: 100}
+# перший збіг префікса шляху; решта - NORMAL
+ROUTE_PRIORITIES: List[Tuple[str, int]] = [
+    ("/health", CRITICAL),
+    ("/metrics", CRITICAL),
+    ("/auth", CRITICAL),
+    ("/sync", LOW),
+    ("/shopping_list", LOW),
+    ("/meal_plans", LOW),
+    ("/admin", LOW),
+]
+# довгі потоки SSE і повільна віддача знімка бази тримали б слот годинами
+LIMITER_EXEMPT = ("/live", "/admin/backup")
+
+
+def route_priority(path: str) -> int:
+    for prefix, priority in ROUTE_PRIORITIES:
+        if path.startswith(prefix):
+            return priority
+    return NORMAL
+
+
+class AdaptiveLimiter:
+    def __init__(
+            self,
+            initial_limit: int = CONCURRENCY_INITIAL_LIMIT,
+            min_limit: int = CONCURRENCY_MIN_LIMIT,
+            max_limit: int = CONCURRENCY_MAX_LIMIT,
+            latency_target_ms: float = CONCURRENCY_LATENCY_TARGET_MS,
+            queue_timeout_ms: Dict[int, int] = None,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target_ms / 1000
+        self.queue_timeout_ms = QUEUE_TIMEOUT_MS if queue_timeout_ms is None else queue_timeout_ms
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = {name: 0 for name in PRIORITY_NAMES.values()}
+        # у купі лишаються і скасовані очікувачі, тому живих рахуємо окремо
+        self.queued = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._last_decrease = 0.0
+
+    async def acquire(self, priority: int) -> bool:
+        if self.in_flight < int(self.limit) and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        self.queued += 1
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout_ms[priority] / 1000)
+        except asyncio.CancelledError:
+            # клієнт пішов, поки чекав: слот, якщо вже отриманий, віддаємо наступному
+            if future.done():
+                self.in_flight -= 1
+                self._admit_waiters()
+            else:
+                future.cancel()
+                self.queued -= 1
+            raise
+        if future.done():
+            # слот передав release, in_flight уже враховує цей запит
+            self.admitted += 1
+            return True
+        future.cancel()
+        self.queued -= 1
+        self.shed[PRIORITY_NAMES[priority]] += 1
+        return False
+
+    def release(self, latency: float) -> None:
+        self.in_flight -= 1
+        self._adjust(latency)
+        self._admit_waiters()
+
+    def _adjust(self, latency: float) -> None:
+        now = time.monotonic()
+        if latency > self.latency_target:
+            # зменшуємо не частіше ніж раз на цільову затримку: одна хвиля повільних відповідей - один крок
+            if now - self._last_decrease >= self.latency_target:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * CONCURRENCY_BACKOFF)
+        elif self.in_flight + 1 >= int(self.limit):
+            # ліміт росте лише тоді, коли його справді вибирають
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _admit_waiters(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            _priority, _order, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_flight += 1
+                self.queued -= 1
+                future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(LIMITER_EXEMPT):
+            return await self.app(scope, receive, send)
+        priority = route_priority(scope["path"])
+        if not await limiter.acquire(priority):
+            retry_after = max(1, math.ceil(limiter.queue_timeout_ms[priority] / 1000))
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is overloaded, retry later"},
+                headers={"Retry-After": str(retry_after)},
+            )
+            return await response(scope, receive, send)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
+
+
+limiter = AdaptiveLimiter()
@@ -0,0 +1,181 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.ingredient import IngredientModel
+from app.core.models.recipe import RecipeModel
+from app.core.models.recipe_ingredient import RecipeIngredientModel
+
+PAIRS_TOP_K = 20
+CATEGORY_TOP_PAIRS = 20
+# пара з одного рецепту дає випадковий lift, тож рахуємо лише повторювані
+PAIRS_MIN_SUPPORT = 2
+# поки перша модель будується, маршрути відповідають 503 з цим Retry-After
+PAIRS_RETRY_AFTER_SECONDS = 2
+
+# обидва списки впорядковані однаково: спершу lift, за рівного lift - більше спільних рецептів
+# (інгредієнт, спільних рецептів, lift, pmi)
+Pair = Tuple[int, int, float, float]
+# (перший, другий, спільних рецептів, lift, pmi)
+CategoryPair = Tuple[int, int, int, float, float]
+
+
+def pair_positions(recipe_index: np.ndarray, ingredient_index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # усі пари інгредієнтів у межах рецепту; рецепти однакового розміру розгортаються одним triu_indices
+    order = np.lexsort((ingredient_index, recipe_index))
+    recipes = recipe_index[order]
+    starts = np.flatnonzero(np.r_[True, recipes[1:] != recipes[:-1]])
+    sizes = np.diff(np.r_[starts, len(recipes)])
+    firsts, seconds = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for size in np.unique(sizes[sizes > 1]):
+        group_starts = starts[sizes == size][:, None]
+        first, second = np.triu_indices(size, 1)
+        firsts.append((group_starts + first).ravel())
+        seconds.append((group_starts + second).ravel())
+    return order[np.concatenate(firsts)], order[np.concatenate(seconds)]
+
+
+def score(together: np.ndarray, first_count: np.ndarray, second_count: np.ndarray, total: np.ndarray):
+    # lift = P(a, b) / (P(a) P(b)); pmi - його log2
+    lift = together * total / (first_count * second_count)
+    return lift, np.log2(lift)
+
+
+def top_per_group(groups: np.ndarray, limit: int) -> np.ndarray:
+    # groups уже впорядковані; лишаємо перші limit рядків кожної групи
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(groups)])
+    return np.arange(len(groups)) - np.repeat(starts, sizes) < limit
+
+
+@dataclass
+class IngredientPairs:
+    recipes: int
+    names: Dict[int, str]
+    pairs: Dict[int, List[Pair]]
+    category_pairs: Dict[int, List[CategoryPair]]
+
+    @classmethod
+    def build(
+            cls,
+            ingredients: Sequence[Tuple[int, str]],
+            links: Sequence[Tuple[int, int, int]],
+            top_k: int = PAIRS_TOP_K,
+            category_top: int = CATEGORY_TOP_PAIRS,
+            min_support: int = PAIRS_MIN_SUPPORT,
+    ) -> "IngredientPairs":
+        names = dict(ingredients)
+        if not links:
+            return cls(recipes=0, names=names, pairs={}, category_pairs={})
+        data = np.asarray(links, dtype=np.int64).reshape(-1, 3)
+        recipe_ids, recipe_index = np.unique(data[:, 0], return_inverse=True)
+        ingredient_ids, ingredient_index = np.unique(data[:, 2], return_inverse=True)
+        category_ids, category_index = np.unique(data[:, 1], return_inverse=True)
+        size = len(ingredient_ids)
+        first_link, second_link = pair_positions(recipe_index, ingredient_index)
+        first, second = ingredient_index[first_link], ingredient_index[second_link]
+
+        # розріджена матриця інгредієнт x інгредієнт: лише ненульові клітинки верхнього трикутника
+        keys, together = np.unique(first * size + second, return_counts=True)
+        first, second = keys // size, keys % size
+        keep = together >= min_support
+        first, second, together = first[keep], second[keep], together[keep]
+        recipes_with = np.bincount(ingredient_index, minlength=size)
+        lift, pmi = score(together, recipes_with[first], recipes_with[second], len(recipe_ids))
+
+        # матриця симетрична: кожна пара потрапляє до списків обох інгредієнтів
+        source = np.concatenate([first, second])
+        target = np.concatenate([second, first])
+        together, lift, pmi = np.tile(together, 2), np.tile(lift, 2), np.tile(pmi, 2)
+        order = np.lexsort((-together, -lift, source))
+        order = order[top_per_group(source[order], top_k)]
+        pairs: Dict[int, List[Pair]] = {}
+        for position in order.tolist():
+            pairs.setdefault(int(ingredient_ids[source[position]]), []).append((
+                int(ingredient_ids[target[position]]),
+                int(together[position]),
+                round(float(lift[position]), 4),
+                round(float(pmi[position]), 4),
+            ))
+
+        # у категорії ймовірності рахуються серед її рецептів
+        categories = category_index[first_link]
+        first, second = ingredient_index[first_link], ingredient_index[second_link]
+        keys, together = np.unique((categories * size + first) * size + second, return_counts=True)
+        categories, first, second = keys // (size * size), keys // size % size, keys % size
+        keep = together >= min_support
+        categories, first, second, together = categories[keep], first[keep], second[keep], together[keep]
+        category_links, recipes_with = np.unique(category_index * size + ingredient_index, return_counts=True)
+        category_recipes = np.bincount(
+            np.unique(category_index * len(recipe_ids) + recipe_index) // len(recipe_ids),
+            minlength=len(category_ids),
+        )
+        lift, pmi = score(
+            together,
+            recipes_with[np.searchsorted(category_links, categories * size + first)],
+            recipes_with[np.searchsorted(category_links, categories * size + second)],
+            category_recipes[categories],
+        )
+        order = np.lexsort((-together, -lift, categories))
+        order = order[top_per_group(categories[order], category_top)]
+        category_pairs: Dict[int, List[CategoryPair]] = {}
+        for position in order.tolist():
+            category_pairs.setdefault(int(category_ids[categories[position]]), []).append((
+                int(ingredient_ids[first[position]]),
+                int(ingredient_ids[second[position]]),
+                int(together[position]),
+                round(float(lift[position]), 4),
+                round(float(pmi[position]), 4),
+            ))
+
+        return cls(recipes=len(recipe_ids), names=names, pairs=pairs, category_pairs=category_pairs)
+
+
+class IngredientPairIndex:
+    def __init__(self):
+        self._pairs: Optional[IngredientPairs] = None
+        # як і в meal_plan_features: версія росте з кожною інвалідацією
+        self._version = 0
+        self._built_version = -1
+        # перебудова вже в черзі: запити далі отримують попередню модель
+        self.refreshing = False
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def stale(self) -> bool:
+        return self._built_version != self._version
+
+    def invalidate(self) -> None:
+        self._version += 1
+
+    def clear(self) -> None:
+        self._pairs = None
+        self._built_version = -1
+        self.refreshing = False
+
+    def replace(self, pairs: IngredientPairs, version: int) -> None:
+        self._pairs = pairs
+        self._built_version = version
+
+    @property
+    def current(self) -> Optional[IngredientPairs]:
+        # None, доки фонова задача не збудувала першу модель; застарілу вона ж і оновлює
+        return self._pairs
+
+    @staticmethod
+    async def load(session: AsyncSession) -> Tuple[list, list]:
+        ingredients = await session.execute(select(IngredientModel.id, IngredientModel.name))
+        links = await session.execute(
+            select(RecipeIngredientModel.recipe_id, RecipeModel.category_id, RecipeIngredientModel.ingredient_id)
+            .join(RecipeModel, RecipeModel.id == RecipeIngredientModel.recipe_id)
+        )
+        return [tuple(row) for row in ingredients.all()], [tuple(row) for row in links.all()]
+
+
+ingredient_pairs = IngredientPairIndex()
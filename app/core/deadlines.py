@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+REQUEST_DEADLINE_MS = 10000
+# перший збіг префікса шляху; решта - REQUEST_DEADLINE_MS
+ROUTE_DEADLINES_MS: List[Tuple[str, int]] = [
+    ("/health", 1000),
+    ("/auth", 5000),
+    ("/sync", 30000),
+    ("/meal_plans", 30000),
+]
+# довгі потоки (SSE, знімок бази) обмежені лише відключенням клієнта
+DEADLINE_EXEMPT = ("/live", "/admin/backup")
+
+
+class RequestDeadline:
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+        # SQLAlchemy Connection, на яких зараз виконується запит цього HTTP-запиту
+        self.connections: Set = set()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+current_deadline: ContextVar[Optional[RequestDeadline]] = ContextVar("current_deadline", default=None)
+
+
+def deadline_budget(scope: dict) -> float:
+    budget_ms = REQUEST_DEADLINE_MS
+    for prefix, route_ms in ROUTE_DEADLINES_MS:
+        if scope["path"].startswith(prefix):
+            budget_ms = route_ms
+            break
+    # клієнт може лише скоротити бюджет: решту свого дедлайну він передає в мілісекундах
+    for name, value in scope["headers"]:
+        if name == b"x-request-deadline":
+            try:
+                budget_ms = min(budget_ms, max(0, int(value)))
+            except ValueError:
+                pass
+            break
+    return budget_ms / 1000
+
+
+class DeadlineTracker:
+    def __init__(self):
+        self.engine: Optional[AsyncEngine] = None
+        self.expired = 0
+        self.disconnected = 0
+        self.interrupted = 0
+
+    def install(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def uninstall(self) -> None:
+        if self.engine is None:
+            return
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.remove(self.engine.sync_engine, "after_cursor_execute", self._after_execute)
+        event.remove(self.engine.sync_engine, "handle_error", self._on_error)
+        self.engine = None
+
+    def stats(self) -> dict:
+        return {"expired": self.expired, "disconnected": self.disconnected, "interrupted": self.interrupted}
+
+    async def cancel(self, deadline: RequestDeadline) -> None:
+        for connection in list(deadline.connections):
+            try:
+                await self._interrupt(connection)
+                self.interrupted += 1
+            except Exception:
+                logger.warning("Could not interrupt a running statement", exc_info=True)
+
+    async def _interrupt(self, connection) -> None:
+        driver_connection = connection.connection.driver_connection
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            # sqlite3 interrupt потокобезпечний: запит у потоці aiosqlite завершиться з OperationalError
+            await driver_connection.interrupt()
+        elif dialect == "postgresql" and self.engine is not None:
+            # скасування з окремого з'єднання: з'єднання запиту зайняте, поки сервер не відповість
+            pid = driver_connection.get_server_pid()
+            async with self.engine.connect() as side_connection:
+                await side_connection.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": pid})
+
+    def _before_execute(self, conn, _cursor, _statement, _parameters, _context, _executemany):
+        deadline = current_deadline.get()
+        if deadline is not None:
+            deadline.connections.add(conn)
+
+    def _after_execute(self, conn, _cursor, _statement, _parameters, _context, _executemany):
+        deadline = current_deadline.get()
+        if deadline is not None:
+            deadline.connections.discard(conn)
+
+    def _on_error(self, context):
+        deadline = current_deadline.get()
+        if deadline is not None:
+            deadline.connections.discard(context.connection)
+
+
+class DeadlineMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(DEADLINE_EXEMPT):
+            return await self.app(scope, receive, send)
+
+        deadline = RequestDeadline(deadline_budget(scope))
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        response = {"started": False, "finished": False}
+
+        async def pump():
+            # читаємо receive самі, щоб помітити відключення клієнта, поки обробник чекає на БД
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        async def tracked_send(message):
+            if message["type"] == "http.response.start":
+                response["started"] = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response["finished"] = True
+            await send(message)
+
+        token = current_deadline.set(deadline)
+        handler = asyncio.create_task(self.app(scope, messages.get, tracked_send))
+        current_deadline.reset(token)
+        pump_task = asyncio.create_task(pump())
+        disconnect_task = asyncio.create_task(disconnected.wait())
+        try:
+            done, _pending = await asyncio.wait(
+                {handler, disconnect_task}, timeout=deadline.budget, return_when=asyncio.FIRST_COMPLETED
+            )
+            # відповідь уже віддана - фонові задачі після неї не перериваємо
+            if handler not in done and not response["finished"]:
+                expired = disconnect_task not in done
+                if expired:
+                    deadlines.expired += 1
+                else:
+                    deadlines.disconnected += 1
+                # спершу зупиняємо запит у БД, інакше скасований обробник чекатиме на нього, тримаючи з'єднання
+                await deadlines.cancel(deadline)
+                handler.cancel()
+                await asyncio.gather(handler, return_exceptions=True)
+                if expired and not response["started"]:
+                    timeout_response = JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+                    await timeout_response(scope, receive, send)
+                return
+            await handler
+        finally:
+            if not handler.done():
+                handler.cancel()
+            pump_task.cancel()
+            disconnect_task.cancel()
+
+
+deadlines = DeadlineTracker()
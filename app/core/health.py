@@ -0,0 +1,139 @@
+import asyncio
+import bisect
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy.pool import Pool
+
+logger = logging.getLogger(__name__)
+
+HEALTH_READY_TTL_SECONDS = 1.0
+LOOP_LAG_SAMPLE_INTERVAL_MS = 100
+# цикл подій, який не відповідає довше, вважаємо заблокованим і логуємо його стек
+LOOP_LAG_STACK_THRESHOLD_MS = 200
+# верхні межі кошиків гістограми затримки, мс
+LOOP_LAG_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+
+class CachedCheck:
+    def __init__(self, check: Callable[[], Awaitable[bool]], ttl: float = HEALTH_READY_TTL_SECONDS):
+        self.check = check
+        self.ttl = ttl
+        self._result = False
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> bool:
+        if time.monotonic() < self._expires_at:
+            return self._result
+        # часті проби одночасно чекають на одну перевірку
+        async with self._lock:
+            if time.monotonic() >= self._expires_at:
+                try:
+                    self._result = await self.check()
+                except Exception:
+                    logger.exception("Readiness check failed")
+                    self._result = False
+                self._expires_at = time.monotonic() + self.ttl
+        return self._result
+
+
+class LoopLagMonitor:
+    def __init__(
+            self,
+            interval_ms: int = LOOP_LAG_SAMPLE_INTERVAL_MS,
+            stack_threshold_ms: int = LOOP_LAG_STACK_THRESHOLD_MS,
+    ):
+        self.interval = interval_ms / 1000
+        self.stack_threshold = stack_threshold_ms / 1000
+        self.buckets = [0] * (len(LOOP_LAG_BUCKETS_MS) + 1)
+        self.samples = 0
+        self.max_lag_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog:
+            self._watchdog.join(timeout=self.interval * 2)
+            self._watchdog = None
+
+    def record(self, lag_ms: float) -> None:
+        self.samples += 1
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self.buckets[bisect.bisect_left(LOOP_LAG_BUCKETS_MS, lag_ms)] += 1
+
+    def stats(self) -> dict:
+        labels = [f"le_{bound}ms" for bound in LOOP_LAG_BUCKETS_MS] + ["gt_1000ms"]
+        return {
+            "samples": self.samples,
+            "last_ms": round(self.last_lag_ms, 2),
+            "max_ms": round(self.max_lag_ms, 2),
+            "stalls": self.stalls,
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+    async def _sample(self) -> None:
+        # наскільки пізніше запланованого прокидається sleep - стільки цикл був зайнятий іншим
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.record(max(0.0, (now - started - self.interval) * 1000))
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat
+            # один стек на кожне зависання, а не на кожну перевірку
+            if stalled_for > self.stack_threshold + self.interval and heartbeat != reported_heartbeat:
+                reported_heartbeat = heartbeat
+                self.stalls += 1
+                logger.warning(
+                    "Event loop blocked for %.0f ms, current stack:\n%s",
+                    stalled_for * 1000, "".join(self._loop_stack()),
+                )
+
+    def _loop_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return traceback.format_stack(frame) if frame is not None else []
+
+
+def pool_stats(pool: Pool) -> dict:
+    # у StaticPool/NullPool немає лічильників черги
+    stats = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    return stats
+
+
+loop_lag = LoopLagMonitor()
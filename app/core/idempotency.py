@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.responses import JSONResponse
+
+from app.core.auth import decode_access_token
+from app.core.models.idempotency_key import IdempotencyKeyModel
+
+# POST-ендпоінти, які мобільні клієнти повторюють при обривах мережі
+IDEMPOTENT_PATHS = {"/recipes/", "/saved_recipes/", "/recipe_ingredients/"}
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+IDEMPOTENCY_PRUNE_INTERVAL_SECONDS = 600
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+# незавершений запис старший за це вважається покинутим: процес упав або запит перервав дедлайн
+IDEMPOTENCY_LEASE_SECONDS = 60
+
+
+def request_principal(authorization: bytes) -> bytes:
+    # після оновлення токена повтор має потрапити на той самий ключ, тож важить користувач, а не рядок токена
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return b"user:" + str(decode_access_token(token)["sub"]).encode()
+        except HTTPException:
+            # недійсний токен однаково отримає 401
+            pass
+    return authorization
+
+
+def scoped_key(scope: dict, idempotency_key: bytes) -> str:
+    # той самий ключ від іншого користувача, на іншому шляху чи з іншим Accept - інший запит
+    headers = dict(scope["headers"])
+    raw = b"\n".join([
+        scope["method"].encode(), scope["path"].encode(),
+        request_principal(headers.get(b"authorization", b"")), headers.get(b"accept", b""), idempotency_key,
+    ])
+    return hashlib.sha256(raw).hexdigest()
+
+
+class IdempotencyKeys:
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL_SECONDS, lease: float = IDEMPOTENCY_LEASE_SECONDS):
+        self.ttl = ttl
+        self.lease = lease
+        self.session_maker: Optional[async_sessionmaker] = None
+        # запити цього процесу, що зараз виконуються: дублікати чекають на їхню відповідь
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.replayed = 0
+        self.stored = 0
+        self.conflicts = 0
+        self.reclaimed = 0
+        self._pruned_at = 0.0
+
+    def start(self, session_maker: async_sessionmaker) -> None:
+        self.session_maker = session_maker
+        self.in_flight.clear()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self.in_flight),
+            "replayed": self.replayed,
+            "stored": self.stored,
+            "conflicts": self.conflicts,
+            "reclaimed": self.reclaimed,
+        }
+
+    def abandoned(self, record: IdempotencyKeyModel) -> bool:
+        return record.status_code is None and (record.claimed_at or 0) <= time.time() - self.lease
+
+    async def lookup(self, key: str) -> Optional[IdempotencyKeyModel]:
+        async with self.session_maker() as session:
+            result = await session.execute(
+                select(IdempotencyKeyModel)
+                .where(IdempotencyKeyModel.key == key, IdempotencyKeyModel.expires_at > time.time())
+            )
+            return result.scalars().first()
+
+    async def claim(self, key: str, request_hash: str) -> bool:
+        now = time.time()
+        async with self.session_maker() as session:
+            # прострочений або покинутий запис із тим самим ключем не повинен заважати
+            reclaimed = await session.execute(
+                delete(IdempotencyKeyModel)
+                .where(
+                    IdempotencyKeyModel.key == key,
+                    or_(
+                        IdempotencyKeyModel.expires_at <= now,
+                        and_(
+                            IdempotencyKeyModel.status_code.is_(None),
+                            or_(
+                                IdempotencyKeyModel.claimed_at.is_(None),
+                                IdempotencyKeyModel.claimed_at <= now - self.lease,
+                            ),
+                        ),
+                    ),
+                )
+            )
+            self.reclaimed += reclaimed.rowcount
+            if now - self._pruned_at >= IDEMPOTENCY_PRUNE_INTERVAL_SECONDS:
+                self._pruned_at = now
+                await session.execute(delete(IdempotencyKeyModel).where(IdempotencyKeyModel.expires_at <= now))
+            session.add(IdempotencyKeyModel(
+                key=key, request_hash=request_hash, expires_at=now + self.ttl, claimed_at=now
+            ))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # той самий ключ щойно взяв інший воркер
+                return False
+        return True
+
+    async def complete(self, key: str, response: dict) -> None:
+        async with self.session_maker() as session:
+            await session.execute(
+                update(IdempotencyKeyModel)
+                .where(IdempotencyKeyModel.key == key)
+                .values(status_code=response["status"], headers=json.dumps(response["headers"]), body=response["body"])
+            )
+            await session.commit()
+        self.stored += 1
+
+    async def release(self, key: str) -> None:
+        # помилка сервера не кешується: повтор має виконатись ще раз
+        async with self.session_maker() as session:
+            await session.execute(delete(IdempotencyKeyModel).where(IdempotencyKeyModel.key == key))
+            await session.commit()
+
+
+idempotency = IdempotencyKeys()
+
+
+def stored_response(record: IdempotencyKeyModel) -> dict:
+    return {
+        "status": record.status_code,
+        "headers": json.loads(record.headers),
+        "body": record.body,
+        "request_hash": record.request_hash,
+    }
+
+
+def in_progress_response() -> JSONResponse:
+    # запит з цим ключем виконує інший воркер; чекати на нього можна лише в межах процесу
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "A request with this Idempotency-Key is in progress"},
+        headers={"Retry-After": "1"},
+    )
+
+
+async def send_replay(response: dict, send) -> None:
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response["headers"]]
+    headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": response["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": response["body"]})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in IDEMPOTENT_PATHS:
+            return await self.app(scope, receive, send)
+        idempotency_key = dict(scope["headers"]).get(b"idempotency-key")
+        if not idempotency_key:
+            return await self.app(scope, receive, send)
+        if len(idempotency_key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+            response = JSONResponse(status_code=400, content={"detail": "Idempotency-Key is too long"})
+            return await response(scope, receive, send)
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        key = scoped_key(scope, idempotency_key)
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        while True:
+            pending = idempotency.in_flight.get(key)
+            if pending is not None:
+                result = await asyncio.shield(pending)
+                if result is None:
+                    # перша спроба впала - виконуємо запит самі
+                    continue
+                return await self._replay(scope, receive, send, result, request_hash)
+            record = await idempotency.lookup(key)
+            if key in idempotency.in_flight:
+                continue
+            if record is None or idempotency.abandoned(record):
+                break
+            if record.status_code is None:
+                idempotency.conflicts += 1
+                return await in_progress_response()(scope, receive, send)
+            return await self._replay(scope, receive, send, stored_response(record), request_hash)
+
+        future = asyncio.get_running_loop().create_future()
+        idempotency.in_flight[key] = future
+        result = None
+        try:
+            if not await idempotency.claim(key, request_hash):
+                idempotency.conflicts += 1
+                return await in_progress_response()(scope, receive, send)
+            captured = {"status": 500, "headers": [], "body": b"", "request_hash": request_hash}
+            body_sent = False
+
+            async def replay_body():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            async def capturing_send(message):
+                if message["type"] == "http.response.start":
+                    captured["status"] = message["status"]
+                    captured["headers"] = [
+                        (name.decode("latin-1"), value.decode("latin-1")) for name, value in message.get("headers", [])
+                    ]
+                elif message["type"] == "http.response.body":
+                    captured["body"] += message.get("body", b"")
+                await send(message)
+
+            try:
+                await self.app(scope, replay_body, capturing_send)
+            finally:
+                if captured["status"] < 500:
+                    await idempotency.complete(key, captured)
+                    result = captured
+                else:
+                    await idempotency.release(key)
+        finally:
+            idempotency.in_flight.pop(key, None)
+            future.set_result(result)
+
+    async def _replay(self, scope, receive, send, response: dict, request_hash: str) -> None:
+        if response["request_hash"] != request_hash:
+            mismatch = JSONResponse(
+                status_code=422,
+                content={"detail": "Idempotency-Key was already used with a different request body"},
+            )
+            return await mismatch(scope, receive, send)
+        idempotency.replayed += 1
+        await send_replay(response, send)
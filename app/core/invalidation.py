@@ -0,0 +1,195 @@
+import asyncio
+import inspect
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.autocomplete import autocomplete
+from app.core.cooccurrence import ingredient_pairs
+from app.core.jobs import refresh_ingredient_pairs, refresh_meal_plan_features
+from app.core.live import live
+from app.core.meal_plan import meal_plan_features
+from app.core.models.invalidation import InvalidationModel
+from app.core.revocation import revoked_tokens
+from app.core.singleflight import reads
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_POLL_INTERVAL_MS = 20
+# події старші за це вже прочитали всі живі воркери
+INVALIDATION_RETENTION_SECONDS = 60
+
+# обробник може бути async, якщо після очищення кешів ставить фонову перебудову
+InvalidationHandler = Callable[[dict], Union[None, Awaitable[None]]]
+
+
+class InvalidationBus:
+    def __init__(self, poll_interval_ms: int = INVALIDATION_POLL_INTERVAL_MS):
+        self.poll_interval = poll_interval_ms / 1000
+        self.origin = uuid.uuid4().hex
+        self.handlers: Dict[str, InvalidationHandler] = {}
+        self.session_maker: Optional[async_sessionmaker] = None
+        self._last_id = 0
+        self._pruned_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None
+
+    def handler(self, kind: str) -> Callable[[InvalidationHandler], InvalidationHandler]:
+        def register(fn: InvalidationHandler) -> InvalidationHandler:
+            self.handlers[kind] = fn
+            return fn
+
+        return register
+
+    async def start(self, session_maker: async_sessionmaker) -> None:
+        self.session_maker = session_maker
+        async with session_maker() as session:
+            # новий воркер стартує з порожніми кешами, історія йому не потрібна
+            self._last_id = (await session.execute(select(func.max(InvalidationModel.id)))).scalar() or 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def publish(self, kind: str, payload: dict) -> None:
+        # викликати після коміту: інші воркери не повинні перечитати старі дані
+        await self._apply(kind, payload)
+        self.published += 1
+        if not self.enabled:
+            return
+        try:
+            async with self.session_maker() as session:
+                session.add(InvalidationModel(
+                    origin=self.origin, kind=kind, payload=json.dumps(payload), created_at=time.time()
+                ))
+                await session.commit()
+        except Exception:
+            logger.exception("Failed to broadcast %s invalidation", kind)
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "published": self.published, "received": self.received}
+
+    async def poll(self) -> None:
+        async with self.session_maker() as session:
+            rows = await session.execute(
+                select(InvalidationModel.id, InvalidationModel.origin, InvalidationModel.kind, InvalidationModel.payload)
+                .where(InvalidationModel.id > self._last_id)
+                .order_by(InvalidationModel.id)
+            )
+            rows = rows.all()
+            now = time.time()
+            if now - self._pruned_at >= INVALIDATION_RETENTION_SECONDS:
+                self._pruned_at = now
+                await session.execute(
+                    delete(InvalidationModel).where(InvalidationModel.created_at < now - INVALIDATION_RETENTION_SECONDS)
+                )
+                await session.commit()
+
+        for row_id, origin, kind, payload in rows:
+            self._last_id = row_id
+            if origin == self.origin or kind not in self.handlers:
+                continue
+            self.received += 1
+            await self._apply(kind, json.loads(payload))
+
+    async def _apply(self, kind: str, payload: dict) -> None:
+        result = self.handlers[kind](payload)
+        if inspect.isawaitable(result):
+            await result
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception("Failed to poll invalidations")
+
+
+invalidations = InvalidationBus()
+
+
+async def refresh_catalog_models() -> None:
+    # матриці будуються в пулі процесів; запис у каталог не чекає на них і не падає через них
+    try:
+        await refresh_meal_plan_features()
+        await refresh_ingredient_pairs()
+    except Exception:
+        logger.exception("Failed to queue catalog model rebuilds")
+
+
+@invalidations.handler("recipe")
+async def invalidate_recipe(payload: dict) -> None:
+    # name=None - рецепт видалено
+    recipe_id = payload["id"]
+    reads.forget(("/recipes/{recipe_id}", recipe_id))
+    if payload.get("name") is None:
+        autocomplete.recipes.remove(recipe_id)
+    else:
+        autocomplete.recipes.add(recipe_id, payload["name"])
+    meal_plan_features.invalidate()
+    ingredient_pairs.invalidate()
+    live.notify(recipe_id, *payload.get("category_ids", ()))
+    await refresh_catalog_models()
+
+
+@invalidations.handler("recipe_saves")
+def invalidate_recipe_saves(payload: dict) -> None:
+    for recipe_id in payload["recipe_ids"]:
+        if payload.get("delta"):
+            autocomplete.recipes.bump(recipe_id, payload["delta"])
+        live.notify(recipe_id)
+
+
+@invalidations.handler("ingredient")
+async def invalidate_ingredient(payload: dict) -> None:
+    ingredient_id = payload["id"]
+    reads.forget(("/ingredients/{ingredient_id}", ingredient_id))
+    if payload.get("name") is None:
+        autocomplete.ingredients.remove(ingredient_id)
+    else:
+        autocomplete.ingredients.add(ingredient_id, payload["name"])
+    meal_plan_features.invalidate()
+    ingredient_pairs.invalidate()
+    await refresh_catalog_models()
+
+
+@invalidations.handler("recipe_ingredient")
+async def invalidate_recipe_ingredient(payload: dict) -> None:
+    if payload.get("delta"):
+        autocomplete.ingredients.bump(payload["ingredient_id"], payload["delta"])
+    meal_plan_features.invalidate()
+    ingredient_pairs.invalidate()
+    await refresh_catalog_models()
+
+
+@invalidations.handler("category")
+def invalidate_category(payload: dict) -> None:
+    reads.forget(("/categories/{category_id}", payload["id"]))
+
+
+@invalidations.handler("user")
+def invalidate_user(payload: dict) -> None:
+    reads.forget(("/users/{user_id}", payload["id"]))
+
+
+@invalidations.handler("token_revoked")
+def invalidate_token(payload: dict) -> None:
+    revoked_tokens.add(payload["jti"], datetime.fromisoformat(payload["expires_at"]))
@@ -0,0 +1,378 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.autocomplete import autocomplete
+from app.core.cooccurrence import IngredientPairs, ingredient_pairs
+from app.core.meal_plan import RecipeFeatures, meal_plan_features
+from app.core.models.job import JobModel
+from app.core.revocation import prune_expired_tokens, utcnow
+
+logger = logging.getLogger(__name__)
+
+# скільки задач кожного типу виконується одночасно
+JOB_CONCURRENCY: Dict[str, int] = {
+    "rebuild_autocomplete": 1,
+    "rebuild_meal_plan_features": 1,
+    "rebuild_ingredient_pairs": 1,
+    "prune_expired_tokens": 1,
+}
+JOB_DEFAULT_CONCURRENCY = 1
+JOB_PROCESS_POOL_WORKERS = 2
+# прогрес пишемо в БД не частіше ніж раз на цей інтервал
+JOB_PROGRESS_FLUSH_SECONDS = 1.0
+# завершені задачі зберігаються для перегляду результату, далі видаляються
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+JOB_PRUNE_INTERVAL_SECONDS = 600
+# власник оновлює heartbeat своїх задач; задачу без heartbeat довше за lease забирає будь-який воркер
+JOB_HEARTBEAT_SECONDS = 15
+JOB_LEASE_SECONDS = 60
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+JobHandler = Callable[["JobContext", dict], Awaitable[Any]]
+JobCallback = Callable[[int], None]
+
+
+class JobContext:
+    def __init__(self, runner: "JobRunner", job_id: int):
+        self.runner = runner
+        self.job_id = job_id
+        self.session_maker = runner.session_maker
+        self._progress_written_at = 0.0
+
+    async def report(self, progress: float) -> None:
+        progress = min(max(progress, 0.0), 1.0)
+        self.runner.progress[self.job_id] = progress
+        now = time.monotonic()
+        if now - self._progress_written_at >= JOB_PROGRESS_FLUSH_SECONDS:
+            self._progress_written_at = now
+            await self.runner.update(self.job_id, progress=progress)
+
+    async def run_cpu(self, fn: Callable, *args) -> Any:
+        # CPU-важкі кроки - в окремому процесі, щоб не блокувати цикл подій API
+        return await asyncio.get_running_loop().run_in_executor(self.runner.process_pool(), fn, *args)
+
+
+class JobRunner:
+    def __init__(
+        self,
+        concurrency: Optional[Dict[str, int]] = None,
+        process_workers: int = JOB_PROCESS_POOL_WORKERS,
+        heartbeat: float = JOB_HEARTBEAT_SECONDS,
+        lease: float = JOB_LEASE_SECONDS,
+    ):
+        self.concurrency = JOB_CONCURRENCY if concurrency is None else concurrency
+        self.process_workers = process_workers
+        self.heartbeat = heartbeat
+        self.lease = lease
+        self.handlers: Dict[str, JobHandler] = {}
+        # викликаються, коли задача цього процесу завершилась будь-як: успіх, помилка, скасування, чужий claim
+        self.finished_callbacks: Dict[str, List[JobCallback]] = {}
+        # задачі, що перебудовують кеші свого процесу: їх не підхоплює інший воркер
+        self.local_types: Set[str] = set()
+        self.session_maker: Optional[async_sessionmaker] = None
+        self.progress: Dict[int, float] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def handler(self, job_type: str, local: bool = False) -> Callable[[JobHandler], JobHandler]:
+        def register(fn: JobHandler) -> JobHandler:
+            self.handlers[job_type] = fn
+            if local:
+                self.local_types.add(job_type)
+            return fn
+
+        return register
+
+    def on_finished(self, job_type: str) -> Callable[[JobCallback], JobCallback]:
+        def register(fn: JobCallback) -> JobCallback:
+            self.finished_callbacks.setdefault(job_type, []).append(fn)
+            return fn
+
+        return register
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: fork процесу з потоками aiosqlite небезпечний
+            self._pool = ProcessPoolExecutor(self.process_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def start(self, session_maker: async_sessionmaker) -> None:
+        self.session_maker = session_maker
+        self._stopping = False
+        self._semaphores = {}
+        await self.reclaim_expired()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_forever())
+
+    async def reclaim_expired(self) -> List[int]:
+        # задачі без heartbeat довше за lease лишив процес, що впав; живий сусід свої задачі продовжує
+        now = utcnow()
+        unfinished = JobModel.status.in_((QUEUED, RUNNING))
+        expired = or_(JobModel.heartbeat_at.is_(None), JobModel.heartbeat_at <= now - timedelta(seconds=self.lease))
+        foreign = JobModel.id.not_in(list(self._tasks))
+        shared_types = [job_type for job_type in self.handlers if job_type not in self.local_types]
+        reclaimed = []
+        async with self.session_maker() as session:
+            # кеші процесу, що завершився, перебудовувати нікому
+            await session.execute(
+                update(JobModel)
+                .where(unfinished, expired, foreign, JobModel.type.in_(self.local_types))
+                .values(status=CANCELLED, error="Owner process exited", finished_at=now)
+            )
+            candidates = await session.execute(
+                select(JobModel.id, JobModel.type, JobModel.params)
+                .where(unfinished, expired, foreign, JobModel.type.in_(shared_types))
+                .order_by(JobModel.id)
+            )
+            for job_id, job_type, params in candidates.all():
+                # новий heartbeat - це lease: з кількох воркерів задачу отримує той, чий UPDATE пройшов першим
+                result = await session.execute(
+                    update(JobModel)
+                    .where(JobModel.id == job_id, unfinished, expired)
+                    .values(status=QUEUED, progress=0.0, started_at=None, heartbeat_at=now)
+                )
+                if result.rowcount == 1:
+                    reclaimed.append((job_id, job_type, json.loads(params or "{}")))
+            await session.commit()
+        for job_id, job_type, params in reclaimed:
+            logger.info("Reclaimed job %d (%s) with an expired lease", job_id, job_type)
+            self._spawn(job_id, job_type, params)
+        return [job_id for job_id, _job_type, _params in reclaimed]
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def submit(self, job_type: str, params: Optional[dict] = None) -> JobModel:
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        params = params or {}
+        async with self.session_maker() as session:
+            job = JobModel(type=job_type, status=QUEUED, progress=0.0, params=json.dumps(params), heartbeat_at=utcnow())
+            session.add(job)
+            await session.commit()
+        self._spawn(job.id, job_type, params)
+        return job
+
+    async def cancel(self, job_id: int) -> bool:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+            return True
+        # чергова задача іншого процесу або та, що ще не піднялась після рестарту
+        async with self.session_maker() as session:
+            result = await session.execute(
+                update(JobModel)
+                .where(JobModel.id == job_id, JobModel.status == QUEUED)
+                .values(status=CANCELLED, finished_at=utcnow())
+            )
+            await session.commit()
+        return result.rowcount == 1
+
+    async def update(self, job_id: int, **values) -> None:
+        async with self.session_maker() as session:
+            await session.execute(update(JobModel).where(JobModel.id == job_id).values(**values))
+            await session.commit()
+
+    async def wait(self, job_id: int) -> None:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _claim(self, job_id: int) -> bool:
+        # queued -> running атомарно: ту саму задачу могли підхопити кілька воркерів
+        async with self.session_maker() as session:
+            result = await session.execute(
+                update(JobModel)
+                .where(JobModel.id == job_id, JobModel.status == QUEUED)
+                .values(status=RUNNING, started_at=utcnow(), heartbeat_at=utcnow())
+            )
+            await session.commit()
+        return result.rowcount == 1
+
+    async def _heartbeat_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                if self._tasks:
+                    async with self.session_maker() as session:
+                        await session.execute(
+                            update(JobModel)
+                            .where(JobModel.id.in_(list(self._tasks)), JobModel.status.in_((QUEUED, RUNNING)))
+                            .values(heartbeat_at=utcnow())
+                        )
+                        await session.commit()
+                await self.reclaim_expired()
+            except Exception:
+                logger.exception("Failed to heartbeat jobs")
+
+    def _spawn(self, job_id: int, job_type: str, params: dict) -> None:
+        task = asyncio.create_task(self._execute(job_id, job_type, params))
+        # done-колбек спрацьовує навіть для задачі, скасованої до першого кроку, коли тіло _execute не виконувалось
+        task.add_done_callback(lambda _task: self._finished(job_id, job_type))
+        self._tasks[job_id] = task
+
+    def _finished(self, job_id: int, job_type: str) -> None:
+        self._tasks.pop(job_id, None)
+        self.progress.pop(job_id, None)
+        for callback in self.finished_callbacks.get(job_type, ()):
+            try:
+                callback(job_id)
+            except Exception:
+                logger.exception("Finished callback for job %d (%s) failed", job_id, job_type)
+
+    async def _execute(self, job_id: int, job_type: str, params: dict) -> None:
+        semaphore = self._semaphores.setdefault(
+            job_type, asyncio.Semaphore(self.concurrency.get(job_type, JOB_DEFAULT_CONCURRENCY))
+        )
+        try:
+            async with semaphore:
+                if not await self._claim(job_id):
+                    return
+                result = await self.handlers[job_type](JobContext(self, job_id), params)
+            await self.update(
+                job_id, status=SUCCEEDED, progress=1.0, result=json.dumps(result), finished_at=utcnow()
+            )
+        except asyncio.CancelledError:
+            # на зупинці сервера задача повертається в чергу без lease: її одразу підхопить наступний старт
+            if self._stopping:
+                await self.update(job_id, status=QUEUED, progress=0.0, started_at=None, heartbeat_at=None)
+            else:
+                await self.update(job_id, status=CANCELLED, finished_at=utcnow())
+        except Exception as exc:
+            logger.exception("Job %d (%s) failed", job_id, job_type)
+            await self.update(job_id, status=FAILED, error=repr(exc), finished_at=utcnow())
+
+
+jobs = JobRunner()
+
+
+async def refresh_precomputed(index, job_type: str) -> Optional[int]:
+    # кожна зміна каталогу робить модель застарілою, але в черзі тримаємо лише одну перебудову;
+    # першу модель теж будує задача в пулі процесів, а не запит
+    if not index.stale or index.refreshing or jobs.session_maker is None:
+        return None
+    index.refreshing = True
+    try:
+        job = await jobs.submit(job_type)
+    except BaseException:
+        index.refreshing = False
+        raise
+    return job.id
+
+
+@jobs.handler("rebuild_autocomplete", local=True)
+async def rebuild_autocomplete(ctx: JobContext, _params: dict) -> dict:
+    async with ctx.session_maker() as session:
+        await autocomplete.rebuild(session)
+    return {"recipes": len(autocomplete.recipes), "ingredients": len(autocomplete.ingredients)}
+
+
+@jobs.handler("rebuild_meal_plan_features", local=True)
+async def rebuild_meal_plan_features(ctx: JobContext, _params: dict) -> dict:
+    version = meal_plan_features.version
+    async with ctx.session_maker() as session:
+        recipes, links = await meal_plan_features.load(session)
+    await ctx.report(0.5)
+    features = await ctx.run_cpu(RecipeFeatures.build, recipes, links)
+    meal_plan_features.replace(features, version)
+    return {"recipes": len(features.ids)}
+
+
+@jobs.on_finished("rebuild_meal_plan_features")
+def meal_plan_features_rebuilt(_job_id: int) -> None:
+    meal_plan_features.refreshing = False
+
+
+async def refresh_meal_plan_features() -> Optional[int]:
+    return await refresh_precomputed(meal_plan_features, "rebuild_meal_plan_features")
+
+
+@jobs.handler("rebuild_ingredient_pairs", local=True)
+async def rebuild_ingredient_pairs(ctx: JobContext, _params: dict) -> dict:
+    version = ingredient_pairs.version
+    async with ctx.session_maker() as session:
+        ingredients, links = await ingredient_pairs.load(session)
+    await ctx.report(0.5)
+    pairs = await ctx.run_cpu(IngredientPairs.build, ingredients, links)
+    ingredient_pairs.replace(pairs, version)
+    return {"recipes": pairs.recipes, "ingredients": len(pairs.pairs)}
+
+
+@jobs.on_finished("rebuild_ingredient_pairs")
+def ingredient_pairs_rebuilt(_job_id: int) -> None:
+    # наступна зміна каталогу знову може поставити перебудову
+    ingredient_pairs.refreshing = False
+
+
+async def refresh_ingredient_pairs() -> Optional[int]:
+    return await refresh_precomputed(ingredient_pairs, "rebuild_ingredient_pairs")
+
+
+@jobs.handler("prune_expired_tokens")
+async def prune_tokens(ctx: JobContext, _params: dict) -> None:
+    async with ctx.session_maker() as session:
+        await prune_expired_tokens(session)
+
+
+async def prune_finished_jobs(session, retention: float = JOB_RETENTION_SECONDS) -> int:
+    # кожен старт і кожна фонова перебудова додають рядок у jobs
+    result = await session.execute(
+        delete(JobModel)
+        .where(JobModel.status.in_(FINISHED), JobModel.finished_at <= utcnow() - timedelta(seconds=retention))
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def prune_finished_jobs_forever(session_maker, interval: float = JOB_PRUNE_INTERVAL_SECONDS) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_maker() as session:
+                await prune_finished_jobs(session)
+        except Exception:
+            logger.exception("Failed to prune finished jobs")
+
+
+async def submit_forever(job_type: str, interval: float) -> None:
+    # періодичне обслуговування йде через чергу: його видно в /jobs, а lease переживає падіння воркера
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with jobs.session_maker() as session:
+                pending = (await session.execute(
+                    select(JobModel.id).where(JobModel.type == job_type, JobModel.status.in_((QUEUED, RUNNING)))
+                )).first()
+            # кожен воркер має цей цикл, а в черзі досить однієї задачі
+            if pending is None:
+                await jobs.submit(job_type)
+        except Exception:
+            logger.exception("Failed to submit %s", job_type)
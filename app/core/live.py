@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.models.recipe import RecipeModel
+from app.core.models.saved_recipe import SavedRecipeModel
+from app.core.schemas.recipe import RecipeResponseSchema
+
+logger = logging.getLogger(__name__)
+
+# не частіше одного оновлення на рецепт за цей інтервал
+LIVE_COALESCE_INTERVAL_MS = 250
+# повільний клієнт, який накопичив стільки непрочитаних рецептів, відключається і робить resync
+LIVE_MAX_PENDING_PER_CONNECTION = 1000
+
+Topic = Tuple[str, int]
+
+
+class Subscriber:
+    def __init__(self, max_pending: int = LIVE_MAX_PENDING_PER_CONNECTION):
+        self.max_pending = max_pending
+        self.topics: Set[Topic] = set()
+        # останнє оновлення на рецепт: повільний клієнт отримує свіжий стан, а не всю історію
+        self._pending: Dict[int, dict] = {}
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.overflowed = False
+
+    def offer(self, update: dict) -> None:
+        if self.closed:
+            return
+        self._pending[update["recipe_id"]] = update
+        if len(self._pending) > self.max_pending:
+            self.overflowed = True
+            self.close()
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[List[dict]]:
+        # None - підписника закрито; порожній список - минув timeout
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        if self.closed:
+            return None
+        updates, self._pending = list(self._pending.values()), {}
+        return updates
+
+
+class LiveBroker:
+    def __init__(self, interval_ms: int = LIVE_COALESCE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.session_maker: Optional[async_sessionmaker] = None
+        self._subscribers: Dict[Topic, Set[Subscriber]] = {}
+        # recipe_id -> категорії, яким треба розіслати зміну крім поточної категорії рецепта
+        self._dirty: Dict[int, Set[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.connections = 0
+        self.flushes = 0
+        self.delivered = 0
+
+    def start(self, session_maker: async_sessionmaker) -> None:
+        self.session_maker = session_maker
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscribers in list(self._subscribers.values()):
+            for subscriber in list(subscribers):
+                subscriber.close()
+        self._subscribers.clear()
+        self._dirty.clear()
+
+    def connect(self) -> Subscriber:
+        self.connections += 1
+        return Subscriber()
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.connections -= 1
+        self.unsubscribe(subscriber, list(subscriber.topics))
+        subscriber.close()
+
+    def subscribe(self, subscriber: Subscriber, topics: Iterable[Topic]) -> None:
+        for topic in topics:
+            subscriber.topics.add(topic)
+            self._subscribers.setdefault(topic, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber, topics: Iterable[Topic]) -> None:
+        for topic in topics:
+            subscriber.topics.discard(topic)
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def notify(self, recipe_id: int, *category_ids: int) -> None:
+        # викликається з обробників запису; сама розсилка - у фоновому flush
+        self._dirty.setdefault(recipe_id, set()).update(category_ids)
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "topics": len(self._subscribers),
+            "dirty": len(self._dirty),
+            "flushes": self.flushes,
+            "delivered": self.delivered,
+        }
+
+    async def flush(self) -> None:
+        if not self._dirty or self.session_maker is None:
+            return
+        dirty, self._dirty = self._dirty, {}
+        if not self._subscribers:
+            return
+
+        recipe_ids = list(dirty)
+        async with self.session_maker() as session:
+            recipes = await session.execute(select(RecipeModel).where(RecipeModel.id.in_(recipe_ids)))
+            recipes = {recipe.id: recipe for recipe in recipes.scalars().all()}
+            # один груповий запит на всі змінені рецепти замість COUNT на кожного клієнта
+            counts = await session.execute(
+                select(SavedRecipeModel.recipe_id, func.count(SavedRecipeModel.id))
+                .where(SavedRecipeModel.recipe_id.in_(recipe_ids))
+                .group_by(SavedRecipeModel.recipe_id)
+            )
+            counts = dict(counts.all())
+
+        for recipe_id, category_ids in dirty.items():
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                category_ids = category_ids | {recipe.category_id}
+            update = {
+                "recipe_id": recipe_id,
+                "deleted": recipe is None,
+                "recipe": RecipeResponseSchema.model_validate(recipe, from_attributes=True).model_dump(mode="json")
+                if recipe is not None else None,
+                "save_count": counts.get(recipe_id, 0),
+            }
+            receivers = set(self._subscribers.get(("recipe", recipe_id), ()))
+            for category_id in category_ids:
+                receivers.update(self._subscribers.get(("category", category_id), ()))
+            for subscriber in receivers:
+                subscriber.offer(update)
+            self.delivered += len(receivers)
+        self.flushes += 1
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to publish live recipe updates")
+
+
+live = LiveBroker()
@@ -0,0 +1,205 @@
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.ingredient import IngredientModel
+from app.core.models.recipe import RecipeModel
+from app.core.models.recipe_ingredient import RecipeIngredientModel
+from app.core.shopping_list import parse_amount
+
+MEAL_PLAN_TIME_BUDGET_MS = 20
+MEAL_PLAN_RECENT_SAVE_DAYS = 14
+# поки перша матриця будується, генерація відповідає 503 з цим Retry-After
+MEAL_PLAN_RETRY_AFTER_SECONDS = 2
+
+
+@dataclass
+class RecipeFeatures:
+    ids: np.ndarray
+    calories: np.ndarray
+    cooking_time: np.ndarray
+    category_ids: np.ndarray
+    # one-hot матриця рецепт x категорія
+    categories: np.ndarray
+
+    @classmethod
+    def build(
+            cls,
+            recipes: Sequence[Tuple[int, int, Optional[int]]],
+            links: Iterable[Tuple[int, Optional[str], Optional[int]]],
+    ) -> "RecipeFeatures":
+        ids = np.asarray([recipe_id for recipe_id, _category_id, _time in recipes], dtype=np.int64)
+        category_of = np.asarray([category_id for _recipe_id, category_id, _time in recipes], dtype=np.int64)
+        # рецепт без часу не проходить жоден фільтр за часом
+        cooking_time = np.asarray(
+            [np.nan if minutes is None else minutes for _recipe_id, _category_id, minutes in recipes],
+            dtype=np.float64,
+        )
+
+        positions = {recipe_id: position for position, recipe_id in enumerate(ids.tolist())}
+        link_positions, link_calories = [], []
+        for recipe_id, amount, calories_per_100g in links:
+            parsed = parse_amount(amount)
+            if recipe_id in positions and parsed is not None and parsed[1] == "g" and calories_per_100g:
+                link_positions.append(positions[recipe_id])
+                link_calories.append(parsed[0] * calories_per_100g / 100)
+        calories = np.bincount(
+            np.asarray(link_positions, dtype=np.int64),
+            weights=np.asarray(link_calories, dtype=np.float64),
+            minlength=len(ids),
+        )
+
+        category_ids, category_index = np.unique(category_of, return_inverse=True)
+        categories = np.zeros((len(ids), len(category_ids)), dtype=bool)
+        categories[np.arange(len(ids)), category_index] = True
+
+        return cls(ids=ids, calories=calories, cooking_time=cooking_time, category_ids=category_ids, categories=categories)
+
+    def candidates(
+            self,
+            max_cooking_time: Optional[int] = None,
+            category_ids: Sequence[int] = (),
+            exclude_ids: Sequence[int] = (),
+    ) -> np.ndarray:
+        mask = self.calories > 0
+        if max_cooking_time is not None:
+            mask &= self.cooking_time <= max_cooking_time
+        if category_ids:
+            columns = np.flatnonzero(np.isin(self.category_ids, category_ids))
+            mask &= self.categories[:, columns].any(axis=1)
+        if len(exclude_ids):
+            mask &= ~np.isin(self.ids, exclude_ids)
+        return np.flatnonzero(mask)
+
+
+def solve_meal_plan(
+        calories: np.ndarray,
+        count: int,
+        target: float,
+        time_budget_ms: float = MEAL_PLAN_TIME_BUDGET_MS,
+) -> List[int]:
+    # жадібний старт: кожен наступний рецепт найближчий до залишку калорій на слот
+    available = np.ones(len(calories), dtype=bool)
+    chosen: List[int] = []
+    remaining = target
+    for slot in range(count):
+        error = np.abs(calories - remaining / (count - slot))
+        error[~available] = np.inf
+        best = int(np.argmin(error))
+        chosen.append(best)
+        available[best] = False
+        remaining -= calories[best]
+
+    # локальний пошук: заміна одного, потім пари рецептів, поки є покращення і час
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    total = float(calories[chosen].sum())
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for slot, current in enumerate(chosen):
+            error = np.abs(total - calories[current] + calories - target)
+            error[~available] = np.inf
+            best = int(np.argmin(error))
+            if error[best] < abs(total - target) - 1e-9:
+                available[current], available[best] = True, False
+                total += calories[best] - calories[current]
+                chosen[slot] = best
+                improved = True
+        if improved or count < 2:
+            continue
+
+        free = np.flatnonzero(available)
+        order = free[np.argsort(calories[free])]
+        sorted_calories = calories[order]
+        for first_slot in range(count):
+            for second_slot in range(first_slot + 1, count):
+                if time.perf_counter() >= deadline:
+                    return chosen
+                first, second = chosen[first_slot], chosen[second_slot]
+                needed = target - (total - calories[first] - calories[second])
+                replacement = _best_pair(sorted_calories, needed)
+                if replacement is None:
+                    continue
+                i, j, error = replacement
+                if error < abs(total - target) - 1e-9:
+                    new_first, new_second = int(order[i]), int(order[j])
+                    available[[first, second]] = True
+                    available[[new_first, new_second]] = False
+                    total += calories[new_first] + calories[new_second] - calories[first] - calories[second]
+                    chosen[first_slot], chosen[second_slot] = new_first, new_second
+                    improved = True
+                    break
+            if improved:
+                break
+    return chosen
+
+
+def _best_pair(sorted_calories: np.ndarray, needed: float) -> Optional[Tuple[int, int, float]]:
+    # для кожного x шукаємо бінарним пошуком партнера, найближчого до needed - x
+    size = len(sorted_calories)
+    if size < 2:
+        return None
+    firsts = np.arange(size)
+    positions = np.searchsorted(sorted_calories, needed - sorted_calories)
+    best = None
+    for seconds in (np.clip(positions, 0, size - 1), np.clip(positions - 1, 0, size - 1)):
+        error = np.abs(sorted_calories + sorted_calories[seconds] - needed)
+        error[seconds == firsts] = np.inf
+        i = int(np.argmin(error))
+        if np.isfinite(error[i]) and (best is None or error[i] < best[2]):
+            best = (i, int(seconds[i]), float(error[i]))
+    return best
+
+
+class MealPlanFeatures:
+    def __init__(self):
+        self._features: Optional[RecipeFeatures] = None
+        # кожна інвалідація збільшує версію; матриця свіжа, якщо побудована на поточній
+        self._version = 0
+        self._built_version = -1
+        # перебудова вже в черзі: запити далі отримують попередню матрицю
+        self.refreshing = False
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def stale(self) -> bool:
+        return self._built_version != self._version
+
+    @property
+    def current(self) -> Optional[RecipeFeatures]:
+        # None, доки фонова задача не збудувала першу матрицю
+        return self._features
+
+    def invalidate(self) -> None:
+        self._version += 1
+
+    def clear(self) -> None:
+        self._features = None
+        self._built_version = -1
+        self.refreshing = False
+
+    def replace(self, features: RecipeFeatures, version: int) -> None:
+        # зміни під час перебудови лишать матрицю застарілою
+        self._features = features
+        self._built_version = version
+
+    @staticmethod
+    async def load(session: AsyncSession) -> Tuple[list, list]:
+        recipes = await session.execute(
+            select(RecipeModel.id, RecipeModel.category_id, RecipeModel.cooking_time_minutes)
+        )
+        links = await session.execute(
+            select(RecipeIngredientModel.recipe_id, RecipeIngredientModel.amount, IngredientModel.calories_per_100g)
+            .join(IngredientModel, IngredientModel.id == RecipeIngredientModel.ingredient_id)
+        )
+        return [tuple(row) for row in recipes.all()], [tuple(row) for row in links.all()]
+
+
+meal_plan_features = MealPlanFeatures()
@@ -4,9 +4,10 @@ from sqlalchemy import Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import BaseModel
+from .sync import SyncMixin
 
 
-class CategoryModel(BaseModel):
+class CategoryModel(SyncMixin, BaseModel):
     __tablename__ = 'categories'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
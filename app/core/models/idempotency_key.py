@@ -0,0 +1,21 @@
+from typing import Optional
+
+from sqlalchemy import String, Float, Integer, Text, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class IdempotencyKeyModel(BaseModel):
+    __tablename__ = "idempotency_keys"
+
+    # sha256 від методу, шляху, користувача токена, Accept і самого Idempotency-Key
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # NULL - перший запит ще виконується
+    status_code: Mapped[Optional[int]] = mapped_column(Integer)
+    headers: Mapped[Optional[str]] = mapped_column(Text)
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary)
+    expires_at: Mapped[float] = mapped_column(Float, index=True, nullable=False)
+    # коли запит узяв ключ; незавершений запис зі старим claimed_at лишив упалий процес
+    claimed_at: Mapped[Optional[float]] = mapped_column(Float)
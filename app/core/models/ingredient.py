@@ -5,8 +5,9 @@ from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 
 from .base import BaseModel
+from .sync import SyncMixin
 
-class IngredientModel(BaseModel):
+class IngredientModel(SyncMixin, BaseModel):
     __tablename__ = "ingredients"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
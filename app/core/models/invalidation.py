@@ -0,0 +1,17 @@
+from sqlalchemy import String, Float, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class InvalidationModel(BaseModel):
+    __tablename__ = "invalidations"
+    # без AUTOINCREMENT SQLite перевикористає id після чистки і воркери пропустять події
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # воркер, який опублікував подію, сам її вже застосував
+    origin: Mapped[str] = mapped_column(String(32), nullable=False)
+    kind: Mapped[str] = mapped_column(String(30), nullable=False)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[float] = mapped_column(Float, index=True, nullable=False)
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, DateTime, Float, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class JobModel(BaseModel):
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    type: Mapped[str] = mapped_column(String(50), nullable=False)
+    # queued -> running -> succeeded | failed | cancelled
+    status: Mapped[str] = mapped_column(String(20), index=True, nullable=False, default="queued")
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    params: Mapped[Optional[str]] = mapped_column(Text)
+    result: Mapped[Optional[str]] = mapped_column(Text)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    # процес-власник оновлює поки задача в нього; застарілий heartbeat - задачу може забрати інший воркер
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
@@ -2,9 +2,10 @@ from sqlalchemy import String, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import BaseModel
+from .sync import SyncMixin
 
 
-class RecipeIngredientModel(BaseModel):
+class RecipeIngredientModel(SyncMixin, BaseModel):
     __tablename__ = "recipe_ingredients"
 
     recipe_id: Mapped[int] = mapped_column(ForeignKey("recipes.id"), primary_key=True)
@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class RevokedTokenModel(BaseModel):
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    jti: Mapped[str] = mapped_column(String(32), unique=True, index=True, nullable=False)
+    # після закінчення терміну дії токена запис більше не потрібен
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True, nullable=False)
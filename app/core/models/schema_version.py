@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import BaseModel
+
+
+class SchemaVersionModel(BaseModel):
+    __tablename__ = "schema_version"
+
+    # завжди один рядок
+    id: Mapped[int] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, event, func, inspect, insert, update
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from .base import BaseModel
+
+
+class SyncMixin:
+    # на існуючих базах ці колонки додає і заповнює міграція 2 (`python -m app.migrate`)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+    # номер зміни з глобальної послідовності, по ньому працює GET /sync
+    change_seq: Mapped[int] = mapped_column(Integer, index=True, nullable=False, default=0)
+
+
+class ChangeSequenceModel(BaseModel):
+    __tablename__ = "change_sequence"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class TombstoneModel(BaseModel):
+    __tablename__ = "tombstones"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    entity: Mapped[str] = mapped_column(String(50), nullable=False)
+    # JSON з первинним ключем видаленого рядка
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    change_seq: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+
+
+def primary_key_of(obj, old: bool = False) -> dict:
+    state = inspect(obj)
+    key = {}
+    for column in state.mapper.primary_key:
+        attribute = state.mapper.get_property_by_column(column).key
+        history = state.attrs[attribute].history
+        key[attribute] = history.deleted[0] if old and history.deleted else getattr(obj, attribute)
+    return key
+
+
+def next_change_seq(session: Session, count: int) -> int:
+    # рядок лічильника блокується до COMMIT, тому номери зростають у порядку комітів
+    connection = session.connection()
+    last = connection.execute(
+        update(ChangeSequenceModel)
+        .where(ChangeSequenceModel.id == 1)
+        .values(value=ChangeSequenceModel.value + count)
+        .returning(ChangeSequenceModel.value)
+    ).scalar()
+    if last is None:
+        connection.execute(insert(ChangeSequenceModel).values(id=1, value=count))
+        last = count
+    return last - count + 1
+
+
+@event.listens_for(Session, "before_flush")
+def assign_change_seq(session: Session, _flush_context, _instances):
+    changed = [obj for obj in session.new if isinstance(obj, SyncMixin)]
+    tombstones = []
+    for obj in session.dirty:
+        if isinstance(obj, SyncMixin) and session.is_modified(obj, include_collections=False):
+            changed.append(obj)
+            # зміна первинного ключа для клієнта - це видалення старого рядка
+            old_key = primary_key_of(obj, old=True)
+            if old_key != primary_key_of(obj):
+                tombstones.append((obj.__tablename__, old_key))
+    tombstones.extend(
+        (obj.__tablename__, primary_key_of(obj)) for obj in session.deleted if isinstance(obj, SyncMixin)
+    )
+    if not changed and not tombstones:
+        return
+
+    seq = next_change_seq(session, len(changed) + len(tombstones))
+    for obj in changed:
+        obj.change_seq = seq
+        seq += 1
+    for entity, key in tombstones:
+        session.add(TombstoneModel(entity=entity, key=json.dumps(key, sort_keys=True), change_seq=seq))
+        seq += 1
@@ -18,4 +18,5 @@ class UserModel(BaseModel):
 
     recipes: Mapped[List["RecipeModel"]] = relationship(back_populates="author")
     saved_recipes: Mapped[List["SavedRecipeModel"]] = relationship(back_populates="user")
+    refresh_tokens: Mapped[List["RefreshTokenModel"]] = relationship(back_populates="user", cascade="all, delete-orphan")
     
\ No newline at end of file
@@ -0,0 +1,120 @@
+import json
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack")
+
+# формат відповіді, узгоджений для поточного запиту
+response_format: ContextVar[str] = ContextVar("response_format", default=JSON)
+
+
+def preferred_format(accept: str) -> str:
+    # JSON лишається за замовчуванням: msgpack лише коли клієнт явно ставить його не нижче
+    if msgpack is None or not accept:
+        return JSON
+    weights = {}
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        weights[media_type.lower()] = max(quality, weights.get(media_type.lower(), 0.0))
+    msgpack_quality = max(weights.get(alias, 0.0) for alias in MSGPACK_ALIASES)
+    json_quality = max(weights.get(JSON, 0.0), weights.get("application/*", 0.0), weights.get("*/*", 0.0))
+    return MSGPACK if msgpack_quality > 0 and msgpack_quality >= json_quality else JSON
+
+
+class NegotiatedResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # вміст уже пройшов через response_model і jsonable_encoder, тож msgpack пакує його напряму
+        if response_format.get() == MSGPACK:
+            self.media_type = MSGPACK
+            return msgpack.packb(content)
+        return super().render(content)
+
+    def init_headers(self, headers: Optional[dict] = None) -> None:
+        super().init_headers(headers)
+        self.raw_headers.append((b"vary", b"Accept"))
+
+
+# помилки маршрутів і валідації йдуть у тому ж форматі, що й успішні відповіді; відмови зовнішніх
+# middleware (ліміти, дедлайни, idempotency) формуються до узгодження формату і лишаються JSON
+async def negotiated_http_exception(_request: Request, exc: HTTPException) -> Response:
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=headers)
+    return NegotiatedResponse({"detail": exc.detail}, status_code=exc.status_code, headers=headers)
+
+
+async def negotiated_validation_error(_request: Request, exc: RequestValidationError) -> Response:
+    return NegotiatedResponse({"detail": jsonable_encoder(exc.errors())}, status_code=422)
+
+
+class ContentNegotiationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        token = response_format.set(preferred_format(headers.get(b"accept", b"").decode("latin-1")))
+        try:
+            content_type = headers.get(b"content-type", b"").split(b";")[0].strip().decode("latin-1").lower()
+            if content_type in MSGPACK_ALIASES:
+                if msgpack is None:
+                    response = JSONResponse(status_code=415, content={"detail": "MessagePack is not supported"})
+                    return await response(scope, receive, send)
+                decoded = await self._decode_msgpack_body(scope, receive)
+                if decoded is None:
+                    response = NegotiatedResponse(status_code=400, content={"detail": "Malformed MessagePack body"})
+                    return await response(scope, receive, send)
+                scope, receive = decoded
+            await self.app(scope, receive, send)
+        finally:
+            response_format.reset(token)
+
+    async def _decode_msgpack_body(self, scope, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        try:
+            # валідація FastAPI працює з JSON: переписуємо тіло й заголовки, обробники лишаються без змін
+            body = json.dumps(msgpack.unpackb(body)).encode()
+        except (ValueError, TypeError):
+            return None
+        # scope змінюємо на місці: зовнішні middleware читають з нього маршрут після роутингу
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"] if name not in (b"content-type", b"content-length")
+        ] + [(b"content-type", JSON.encode()), (b"content-length", str(len(body)).encode())]
+        body_sent = False
+
+        async def replay_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return scope, replay_body
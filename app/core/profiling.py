@@ -0,0 +1,177 @@
+import asyncio
+import cProfile
+import json
+import os
+import random
+import re
+import secrets
+import time
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+# значення заголовка X-Profile, з яким запит профілюється; без токена - лише семплювання
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# найстаріші профілі видаляються, коли їх більше
+PROFILE_MAX_FILES = 50
+
+PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+# [кількість запитів, сумарний час у мс] для запиту, що зараз профілюється
+sql_stats: ContextVar[Optional[list]] = ContextVar("sql_stats", default=None)
+
+
+def _before_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    conn.info["profile_query_started"] = time.perf_counter()
+
+
+def _after_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    stats = sql_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += (time.perf_counter() - conn.info.pop("profile_query_started", time.perf_counter())) * 1000
+
+
+class RequestProfiler:
+    def __init__(
+            self,
+            token: str = PROFILE_TOKEN,
+            sample_rate: float = PROFILE_SAMPLE_RATE,
+            directory: str = PROFILE_DIR,
+            max_files: int = PROFILE_MAX_FILES,
+    ):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.engine: Optional[AsyncEngine] = None
+        # і cProfile, і pyinstrument профілюють увесь потік: одночасно лише один запит
+        self._active = False
+
+    @property
+    def backend(self) -> str:
+        return "pyinstrument" if Profiler is not None else "cprofile"
+
+    def install(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+
+    def uninstall(self) -> None:
+        self.engine = None
+
+    def should_profile(self, scope: dict) -> bool:
+        if self._active:
+            return False
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    return secrets.compare_digest(value, self.token.encode())
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def profiles(self) -> List[dict]:
+        if not self.directory.is_dir():
+            return []
+        profiles = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            profiles.append(json.loads(path.read_text()))
+        return profiles
+
+    def artifact(self, profile_id: str) -> Optional[Path]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        for suffix in (".html", ".prof"):
+            path = self.directory / f"{profile_id}{suffix}"
+            if path.is_file():
+                return path
+        return None
+
+    async def run(self, app, scope, receive, send) -> None:
+        profile_id = f"{time.time_ns() // 1_000_000}-{uuid.uuid4().hex[:8]}"
+        response_status = {}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                response_status["code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        self._active = True
+        stats = [0, 0.0]
+        stats_token = sql_stats.set(stats)
+        # слухачі подій рушія живуть лише під час профілювання: решта запитів їх не викликає
+        engine = self.engine
+        if engine is not None:
+            event.listen(engine.sync_engine, "before_cursor_execute", _before_execute)
+            event.listen(engine.sync_engine, "after_cursor_execute", _after_execute)
+        profiler = Profiler(async_mode="enabled") if Profiler is not None else cProfile.Profile()
+        started = time.perf_counter()
+        if Profiler is not None:
+            profiler.start()
+        else:
+            profiler.enable()
+        try:
+            await app(scope, receive, send_with_id)
+        finally:
+            if Profiler is not None:
+                profiler.stop()
+            else:
+                profiler.disable()
+            duration_ms = (time.perf_counter() - started) * 1000
+            if engine is not None:
+                event.remove(engine.sync_engine, "before_cursor_execute", _before_execute)
+                event.remove(engine.sync_engine, "after_cursor_execute", _after_execute)
+            sql_stats.reset(stats_token)
+            self._active = False
+            route = scope.get("route")
+            metadata = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", None),
+                "status": response_status.get("code"),
+                "duration_ms": round(duration_ms, 2),
+                "sql_count": stats[0],
+                "sql_ms": round(stats[1], 2),
+                "backend": self.backend,
+                "created_at": time.time(),
+            }
+            # запис на диск - у потоці, відповідь клієнту вже відправлена
+            await asyncio.to_thread(self._save, metadata, profiler)
+
+    def _save(self, metadata: dict, profiler) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile_id = metadata["id"]
+        if Profiler is not None:
+            (self.directory / f"{profile_id}.html").write_text(profiler.output_html())
+        else:
+            profiler.dump_stats(self.directory / f"{profile_id}.prof")
+        (self.directory / f"{profile_id}.json").write_text(json.dumps(metadata))
+
+        # id починається з мітки часу, тож сортування за іменем - за віком
+        for stale in sorted(self.directory.glob("*.json"))[:-self.max_files]:
+            for suffix in (".json", ".html", ".prof"):
+                stale.with_suffix(suffix).unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # непрофільований запит - лише перевірка заголовка
+        if scope["type"] != "http" or not request_profiler.should_profile(scope):
+            return await self.app(scope, receive, send)
+        await request_profiler.run(self.app, scope, receive, send)
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,60 @@
+from sqlalchemy import bindparam, event, select
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.models.category import CategoryModel
+from app.core.models.ingredient import IngredientModel
+from app.core.models.recipe import RecipeModel
+from app.core.models.user import UserModel
+
+# Запити гарячого шляху будуються один раз: ключ кешу компіляції в екземплярі select
+# мемоізується, тож на кожен виклик лишається лише пошук готового SQL. Параметри - через bindparam:
+# session.execute(RECIPE_BY_ID, {"id": recipe_id})
+RECIPE_BY_ID = select(RecipeModel).where(RecipeModel.id == bindparam("id"))
+INGREDIENT_BY_ID = select(IngredientModel).where(IngredientModel.id == bindparam("id"))
+CATEGORY_BY_ID = select(CategoryModel).where(CategoryModel.id == bindparam("id"))
+USER_BY_ID = select(UserModel).where(UserModel.id == bindparam("id"))
+USER_BY_USERNAME = select(UserModel).where(UserModel.username == bindparam("username"))
+
+
+class CompiledCacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self.engine = None
+
+    def install(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+
+    def uninstall(self) -> None:
+        if self.engine is None:
+            return
+        event.remove(self.engine.sync_engine, "after_cursor_execute", self._after_execute)
+        self.engine = None
+
+    def reset(self) -> None:
+        self.hits = self.misses = self.uncached = 0
+
+    def stats(self) -> dict:
+        cached = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            # текстові запити і DDL кешу не мають
+            "uncached": self.uncached,
+            "hit_rate": round(self.hits / cached, 4) if cached else None,
+        }
+
+    def _after_execute(self, _conn, _cursor, _statement, _parameters, context, _executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit == CACHE_HIT:
+            self.hits += 1
+        elif cache_hit == CACHE_MISS:
+            self.misses += 1
+        else:
+            self.uncached += 1
+
+
+compiled_cache = CompiledCacheStats()
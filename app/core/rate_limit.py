@@ -0,0 +1,182 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Annotated, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+# порожньо - лічильники в пам'яті процесу; шлях до файлу - спільні для всіх воркерів на хості
+RATE_LIMIT_DB = os.environ.get("RATE_LIMIT_DB", "")
+RATE_LIMIT_SWEEP_SECONDS = 60
+
+# (ємність, секунд на повне поповнення)
+LOGIN_PER_IP = (20, 60)
+LOGIN_PER_USERNAME = (5, 60)
+SIGNUP_PER_IP = (5, 600)
+
+
+class Bucket(NamedTuple):
+    tokens: float
+    updated: float
+    # коли відро знову буде повним; після цього запис можна видалити
+    full_at: float
+
+
+class RateDecision(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int
+    retry_after: int
+
+
+def take_token(bucket: Optional[Bucket], now: float, capacity: int, period: float) -> Tuple[Bucket, RateDecision]:
+    rate = capacity / period
+    tokens = capacity if bucket is None else min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+    updated = Bucket(tokens, now, now + (capacity - tokens) / rate)
+    decision = RateDecision(
+        allowed=allowed,
+        limit=capacity,
+        remaining=math.floor(tokens),
+        reset=math.ceil(updated.full_at - now),
+        retry_after=0 if allowed else math.ceil((1 - tokens) / rate),
+    )
+    return updated, decision
+
+
+class MemoryBucketStore:
+    def __init__(self):
+        self._buckets: Dict[str, Bucket] = {}
+        self._swept_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def take(self, key: str, capacity: int, period: float) -> RateDecision:
+        now = time.monotonic()
+        bucket, decision = take_token(self._buckets.get(key), now, capacity, period)
+        self._buckets[key] = bucket
+        if now - self._swept_at >= RATE_LIMIT_SWEEP_SECONDS:
+            self.sweep(now)
+        return decision
+
+    def sweep(self, now: float) -> None:
+        # повне відро нічим не відрізняється від відсутнього
+        self._swept_at = now
+        for key in [key for key, bucket in self._buckets.items() if bucket.full_at <= now]:
+            del self._buckets[key]
+
+    def close(self) -> None:
+        self._buckets.clear()
+
+
+class SQLiteBucketStore:
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets "
+            "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._swept_at = time.time()
+
+    async def take(self, key: str, capacity: int, period: float) -> RateDecision:
+        return await asyncio.to_thread(self._take, key, capacity, period)
+
+    def _take(self, key: str, capacity: int, period: float) -> RateDecision:
+        # годинник стінний: відра спільні для кількох процесів
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE: читання і запис відра - одна транзакція навіть між процесами
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._connection.execute(
+                    "SELECT tokens, updated, full_at FROM rate_buckets WHERE key = ?", (key,)
+                ).fetchone()
+                bucket, decision = take_token(Bucket(*row) if row else None, now, capacity, period)
+                self._connection.execute(
+                    "INSERT INTO rate_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, "
+                    "full_at = excluded.full_at",
+                    (key, *bucket),
+                )
+                if now - self._swept_at >= RATE_LIMIT_SWEEP_SECONDS:
+                    self._swept_at = now
+                    self._connection.execute("DELETE FROM rate_buckets WHERE full_at <= ?", (now,))
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return decision
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class RateLimiter:
+    def __init__(self, path: str = RATE_LIMIT_DB):
+        self.path = path
+        self.store = MemoryBucketStore()
+        self.rejected = 0
+
+    def open(self) -> None:
+        self.store.close()
+        self.store = SQLiteBucketStore(self.path) if self.path else MemoryBucketStore()
+
+    def close(self) -> None:
+        self.store.close()
+
+    async def check(self, response: Response, rules: List[Tuple[str, int, float]]) -> None:
+        # найжорсткіше з правил визначає заголовки; вичерпане правило зупиняє перевірку решти
+        tightest = None
+        for key, capacity, period in rules:
+            decision = await self.store.take(key, capacity, period)
+            if tightest is None or not decision.allowed or decision.remaining < tightest.remaining:
+                tightest = decision
+            if not decision.allowed:
+                break
+        headers = {
+            "RateLimit-Limit": str(tightest.limit),
+            "RateLimit-Remaining": str(tightest.remaining),
+            "RateLimit-Reset": str(tightest.reset),
+        }
+        if not tightest.allowed:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, try again later",
+                headers={**headers, "Retry-After": str(tightest.retry_after)},
+            )
+        response.headers.update(headers)
+
+
+rate_limiter = RateLimiter()
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def login_rate_limit(
+        request: Request,
+        response: Response,
+        form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+) -> None:
+    # та сама форма, що й в обробнику: FastAPI кешує залежність у межах запиту
+    username = form_data.username.lower()
+    await rate_limiter.check(response, [
+        (f"login:ip:{client_ip(request)}", *LOGIN_PER_IP),
+        (f"login:user:{username}", *LOGIN_PER_USERNAME),
+    ])
+
+
+async def signup_rate_limit(request: Request, response: Response) -> None:
+    await rate_limiter.check(response, [(f"signup:ip:{client_ip(request)}", *SIGNUP_PER_IP)])
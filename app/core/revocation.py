@@ -0,0 +1,102 @@
+import hashlib
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.refresh_token import RefreshTokenModel
+from app.core.models.revoked_token import RevokedTokenModel
+
+REVOCATION_FILTER_CAPACITY = 100_000
+REVOCATION_FILTER_ERROR_RATE = 0.001
+REVOCATION_PRUNE_INTERVAL_SECONDS = 600
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # подвійне хешування: k позицій з двох половин одного дайджесту
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+# Bloom фільтр відповідає "не відкликаний" без звернення до множини,
+# точна множина перевіряється лише при спрацюванні фільтра
+class RevocationList:
+    def __init__(self, capacity: int = REVOCATION_FILTER_CAPACITY, error_rate: float = REVOCATION_FILTER_ERROR_RATE):
+        self.error_rate = error_rate
+        self._revoked: Dict[str, datetime] = {}
+        self._filter = BloomFilter(capacity, error_rate)
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._filter and jti in self._revoked
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        self._revoked[jti] = expires_at
+        if len(self._revoked) <= self._filter.capacity:
+            self._filter.add(jti)
+            return
+        # задача prune_expired_tokens чистить пам'ять лише свого воркера, решта скидає прострочені тут
+        self.prune(utcnow())
+        if len(self._revoked) > self._filter.capacity:
+            self._rebuild(self._filter.capacity * 2)
+
+    def load(self, entries: Iterable[Tuple[str, datetime]]) -> None:
+        self._revoked = dict(entries)
+        self._rebuild(max(REVOCATION_FILTER_CAPACITY, len(self._revoked) * 2))
+
+    def prune(self, now: datetime) -> int:
+        expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+        if not expired:
+            return 0
+        for jti in expired:
+            del self._revoked[jti]
+        # з Bloom фільтра не можна видаляти, тому будуємо його заново
+        self._rebuild(self._filter.capacity)
+        return len(expired)
+
+    def _rebuild(self, capacity: int) -> None:
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._revoked:
+            bloom.add(jti)
+        self._filter = bloom
+
+
+revoked_tokens = RevocationList()
+
+
+async def load_revoked_tokens(session: AsyncSession) -> None:
+    query = select(RevokedTokenModel.jti, RevokedTokenModel.expires_at).where(RevokedTokenModel.expires_at > utcnow())
+    result = await session.execute(query)
+    revoked_tokens.load(result.all())
+
+
+async def prune_expired_tokens(session: AsyncSession) -> None:
+    now = utcnow()
+    await session.execute(delete(RevokedTokenModel).where(RevokedTokenModel.expires_at <= now))
+    await session.execute(delete(RefreshTokenModel).where(RefreshTokenModel.expires_at <= now))
+    await session.commit()
+    revoked_tokens.prune(now)
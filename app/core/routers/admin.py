@@ -0,0 +1,55 @@
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app import backup
+from app.core import auth
+from app.core.profiling import request_profiler
+from app.core.settings.db import db
+from app.core.slow_queries import SLOW_QUERY_MAX_FINGERPRINTS, slow_queries
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(auth.admin_required)])
+
+
+@router.get(path="/slow_queries")
+async def list_slow_queries(
+    full_scans_only: bool = False, limit: int = Query(default=50, ge=1, le=SLOW_QUERY_MAX_FINGERPRINTS)
+):
+    return {
+        "threshold_ms": slow_queries.threshold * 1000,
+        "queries": slow_queries.entries(full_scans_only)[:limit],
+    }
+
+
+@router.delete(path="/slow_queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_slow_queries():
+    slow_queries.reset()
+
+
+@router.get(path="/profiles")
+async def list_profiles():
+    return {"backend": request_profiler.backend, "profiles": request_profiler.profiles()}
+
+
+@router.get(path="/profiles/{profile_id}")
+async def download_profile(profile_id: str):
+    path = request_profiler.artifact(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=path.name)
+
+
+@router.get(path="/backup")
+async def download_backup(rate: int = Query(default=backup.BACKUP_MAX_BYTES_PER_SECOND, ge=0)):
+    # знімок тієї бази, до якої підключений застосунок, а не типового DATABASE_URL
+    try:
+        backup.database_path(db.url)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(error))
+    filename = time.strftime("snapshot-%Y%m%dT%H%M%SZ.db.gz", time.gmtime())
+    return StreamingResponse(
+        backup.stream_snapshot(db.url, bytes_per_second=rate),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
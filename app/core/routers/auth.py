@@ -1,12 +1,25 @@
-from typing import Annotated
+from datetime import datetime, timezone
+from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.auth import create_access_token
+from app.core import queries
+from app.core.auth import (
+    create_access_token,
+    create_refresh_token,
+    decode_access_token,
+    hash_refresh_token,
+    oauth2_scheme,
+)
+from app.core.models.refresh_token import RefreshTokenModel
 from app.core.models.user import UserModel
+from app.core.models.revoked_token import RevokedTokenModel
+from app.core.invalidation import invalidations
+from app.core.rate_limit import login_rate_limit
+from app.core.schemas.auth import TokenResponseSchema, RefreshTokenSchema
 from app.core.settings.db import db
 from app.core.utils import verify_password
 
@@ -14,13 +27,21 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 SessionDepend = Annotated[AsyncSession, Depends(db.get_session)]
 
 
-@router.post("/login")
+async def issue_tokens(session: AsyncSession, user_id: int, username: str) -> dict:
+    refresh_token, token_hash, expires_at = create_refresh_token()
+    session.add(RefreshTokenModel(user_id=user_id, token_hash=token_hash, expires_at=expires_at))
+    await session.flush()
+
+    access_token = create_access_token(data={"sub": username})
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+@router.post("/login", response_model=TokenResponseSchema, dependencies=[Depends(login_rate_limit)])
 async def login(
         form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
         session: SessionDepend
 ):
-    query = select(UserModel).where(UserModel.username == form_data.username)
-    result = await session.execute(query)
+    result = await session.execute(queries.USER_BY_USERNAME, {"username": form_data.username})
     user = result.scalars().first()
 
     if not user or not verify_password(form_data.password, user.password):
@@ -30,6 +51,58 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": user.username})
+    async def unit(write_session: AsyncSession):
+        return await issue_tokens(write_session, user.id, user.username)
+
+    return await db.write(session, unit)
+
+
+@router.post("/refresh", response_model=TokenResponseSchema)
+async def refresh(payload: RefreshTokenSchema, session: SessionDepend):
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    # один індексований запит по хешу токена, без bcrypt
+    query = (
+        select(RefreshTokenModel.id, RefreshTokenModel.user_id, RefreshTokenModel.expires_at, UserModel.username)
+        .join(UserModel, UserModel.id == RefreshTokenModel.user_id)
+        .where(RefreshTokenModel.token_hash == hash_refresh_token(payload.refresh_token))
+    )
+    result = await session.execute(query)
+    stored = result.first()
+    if stored is None:
+        raise invalid_token_exception
+
+    # ротація: старий токен одноразовий, тому видаляємо його до видачі нового
+    async def unit(write_session: AsyncSession):
+        deleted = await write_session.execute(delete(RefreshTokenModel).where(RefreshTokenModel.id == stored.id))
+        if deleted.rowcount != 1 or stored.expires_at < datetime.now(timezone.utc).replace(tzinfo=None):
+            raise invalid_token_exception
+        return await issue_tokens(write_session, stored.user_id, stored.username)
+
+    return await db.write(session, unit)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+        token: Annotated[str, Depends(oauth2_scheme)],
+        session: SessionDepend,
+        payload: Optional[RefreshTokenSchema] = None,
+):
+    claims = decode_access_token(token)
+    expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None)
+
+    async def unit(write_session: AsyncSession):
+        if payload is not None:
+            await write_session.execute(
+                delete(RefreshTokenModel).where(RefreshTokenModel.token_hash == hash_refresh_token(payload.refresh_token))
+            )
+        write_session.add(RevokedTokenModel(jti=claims["jti"], expires_at=expires_at))
+        await write_session.flush()
 
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    await db.write(session, unit)
+    await invalidations.publish("token_revoked", {"jti": claims["jti"], "expires_at": expires_at.isoformat()})
+    return None
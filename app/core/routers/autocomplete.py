@@ -0,0 +1,26 @@
+from enum import Enum
+
+from fastapi import APIRouter, Query
+
+from app.core.autocomplete import autocomplete
+from app.core.schemas.autocomplete import AutocompleteItemSchema
+
+router = APIRouter(tags=["autocomplete"])
+
+
+class AutocompleteKind(str, Enum):
+    recipe = "recipe"
+    ingredient = "ingredient"
+
+
+@router.get(
+    path="/autocomplete",
+    response_model=list[AutocompleteItemSchema],
+)
+async def get_autocomplete(
+        q: str = Query(min_length=1, max_length=100),
+        kind: AutocompleteKind = AutocompleteKind.recipe,
+        limit: int = Query(default=10, ge=1, le=50),
+):
+    index = autocomplete.recipes if kind == AutocompleteKind.recipe else autocomplete.ingredients
+    return index.search(q, limit)
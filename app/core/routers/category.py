@@ -2,14 +2,19 @@ import traceback
 from typing import Annotated, Sequence
 
 import sqlalchemy
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.core import auth
+from app.core import auth, queries
+from app.core.cooccurrence import CATEGORY_TOP_PAIRS, PAIRS_RETRY_AFTER_SECONDS, ingredient_pairs
+from app.core.jobs import refresh_ingredient_pairs
 from app.core.models.category import CategoryModel
 from app.core.schemas.category import CategoryResponseSchema, CategoryCreateSchema
+from app.core.schemas.cooccurrence import CategoryPairSchema
+from app.core.invalidation import invalidations
 from app.core.settings.db import db
+from app.core.singleflight import reads
 from fastapi import APIRouter
 
 SessionDepend = Annotated[AsyncSession, Depends(db.get_session)]
@@ -23,13 +28,16 @@ router = APIRouter(prefix="/categories", tags=["categories"])
     status_code=status.HTTP_201_CREATED,
 )
 async def create_category(category: CategoryCreateSchema, session: SessionDepend):
-    new_category = CategoryModel(
-        name=category.name,
-    )
-    session.add(new_category)
-    await session.commit()
-    await session.refresh(new_category)
-    return new_category
+    async def unit(write_session: AsyncSession):
+        new_category = CategoryModel(
+            name=category.name,
+        )
+        write_session.add(new_category)
+        await write_session.flush()
+        await write_session.refresh(new_category)
+        return new_category
+
+    return await db.write(session, unit)
 
 
 @router.get(
@@ -48,27 +56,68 @@ async def get_categories(session: SessionDepend) -> Sequence[CategoryModel]:
     response_model=CategoryResponseSchema,
 )
 async def get_category(category_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(CategoryModel).where(CategoryModel.id == category_id))
-    category = result.scalars().first()
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
-    return category
+    async def load():
+        result = await session.execute(queries.CATEGORY_BY_ID, {"id": category_id})
+        category = result.scalars().first()
+        if not category:
+            raise HTTPException(status_code=404, detail="Category not found")
+        return CategoryResponseSchema.model_validate(category, from_attributes=True)
+
+    return await reads.do(("/categories/{category_id}", category_id), load)
+
+@router.get(
+    path="/{category_id}/top_pairs",
+    response_model=list[CategoryPairSchema],
+)
+async def get_category_top_pairs(
+        category_id: int,
+        session: SessionDepend,
+        limit: int = Query(default=10, ge=1, le=CATEGORY_TOP_PAIRS),
+):
+    # відповідь з готової моделі; перерахунок матриці - у фоновій задачі
+    model = ingredient_pairs.current
+    await refresh_ingredient_pairs()
+    if model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Ingredient pairs are being computed, retry later",
+            headers={"Retry-After": str(PAIRS_RETRY_AFTER_SECONDS)},
+        )
+    if category_id not in model.category_pairs:
+        result = await session.execute(queries.CATEGORY_BY_ID, {"id": category_id})
+        if result.scalars().first() is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+    return [
+        {
+            "first": {"id": first_id, "name": model.names.get(first_id, "")},
+            "second": {"id": second_id, "name": model.names.get(second_id, "")},
+            "recipes": recipes,
+            "lift": lift,
+            "pmi": pmi,
+        }
+        for first_id, second_id, recipes, lift, pmi in model.category_pairs.get(category_id, [])[:limit]
+    ]
 
 @router.put(
     path="/{category_id}",
     response_model=CategoryResponseSchema,
 )
 async def update_category(category_id: int, category: CategoryCreateSchema, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(CategoryModel).where(CategoryModel.id == category_id))
-    existing_category = result.scalars().first()
-    if not existing_category:
-        raise HTTPException(status_code=404, detail="Category not found")
-    for field, value in  category.model_dump().items():
-        setattr(existing_category, field, value)
-    session.add(existing_category)
-
-    await session.commit()
-    await session.refresh(existing_category)
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.CATEGORY_BY_ID, {"id": category_id})
+        existing_category = result.scalars().first()
+        if not existing_category:
+            raise HTTPException(status_code=404, detail="Category not found")
+        for field, value in  category.model_dump().items():
+            setattr(existing_category, field, value)
+        write_session.add(existing_category)
+
+        await write_session.flush()
+        await write_session.refresh(existing_category)
+        return existing_category
+
+    existing_category = await db.write(session, unit)
+    await invalidations.publish("category", {"id": category_id})
     return existing_category
 
 @router.delete(
@@ -77,10 +126,14 @@ async def update_category(category_id: int, category: CategoryCreateSchema, sess
     dependencies=[Depends(auth.access_token_required)]
 )
 async def delete_category(category_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(CategoryModel).where(CategoryModel.id == category_id))
-    existing_category = result.scalars().first()
-    if not existing_category:
-        raise HTTPException(status_code=404, detail="Category not found")
-    await session.delete(existing_category)
-    await session.commit()
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.CATEGORY_BY_ID, {"id": category_id})
+        existing_category = result.scalars().first()
+        if not existing_category:
+            raise HTTPException(status_code=404, detail="Category not found")
+        await write_session.delete(existing_category)
+        await write_session.flush()
+
+    await db.write(session, unit)
+    await invalidations.publish("category", {"id": category_id})
     return None
\ No newline at end of file
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from app.core import auth
+from app.core.health import CachedCheck, loop_lag, pool_stats
+from app.core.settings.db import db
+from app.core.warmup import readiness
+
+router = APIRouter(prefix="/health", tags=["System"])
+
+database_check = CachedCheck(db.ping)
+
+
+@router.get(path="")
+async def health():
+    ok = await database_check.get()
+    return {"status": "ok" if ok else "error", "ready": readiness.ready, "startup_ms": readiness.startup_ms}
+
+
+@router.get(path="/live")
+async def health_live():
+    # без I/O: процес живий, якщо цикл подій узагалі відповідає
+    return {"status": "ok"}
+
+
+@router.get(path="/ready")
+async def health_ready():
+    database = await database_check.get()
+    ready = database and readiness.ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "database": database, "warmed_up": readiness.ready},
+    )
+
+
+# стан пулів і циклу подій - внутрішні дані, публічні лише проби live/ready
+@router.get(path="/diagnostics", dependencies=[Depends(auth.admin_required)])
+async def health_diagnostics():
+    return {
+        "pool": pool_stats(db.engine.pool) if db.engine else None,
+        "write_pool": pool_stats(db.write_engine.pool) if db.write_engine else None,
+        "loop_lag": loop_lag.stats(),
+        "startup_ms": readiness.startup_ms,
+    }
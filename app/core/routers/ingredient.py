@@ -1,14 +1,19 @@
 from typing import Annotated, Sequence
 
 import sqlalchemy
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.core import auth
+from app.core import auth, queries
+from app.core.cooccurrence import PAIRS_RETRY_AFTER_SECONDS, PAIRS_TOP_K, ingredient_pairs
+from app.core.jobs import refresh_ingredient_pairs
 from app.core.models.ingredient import IngredientModel
+from app.core.schemas.cooccurrence import IngredientPairSchema
 from app.core.schemas.ingredient import IngredientResponseSchema, IngredientCreateSchema, IngredientPartialUpdateSchema
+from app.core.invalidation import invalidations
 from app.core.settings.db import db
+from app.core.singleflight import reads
 from fastapi import APIRouter
 
 SessionDepend = Annotated[AsyncSession, Depends(db.get_session)]
@@ -22,13 +27,18 @@ router = APIRouter(prefix="/ingredients", tags=["ingredients"])
     status_code=status.HTTP_201_CREATED,
 )
 async def create_ingredient(ingredient: IngredientCreateSchema, session: SessionDepend):
-    new_ingredient = IngredientModel(
-        name=ingredient.name,
-        calories_per_100g=ingredient.calories_per_100g
-    )
-    session.add(new_ingredient)
-    await session.commit()
-    await session.refresh(new_ingredient)
+    async def unit(write_session: AsyncSession):
+        new_ingredient = IngredientModel(
+            name=ingredient.name,
+            calories_per_100g=ingredient.calories_per_100g
+        )
+        write_session.add(new_ingredient)
+        await write_session.flush()
+        await write_session.refresh(new_ingredient)
+        return new_ingredient
+
+    new_ingredient = await db.write(session, unit)
+    await invalidations.publish("ingredient", {"id": new_ingredient.id, "name": new_ingredient.name})
     return new_ingredient
 
 
@@ -48,11 +58,43 @@ async def get_ingredients(session: SessionDepend) -> Sequence[IngredientModel]:
     response_model=IngredientResponseSchema,
 )
 async def get_ingredient(ingredient_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(IngredientModel).where(IngredientModel.id == ingredient_id))
-    ingredient = result.scalars().first()
-    if not ingredient:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    return ingredient
+    async def load():
+        result = await session.execute(queries.INGREDIENT_BY_ID, {"id": ingredient_id})
+        ingredient = result.scalars().first()
+        if not ingredient:
+            raise HTTPException(status_code=404, detail="Ingredient not found")
+        return IngredientResponseSchema.model_validate(ingredient, from_attributes=True)
+
+    return await reads.do(("/ingredients/{ingredient_id}", ingredient_id), load)
+
+
+@router.get(
+    path="/{ingredient_id}/pairs",
+    response_model=list[IngredientPairSchema],
+)
+async def get_ingredient_pairs(
+        ingredient_id: int,
+        session: SessionDepend,
+        limit: int = Query(default=10, ge=1, le=PAIRS_TOP_K),
+):
+    # відповідь з готової моделі; перерахунок матриці - у фоновій задачі
+    model = ingredient_pairs.current
+    await refresh_ingredient_pairs()
+    if model is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Ingredient pairs are being computed, retry later",
+            headers={"Retry-After": str(PAIRS_RETRY_AFTER_SECONDS)},
+        )
+    if ingredient_id not in model.names:
+        # інгредієнт міг з'явитись після останньої перебудови
+        result = await session.execute(queries.INGREDIENT_BY_ID, {"id": ingredient_id})
+        if result.scalars().first() is None:
+            raise HTTPException(status_code=404, detail="Ingredient not found")
+    return [
+        {"ingredient": {"id": other_id, "name": model.names.get(other_id, "")}, "recipes": recipes, "lift": lift, "pmi": pmi}
+        for other_id, recipes, lift, pmi in model.pairs.get(ingredient_id, [])[:limit]
+    ]
 
 
 @router.put(
@@ -60,16 +102,21 @@ async def get_ingredient(ingredient_id: int, session: SessionDepend):
     response_model=IngredientResponseSchema,
 )
 async def update_ingredient(ingredient_id: int, ingredient: IngredientCreateSchema, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(IngredientModel).where(IngredientModel.id == ingredient_id))
-    existing_ingredient = result.scalars().first()
-    if not existing_ingredient:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    for field, value in  ingredient.model_dump().items():
-        setattr(existing_ingredient, field, value)
-    session.add(existing_ingredient)
-
-    await session.commit()
-    await session.refresh(existing_ingredient)
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.INGREDIENT_BY_ID, {"id": ingredient_id})
+        existing_ingredient = result.scalars().first()
+        if not existing_ingredient:
+            raise HTTPException(status_code=404, detail="Ingredient not found")
+        for field, value in  ingredient.model_dump().items():
+            setattr(existing_ingredient, field, value)
+        write_session.add(existing_ingredient)
+
+        await write_session.flush()
+        await write_session.refresh(existing_ingredient)
+        return existing_ingredient
+
+    existing_ingredient = await db.write(session, unit)
+    await invalidations.publish("ingredient", {"id": ingredient_id, "name": existing_ingredient.name})
     return existing_ingredient
 
 
@@ -78,16 +125,21 @@ async def update_ingredient(ingredient_id: int, ingredient: IngredientCreateSche
     response_model=IngredientResponseSchema,
 )
 async def partial_update_ingredient(ingredient_id: int, ingredient: IngredientPartialUpdateSchema, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(IngredientModel).where(IngredientModel.id == ingredient_id))
-    existing_ingredient = result.scalars().first()
-    if not existing_ingredient:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    for field, value in ingredient.model_dump(exclude_unset=True).items():
-        setattr(existing_ingredient, field, value)
-    session.add(existing_ingredient)
-
-    await session.commit()
-    await session.refresh(existing_ingredient)
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.INGREDIENT_BY_ID, {"id": ingredient_id})
+        existing_ingredient = result.scalars().first()
+        if not existing_ingredient:
+            raise HTTPException(status_code=404, detail="Ingredient not found")
+        for field, value in ingredient.model_dump(exclude_unset=True).items():
+            setattr(existing_ingredient, field, value)
+        write_session.add(existing_ingredient)
+
+        await write_session.flush()
+        await write_session.refresh(existing_ingredient)
+        return existing_ingredient
+
+    existing_ingredient = await db.write(session, unit)
+    await invalidations.publish("ingredient", {"id": ingredient_id, "name": existing_ingredient.name})
     return existing_ingredient
 
 
@@ -97,10 +149,14 @@ async def partial_update_ingredient(ingredient_id: int, ingredient: IngredientPa
     dependencies=[Depends(auth.access_token_required)]
 )
 async def delete_ingredient(ingredient_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(IngredientModel).where(IngredientModel.id == ingredient_id))
-    existing_ingredient = result.scalars().first()
-    if not existing_ingredient:
-        raise HTTPException(status_code=404, detail="Ingredient not found")
-    await session.delete(existing_ingredient)
-    await session.commit()
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.INGREDIENT_BY_ID, {"id": ingredient_id})
+        existing_ingredient = result.scalars().first()
+        if not existing_ingredient:
+            raise HTTPException(status_code=404, detail="Ingredient not found")
+        await write_session.delete(existing_ingredient)
+        await write_session.flush()
+
+    await db.write(session, unit)
+    await invalidations.publish("ingredient", {"id": ingredient_id, "name": None})
     return None
\ No newline at end of file
@@ -0,0 +1,74 @@
+import json
+from typing import Annotated
+
+import sqlalchemy
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import auth
+from app.core.jobs import FINISHED, jobs
+from app.core.models.job import JobModel
+from app.core.schemas.job import JobCreateSchema, JobResponseSchema
+from app.core.settings.db import db
+
+SessionDepend = Annotated[AsyncSession, Depends(db.get_session)]
+
+# задачі спільні для всього сервера, серед них і перебудова індексів, на яку чекає readiness
+router = APIRouter(prefix="/jobs", tags=["jobs"], dependencies=[Depends(auth.admin_required)])
+
+
+def job_to_dict(job: JobModel) -> dict:
+    return {
+        "id": job.id,
+        "type": job.type,
+        "status": job.status,
+        # свіжіший прогрес з пам'яті, в БД він пишеться з обмеженням частоти
+        "progress": jobs.progress.get(job.id, job.progress),
+        "params": json.loads(job.params or "{}"),
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+async def get_job_or_404(job_id: int, session: AsyncSession) -> JobModel:
+    result = await session.execute(sqlalchemy.select(JobModel).where(JobModel.id == job_id))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post(
+    path="/",
+    response_model=JobResponseSchema,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_job(job: JobCreateSchema):
+    try:
+        new_job = await jobs.submit(job.type, job.params)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return job_to_dict(new_job)
+
+
+@router.get(
+    path="/{job_id}",
+    response_model=JobResponseSchema,
+)
+async def get_job(job_id: int, session: SessionDepend):
+    return job_to_dict(await get_job_or_404(job_id, session))
+
+
+@router.post(
+    path="/{job_id}/cancel",
+    response_model=JobResponseSchema,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def cancel_job(job_id: int, session: SessionDepend):
+    job = await get_job_or_404(job_id, session)
+    if job.status in FINISHED or not await jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is already finished")
+    return job_to_dict(job)
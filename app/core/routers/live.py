@@ -0,0 +1,90 @@
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.core.live import Subscriber, Topic, live
+
+LIVE_SSE_HEARTBEAT_SECONDS = 15
+# код закриття для клієнта, який не встигає читати: треба перезавантажити стан
+LIVE_CLOSE_OVERFLOW = 4008
+
+router = APIRouter(tags=["live"])
+
+
+def topics_from(recipes: Optional[List[int]], categories: Optional[List[int]]) -> List[Topic]:
+    return [("recipe", recipe_id) for recipe_id in recipes or []] + [
+        ("category", category_id) for category_id in categories or []
+    ]
+
+
+async def read_subscriptions(websocket: WebSocket, subscriber: Subscriber) -> None:
+    # {"action": "subscribe" | "unsubscribe", "recipes": [...], "categories": [...]}
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                continue
+            try:
+                topics = topics_from(
+                    [int(recipe_id) for recipe_id in message.get("recipes") or []],
+                    [int(category_id) for category_id in message.get("categories") or []],
+                )
+            except (TypeError, ValueError):
+                continue
+            if message.get("action") == "unsubscribe":
+                live.unsubscribe(subscriber, topics)
+            else:
+                live.subscribe(subscriber, topics)
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        subscriber.close()
+
+
+@router.websocket("/ws")
+async def live_websocket(websocket: WebSocket):
+    await websocket.accept()
+    subscriber = live.connect()
+    reader = asyncio.create_task(read_subscriptions(websocket, subscriber))
+    try:
+        while True:
+            updates = await subscriber.get()
+            if updates is None:
+                break
+            await websocket.send_json({"updates": updates})
+        if subscriber.overflowed:
+            await websocket.close(code=LIVE_CLOSE_OVERFLOW)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+        live.disconnect(subscriber)
+
+
+@router.get(path="/live")
+async def live_events(
+        request: Request,
+        recipes: Optional[List[int]] = Query(default=None),
+        categories: Optional[List[int]] = Query(default=None),
+):
+    subscriber = live.connect()
+    live.subscribe(subscriber, topics_from(recipes, categories))
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                updates = await subscriber.get(timeout=LIVE_SSE_HEARTBEAT_SECONDS)
+                if updates is None:
+                    break
+                if not updates:
+                    yield ": heartbeat\n\n"
+                    continue
+                for update in updates:
+                    yield f"event: recipe\ndata: {json.dumps(update)}\n\n"
+        finally:
+            live.disconnect(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
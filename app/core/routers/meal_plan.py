@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+import sqlalchemy
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import access_token_required as get_current_user
+from app.core.jobs import refresh_meal_plan_features
+from app.core.meal_plan import (
+    MEAL_PLAN_RECENT_SAVE_DAYS,
+    MEAL_PLAN_RETRY_AFTER_SECONDS,
+    meal_plan_features,
+    solve_meal_plan,
+)
+from app.core.models.recipe import RecipeModel
+from app.core.models.saved_recipe import SavedRecipeModel
+from app.core.models.user import UserModel
+from app.core.schemas.meal_plan import MealPlanGenerateSchema, MealPlanResponseSchema
+from app.core.settings.db import db
+
+SessionDepend = Annotated[AsyncSession, Depends(db.get_session)]
+
+router = APIRouter(prefix="/meal_plans", tags=["meal_plans"])
+
+
+@router.post(
+    path="/generate",
+    response_model=MealPlanResponseSchema,
+)
+async def generate_meal_plan(
+        meal_plan: MealPlanGenerateSchema,
+        session: SessionDepend,
+        current_user: UserModel = Depends(get_current_user)
+):
+    saved_since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=MEAL_PLAN_RECENT_SAVE_DAYS)
+    recently_saved = await session.execute(
+        sqlalchemy.select(SavedRecipeModel.recipe_id).where(
+            SavedRecipeModel.user_id == current_user.id,
+            SavedRecipeModel.saved_at >= saved_since,
+        )
+    )
+
+    # матрицю будує лише фонова задача; запит бере останню готову
+    features = meal_plan_features.current
+    await refresh_meal_plan_features()
+    if features is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Meal plan features are being computed, retry later",
+            headers={"Retry-After": str(MEAL_PLAN_RETRY_AFTER_SECONDS)},
+        )
+    candidates = features.candidates(
+        max_cooking_time=meal_plan.max_cooking_time_minutes,
+        category_ids=meal_plan.category_ids,
+        exclude_ids=recently_saved.scalars().all(),
+    )
+    if len(candidates) < meal_plan.count:
+        raise HTTPException(status_code=422, detail="Not enough recipes match the constraints")
+
+    chosen = candidates[solve_meal_plan(features.calories[candidates], meal_plan.count, meal_plan.daily_calories)]
+    recipe_ids = features.ids[chosen].tolist()
+    calories = features.calories[chosen].tolist()
+
+    result = await session.execute(sqlalchemy.select(RecipeModel).where(RecipeModel.id.in_(recipe_ids)))
+    recipes = {recipe.id: recipe for recipe in result.scalars().all()}
+
+    total_calories = sum(calories)
+    return {
+        "items": [
+            {"recipe": recipes[recipe_id], "calories": round(recipe_calories, 1)}
+            for recipe_id, recipe_calories in zip(recipe_ids, calories)
+            if recipe_id in recipes
+        ],
+        "total_calories": round(total_calories, 1),
+        "calorie_deviation": round(total_calories - meal_plan.daily_calories, 1),
+    }
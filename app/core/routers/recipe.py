@@ -5,12 +5,14 @@ from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.core import auth
+from app.core import auth, queries
 from app.core.models.category import CategoryModel
 from app.core.models.recipe import RecipeModel
 from app.core.models.user import UserModel
 from app.core.schemas.recipe import RecipeResponseSchema, RecipeCreateSchema, RecipePartialUpdateSchema
+from app.core.invalidation import invalidations
 from app.core.settings.db import db
+from app.core.singleflight import reads
 from fastapi import APIRouter
 
 
@@ -26,22 +28,29 @@ router = APIRouter(prefix="/recipes", tags=["recipes"])
 )
 async def create_recipe(recipe: RecipeCreateSchema, session: SessionDepend, current_user: UserModel = Depends(auth.access_token_required)):
 
-    new_recipe = RecipeModel(
-        author_id=current_user.id,
-        category_id=recipe.category_id,
-        name=recipe.name,
-        description=recipe.description,
-        instructions=recipe.instructions,
-        cooking_time_minutes=recipe.cooking_time_minutes,
-        image_url=recipe.image_url,
+    async def unit(write_session: AsyncSession):
+        new_recipe = RecipeModel(
+            author_id=current_user.id,
+            category_id=recipe.category_id,
+            name=recipe.name,
+            description=recipe.description,
+            instructions=recipe.instructions,
+            cooking_time_minutes=recipe.cooking_time_minutes,
+            image_url=recipe.image_url,
+        )
+        category = await write_session.get(CategoryModel, recipe.category_id)
+        if not category:
+            raise HTTPException(status_code=404, detail="Category not found")
+
+        write_session.add(new_recipe)
+        await write_session.flush()
+        await write_session.refresh(new_recipe)
+        return new_recipe
+
+    new_recipe = await db.write(session, unit)
+    await invalidations.publish(
+        "recipe", {"id": new_recipe.id, "name": new_recipe.name, "category_ids": [new_recipe.category_id]}
     )
-    category = await session.get(CategoryModel, recipe.category_id)
-    if not category:
-        raise HTTPException(status_code=404, detail="Category not found")
-
-    session.add(new_recipe)
-    await session.commit()
-    await session.refresh(new_recipe)
     return new_recipe
 
 
@@ -61,11 +70,14 @@ async def get_recipes(session: SessionDepend) -> Sequence[RecipeModel]:
     response_model=RecipeResponseSchema,
 )
 async def get_recipe(recipe_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(RecipeModel).where(RecipeModel.id == recipe_id))
-    recipe = result.scalars().first()
-    if not recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    return recipe
+    async def load():
+        result = await session.execute(queries.RECIPE_BY_ID, {"id": recipe_id})
+        recipe = result.scalars().first()
+        if not recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        return RecipeResponseSchema.model_validate(recipe, from_attributes=True)
+
+    return await reads.do(("/recipes/{recipe_id}", recipe_id), load)
 
 
 @router.put(
@@ -73,16 +85,29 @@ async def get_recipe(recipe_id: int, session: SessionDepend):
     response_model=RecipeResponseSchema,
 )
 async def update_recipe(recipe_id: int, recipe: RecipeCreateSchema, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(RecipeModel).where(RecipeModel.id == recipe_id))
-    existing_recipe = result.scalars().first()
-    if not existing_recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    for field, value in  recipe.model_dump(exclude_unset=True).items():
-        setattr(existing_recipe, field, value)
-    session.add(existing_recipe)
-
-    await session.commit()
-    await session.refresh(existing_recipe)
+    previous_category_ids = []
+
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.RECIPE_BY_ID, {"id": recipe_id})
+        existing_recipe = result.scalars().first()
+        if not existing_recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        # підписники старої категорії теж мають дізнатись, що рецепт з неї пішов
+        previous_category_ids.append(existing_recipe.category_id)
+        for field, value in  recipe.model_dump(exclude_unset=True).items():
+            setattr(existing_recipe, field, value)
+        write_session.add(existing_recipe)
+
+        await write_session.flush()
+        await write_session.refresh(existing_recipe)
+        return existing_recipe
+
+    existing_recipe = await db.write(session, unit)
+    await invalidations.publish("recipe", {
+        "id": recipe_id,
+        "name": existing_recipe.name,
+        "category_ids": [existing_recipe.category_id, *previous_category_ids],
+    })
     return existing_recipe
 
 
@@ -91,16 +116,29 @@ async def update_recipe(recipe_id: int, recipe: RecipeCreateSchema, session: Ses
     response_model=RecipeResponseSchema,
 )
 async def partial_update_recipe(recipe_id: int, recipe: RecipePartialUpdateSchema, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(RecipeModel).where(RecipeModel.id == recipe_id))
-    existing_recipe = result.scalars().first()
-    if not existing_recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    for field, value in  recipe.model_dump(exclude_unset=True).items():
-        setattr(existing_recipe, field, value)
-    session.add(existing_recipe)
-
-    await session.commit()
-    await session.refresh(existing_recipe)
+    previous_category_ids = []
+
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.RECIPE_BY_ID, {"id": recipe_id})
+        existing_recipe = result.scalars().first()
+        if not existing_recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        # підписники старої категорії теж мають дізнатись, що рецепт з неї пішов
+        previous_category_ids.append(existing_recipe.category_id)
+        for field, value in  recipe.model_dump(exclude_unset=True).items():
+            setattr(existing_recipe, field, value)
+        write_session.add(existing_recipe)
+
+        await write_session.flush()
+        await write_session.refresh(existing_recipe)
+        return existing_recipe
+
+    existing_recipe = await db.write(session, unit)
+    await invalidations.publish("recipe", {
+        "id": recipe_id,
+        "name": existing_recipe.name,
+        "category_ids": [existing_recipe.category_id, *previous_category_ids],
+    })
     return existing_recipe
 
 
@@ -110,10 +148,15 @@ async def partial_update_recipe(recipe_id: int, recipe: RecipePartialUpdateSchem
     dependencies=[Depends(auth.access_token_required)]
 )
 async def delete_recipe(recipe_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(RecipeModel).where(RecipeModel.id == recipe_id))
-    existing_recipe = result.scalars().first()
-    if not existing_recipe:
-        raise HTTPException(status_code=404, detail="Recipe not found")
-    await session.delete(existing_recipe)
-    await session.commit()
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.RECIPE_BY_ID, {"id": recipe_id})
+        existing_recipe = result.scalars().first()
+        if not existing_recipe:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        await write_session.delete(existing_recipe)
+        await write_session.flush()
+        return existing_recipe.category_id
+
+    category_id = await db.write(session, unit)
+    await invalidations.publish("recipe", {"id": recipe_id, "name": None, "category_ids": [category_id]})
     return None
\ No newline at end of file
@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import auth
+from app.core.invalidation import invalidations
 from app.core.models.recipe_ingredient import RecipeIngredientModel
 from app.core.schemas.recipe_ingredient import RecipeIngredientResponseSchema, RecipeIngredientCreateSchema, RecipeIngredientPartialUpdateSchema
 from app.core.settings.db import db
@@ -24,27 +25,32 @@ async def create_recipe_ingredient(
         recipe_ingredient: RecipeIngredientCreateSchema,
         session: SessionDepend,
 ):
-    query = sqlalchemy.select(RecipeIngredientModel).where(
-        RecipeIngredientModel.recipe_id == recipe_ingredient.recipe_id,
-        RecipeIngredientModel.ingredient_id == recipe_ingredient.ingredient_id
-    )
-    result = await session.execute(query)
-    existing = result.scalars().first()
-
-    if existing:
-        raise HTTPException(
-            status_code=400,
-            detail="This ingredient is already added to the recipe"
+    async def unit(write_session: AsyncSession):
+        query = sqlalchemy.select(RecipeIngredientModel).where(
+            RecipeIngredientModel.recipe_id == recipe_ingredient.recipe_id,
+            RecipeIngredientModel.ingredient_id == recipe_ingredient.ingredient_id
+        )
+        result = await write_session.execute(query)
+        existing = result.scalars().first()
+
+        if existing:
+            raise HTTPException(
+                status_code=400,
+                detail="This ingredient is already added to the recipe"
+            )
+
+        new_item = RecipeIngredientModel(
+            recipe_id=recipe_ingredient.recipe_id,
+            ingredient_id=recipe_ingredient.ingredient_id,
+            amount=recipe_ingredient.amount,
         )
+        write_session.add(new_item)
+        await write_session.flush()
+        await write_session.refresh(new_item)
+        return new_item
 
-    new_item = RecipeIngredientModel(
-        recipe_id=recipe_ingredient.recipe_id,
-        ingredient_id=recipe_ingredient.ingredient_id,
-        amount=recipe_ingredient.amount,
-    )
-    session.add(new_item)
-    await session.commit()
-    await session.refresh(new_item)
+    new_item = await db.write(session, unit)
+    await invalidations.publish("recipe_ingredient", {"ingredient_id": new_item.ingredient_id, "delta": 1})
     return new_item
 
 
@@ -93,22 +99,27 @@ async def partial_update_recipe_ingredient(
         update_data: RecipeIngredientPartialUpdateSchema,
         session: SessionDepend,
 ):
-    query = sqlalchemy.select(RecipeIngredientModel).where(
-        RecipeIngredientModel.recipe_id == recipe_id,
-        RecipeIngredientModel.ingredient_id == ingredient_id
-    )
-    result = await session.execute(query)
-    existing_item = result.scalars().first()
+    async def unit(write_session: AsyncSession):
+        query = sqlalchemy.select(RecipeIngredientModel).where(
+            RecipeIngredientModel.recipe_id == recipe_id,
+            RecipeIngredientModel.ingredient_id == ingredient_id
+        )
+        result = await write_session.execute(query)
+        existing_item = result.scalars().first()
 
-    if not existing_item:
-        raise HTTPException(status_code=404, detail="Recipe ingredient not found")
+        if not existing_item:
+            raise HTTPException(status_code=404, detail="Recipe ingredient not found")
+
+        for field, value in update_data.model_dump(exclude_unset=True).items():
+            setattr(existing_item, field, value)
 
-    for field, value in update_data.model_dump(exclude_unset=True).items():
-        setattr(existing_item, field, value)
+        write_session.add(existing_item)
+        await write_session.flush()
+        await write_session.refresh(existing_item)
+        return existing_item
 
-    session.add(existing_item)
-    await session.commit()
-    await session.refresh(existing_item)
+    existing_item = await db.write(session, unit)
+    await invalidations.publish("recipe_ingredient", {"ingredient_id": existing_item.ingredient_id, "delta": 0})
     return existing_item
 
 
@@ -122,16 +133,20 @@ async def delete_recipe_ingredient(
         ingredient_id: int,
         session: SessionDepend
 ):
-    query = sqlalchemy.select(RecipeIngredientModel).where(
-        RecipeIngredientModel.recipe_id == recipe_id,
-        RecipeIngredientModel.ingredient_id == ingredient_id
-    )
-    result = await session.execute(query)
-    existing_item = result.scalars().first()
+    async def unit(write_session: AsyncSession):
+        query = sqlalchemy.select(RecipeIngredientModel).where(
+            RecipeIngredientModel.recipe_id == recipe_id,
+            RecipeIngredientModel.ingredient_id == ingredient_id
+        )
+        result = await write_session.execute(query)
+        existing_item = result.scalars().first()
 
-    if not existing_item:
-        raise HTTPException(status_code=404, detail="Recipe ingredient not found")
+        if not existing_item:
+            raise HTTPException(status_code=404, detail="Recipe ingredient not found")
+
+        await write_session.delete(existing_item)
+        await write_session.flush()
 
-    await session.delete(existing_item)
-    await session.commit()
+    await db.write(session, unit)
+    await invalidations.publish("recipe_ingredient", {"ingredient_id": ingredient_id, "delta": -1})
     return None
\ No newline at end of file
@@ -2,12 +2,15 @@ from typing import Annotated, Sequence
 
 import sqlalchemy
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import auth
 from app.core.auth import access_token_required as get_current_user
 from app.core.models.user import UserModel
 from app.core.models.saved_recipe import SavedRecipeModel
+from app.core.invalidation import invalidations
+from app.core.save_buffer import save_buffer
 from app.core.schemas.saved_recipe import SavedRecipeResponseSchema, SavedRecipeCreateSchema
 from app.core.settings.db import db
 
@@ -21,19 +24,29 @@ router = APIRouter(prefix="/saved_recipes", tags=["saved_recipes"])
     path="/",
     response_model=SavedRecipeResponseSchema,
     status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"description": "Save queued for a batched write"}},
 )
 async def create_saved_recipe(
         saved_recipe: SavedRecipeCreateSchema,
         session: SessionDepend,
         current_user: UserModel = Depends(get_current_user)  #
 ):
-    new_saved_recipe = SavedRecipeModel(
-        user_id=current_user.id,
-        recipe_id=saved_recipe.recipe_id
-    )
-    session.add(new_saved_recipe)
-    await session.commit()
-    await session.refresh(new_saved_recipe)
+    if save_buffer.enabled:
+        await save_buffer.save(current_user.id, saved_recipe.recipe_id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"status": "accepted"})
+
+    async def unit(write_session: AsyncSession):
+        new_saved_recipe = SavedRecipeModel(
+            user_id=current_user.id,
+            recipe_id=saved_recipe.recipe_id
+        )
+        write_session.add(new_saved_recipe)
+        await write_session.flush()
+        await write_session.refresh(new_saved_recipe)
+        return new_saved_recipe
+
+    new_saved_recipe = await db.write(session, unit)
+    await invalidations.publish("recipe_saves", {"recipe_ids": [new_saved_recipe.recipe_id], "delta": 1})
     return new_saved_recipe
 
 
@@ -69,13 +82,47 @@ async def get_saved_recipe(saved_recipe_id: int, session: SessionDepend):
     dependencies=[Depends(auth.access_token_required)]
 )
 async def delete_saved_recipe(saved_recipe_id: int, session: SessionDepend):
-    query = sqlalchemy.select(SavedRecipeModel).where(SavedRecipeModel.id == saved_recipe_id)
-    result = await session.execute(query)
-    existing_saved_recipe = result.scalars().first()
+    async def unit(write_session: AsyncSession):
+        query = sqlalchemy.select(SavedRecipeModel).where(SavedRecipeModel.id == saved_recipe_id)
+        result = await write_session.execute(query)
+        existing_saved_recipe = result.scalars().first()
+
+        if not existing_saved_recipe:
+            raise HTTPException(status_code=404, detail="Saved recipe not found")
+
+        await write_session.delete(existing_saved_recipe)
+        await write_session.flush()
+        return existing_saved_recipe.recipe_id
+
+    recipe_id = await db.write(session, unit)
+    await invalidations.publish("recipe_saves", {"recipe_ids": [recipe_id], "delta": -1})
+    return None
 
-    if not existing_saved_recipe:
-        raise HTTPException(status_code=404, detail="Saved recipe not found")
 
-    await session.delete(existing_saved_recipe)
-    await session.commit()
+@router.delete(
+    path="/recipe/{recipe_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_202_ACCEPTED: {"description": "Unsave queued for a batched write"}},
+)
+async def unsave_recipe(
+        recipe_id: int,
+        session: SessionDepend,
+        current_user: UserModel = Depends(get_current_user)
+):
+    if save_buffer.enabled:
+        await save_buffer.unsave(current_user.id, recipe_id)
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"status": "accepted"})
+
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(
+            sqlalchemy.delete(SavedRecipeModel).where(
+                SavedRecipeModel.user_id == current_user.id,
+                SavedRecipeModel.recipe_id == recipe_id
+            )
+        )
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Saved recipe not found")
+
+    await db.write(session, unit)
+    await invalidations.publish("recipe_saves", {"recipe_ids": [recipe_id], "delta": -1})
     return None
\ No newline at end of file
@@ -0,0 +1,40 @@
+from typing import Annotated, Dict
+
+import sqlalchemy
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.ingredient import IngredientModel
+from app.core.models.recipe_ingredient import RecipeIngredientModel
+from app.core.schemas.shopping_list import ShoppingListCreateSchema, ShoppingListResponseSchema
+from app.core.settings.db import db
+from app.core.shopping_list import aggregate_shopping_list
+
+SessionDepend = Annotated[AsyncSession, Depends(db.get_session)]
+
+router = APIRouter(prefix="/shopping_list", tags=["shopping_list"])
+
+
+@router.post(
+    path="",
+    response_model=ShoppingListResponseSchema,
+)
+async def create_shopping_list(shopping_list: ShoppingListCreateSchema, session: SessionDepend):
+    servings: Dict[int, float] = {}
+    for item in shopping_list.recipes:
+        servings[item.recipe_id] = servings.get(item.recipe_id, 0) + item.servings
+
+    # всі зв'язки рецепт-інгредієнт одним запитом
+    query = (
+        sqlalchemy.select(
+            RecipeIngredientModel.recipe_id,
+            RecipeIngredientModel.ingredient_id,
+            RecipeIngredientModel.amount,
+            IngredientModel.name,
+            IngredientModel.calories_per_100g,
+        )
+        .join(IngredientModel, IngredientModel.id == RecipeIngredientModel.ingredient_id)
+        .where(RecipeIngredientModel.recipe_id.in_(servings.keys()))
+    )
+    result = await session.execute(query)
+    return aggregate_shopping_list(result.all(), servings)
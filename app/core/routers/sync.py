@@ -0,0 +1,29 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.schemas.sync import SyncResponseSchema
+from app.core.settings.db import db
+from app.core.sync import read_changes
+
+SessionDepend = Annotated[AsyncSession, Depends(db.get_session)]
+
+router = APIRouter(tags=["sync"])
+
+
+@router.get(
+    path="/sync",
+    response_model=SyncResponseSchema,
+)
+async def get_sync(
+        session: SessionDepend,
+        since: int = Query(default=0, ge=0),
+        limit: int = Query(default=500, ge=1, le=1000),
+):
+    changes, has_more = await read_changes(session, since, limit)
+    return {
+        "changes": changes,
+        "next": changes[-1]["seq"] if changes else since,
+        "has_more": has_more,
+    }
@@ -5,10 +5,13 @@ from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from app.core import auth
+from app.core import auth, queries
 from app.core.models.user import UserModel
 from app.core.schemas.user import UserResponseSchema, UserCreateSchema, UserPartialUpdateSchema
+from app.core.invalidation import invalidations
+from app.core.rate_limit import signup_rate_limit
 from app.core.settings.db import db
+from app.core.singleflight import reads
 from app.core.utils import get_password_hash
 from fastapi import APIRouter
 
@@ -21,17 +24,23 @@ router = APIRouter(prefix="/users", tags=["users"])
     path="/",
     response_model=UserResponseSchema,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(signup_rate_limit)],
 )
 async def create_user(user: UserCreateSchema, session: SessionDepend):
-    new_user = UserModel(
-        username=user.username,
-        email=user.email,
-        password=get_password_hash(user.password)
-    )
-    session.add(new_user)
-    await session.commit()
-    await session.refresh(new_user)
-    return new_user
+    password = get_password_hash(user.password)
+
+    async def unit(write_session: AsyncSession):
+        new_user = UserModel(
+            username=user.username,
+            email=user.email,
+            password=password
+        )
+        write_session.add(new_user)
+        await write_session.flush()
+        await write_session.refresh(new_user)
+        return new_user
+
+    return await db.write(session, unit)
 
 
 @router.get(
@@ -50,11 +59,14 @@ async def get_users(session: SessionDepend) -> Sequence[UserModel]:
     response_model=UserResponseSchema,
 )
 async def get_user(user_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(UserModel).where(UserModel.id == user_id))
-    user = result.scalars().first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+    async def load():
+        result = await session.execute(queries.USER_BY_ID, {"id": user_id})
+        user = result.scalars().first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return UserResponseSchema.model_validate(user, from_attributes=True)
+
+    return await reads.do(("/users/{user_id}", user_id), load)
 
 
 @router.patch(
@@ -62,20 +74,28 @@ async def get_user(user_id: int, session: SessionDepend):
     response_model=UserResponseSchema,
 )
 async def partial_update_user(user_id: int, user: UserPartialUpdateSchema, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(UserModel).where(UserModel.id == user_id))
-    existing_user = result.scalars().first()
-    if not existing_user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    for field, value in user.model_dump(exclude_unset=True).items():
-        if value is not None:
-            if field == "password":
-                value = get_password_hash(value)
-            setattr(existing_user, field, value)
-
-    session.add(existing_user)
-    await session.commit()
-    await session.refresh(existing_user)
+    changes = user.model_dump(exclude_unset=True)
+    # bcrypt не повинен виконуватись всередині транзакції запису
+    if changes.get("password") is not None:
+        changes["password"] = get_password_hash(changes["password"])
+
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.USER_BY_ID, {"id": user_id})
+        existing_user = result.scalars().first()
+        if not existing_user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        for field, value in changes.items():
+            if value is not None:
+                setattr(existing_user, field, value)
+
+        write_session.add(existing_user)
+        await write_session.flush()
+        await write_session.refresh(existing_user)
+        return existing_user
+
+    existing_user = await db.write(session, unit)
+    await invalidations.publish("user", {"id": user_id})
     return existing_user
 
 
@@ -85,10 +105,14 @@ async def partial_update_user(user_id: int, user: UserPartialUpdateSchema, sessi
     dependencies=[Depends(auth.access_token_required)]
 )
 async def delete_user(user_id: int, session: SessionDepend):
-    result = await session.execute(sqlalchemy.select(UserModel).where(UserModel.id == user_id))
-    existing_user = result.scalars().first()
-    if not existing_user:
-        raise HTTPException(status_code=404, detail="User not found")
-    await session.delete(existing_user)
-    await session.commit()
+    async def unit(write_session: AsyncSession):
+        result = await write_session.execute(queries.USER_BY_ID, {"id": user_id})
+        existing_user = result.scalars().first()
+        if not existing_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        await write_session.delete(existing_user)
+        await write_session.flush()
+
+    await db.write(session, unit)
+    await invalidations.publish("user", {"id": user_id})
     return None
\ No newline at end of file
@@ -0,0 +1,309 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.invalidation import invalidations
+from app.core.models.saved_recipe import SavedRecipeModel
+
+logger = logging.getLogger(__name__)
+
+SAVE_BUFFER_ENABLED = False
+SAVE_BUFFER_FLUSH_INTERVAL_MS = 200
+SAVE_BUFFER_FLUSH_MAX_EVENTS = 500
+# None - без журналу: події, які не встигли записатись, губляться при падінні процесу
+SAVE_BUFFER_LOG_PATH: Optional[str] = None
+SAVE_BUFFER_FSYNC = True
+SAVE_BUFFER_CHUNK_SIZE = 500
+
+SAVE = "save"
+UNSAVE = "unsave"
+
+Event = Tuple[str, int, int]
+
+# подія, що впала з цими помилками, не пройде і при повторі: ламаний FK, неправильні дані
+PERMANENT_ERRORS = (IntegrityError, DataError, TypeError, ValueError)
+
+
+def collapse_events(events: List[Event]) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    # для кожної пари (user, recipe) важлива лише остання подія
+    final: Dict[Tuple[int, int], str] = {}
+    for action, user_id, recipe_id in events:
+        final[(user_id, recipe_id)] = action
+    saves = [key for key, action in final.items() if action == SAVE]
+    unsaves = [key for key, action in final.items() if action == UNSAVE]
+    return saves, unsaves
+
+
+def recipe_deltas(events: List[Event]) -> Dict[int, int]:
+    # чиста зміна кількості збережень рецепту: +1 за кожне застосоване save, -1 за unsave
+    saves, unsaves = collapse_events(events)
+    deltas: Dict[int, int] = {}
+    for _user_id, recipe_id in saves:
+        deltas[recipe_id] = deltas.get(recipe_id, 0) + 1
+    for _user_id, recipe_id in unsaves:
+        deltas[recipe_id] = deltas.get(recipe_id, 0) - 1
+    return deltas
+
+
+async def apply_events(session: AsyncSession, events: List[Event]) -> None:
+    saves, unsaves = collapse_events(events)
+    dialect = session.bind.dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+    for start in range(0, len(saves), SAVE_BUFFER_CHUNK_SIZE):
+        rows = [{"user_id": user_id, "recipe_id": recipe_id} for user_id, recipe_id in saves[start:start + SAVE_BUFFER_CHUNK_SIZE]]
+        # дублікати по _user_recipe_uc просто пропускаються
+        statement = insert(SavedRecipeModel).on_conflict_do_nothing(index_elements=["user_id", "recipe_id"])
+        await session.execute(statement, rows)
+
+    for start in range(0, len(unsaves), SAVE_BUFFER_CHUNK_SIZE):
+        await session.execute(
+            delete(SavedRecipeModel).where(
+                tuple_(SavedRecipeModel.user_id, SavedRecipeModel.recipe_id).in_(unsaves[start:start + SAVE_BUFFER_CHUNK_SIZE])
+            )
+        )
+
+    await session.commit()
+
+
+class SaveBuffer:
+    def __init__(
+            self,
+            enabled: bool = SAVE_BUFFER_ENABLED,
+            flush_interval_ms: int = SAVE_BUFFER_FLUSH_INTERVAL_MS,
+            flush_max_events: int = SAVE_BUFFER_FLUSH_MAX_EVENTS,
+            log_path: Optional[str] = SAVE_BUFFER_LOG_PATH,
+            fsync: bool = SAVE_BUFFER_FSYNC,
+    ):
+        self.enabled = enabled
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_events = flush_max_events
+        self.log_path = log_path
+        self.fsync = fsync
+
+        self.session_maker: Optional[async_sessionmaker] = None
+        self._pending: List[Event] = []
+        # ротовані сегменти журналу, події з яких ще не потрапили в БД
+        self._segments: List[str] = []
+        self._segment_id = 0
+        self._log_fd: Optional[int] = None
+        self._log_lock = asyncio.Lock()
+        # записи, що чекають на спільний fsync
+        self._sync_waiters: List[asyncio.Future] = []
+        self._sync_task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushed_events = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.dead_lettered = 0
+
+    async def start(self, session_maker: async_sessionmaker, workers: int = 1) -> None:
+        if self.log_path and workers > 1:
+            # журнал один на хост: кілька воркерів повторили б і обрізали одні й ті самі події
+            raise RuntimeError(
+                "The save buffer log cannot be shared by several workers: "
+                "run with WEB_CONCURRENCY=1 or disable SAVE_BUFFER_LOG_PATH"
+            )
+        self.session_maker = session_maker
+        if self.log_path:
+            self._replay_log()
+            self._open_log()
+        if self._pending:
+            await self.flush()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            # не скасовуємо: flush, що вже забрав події з черги, має дописати їх у БД
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        if self.session_maker is not None:
+            await self.flush()
+        if self._log_fd is not None:
+            os.close(self._log_fd)
+            self._log_fd = None
+
+    async def save(self, user_id: int, recipe_id: int) -> None:
+        await self._append((SAVE, user_id, recipe_id))
+
+    async def unsave(self, user_id: int, recipe_id: int) -> None:
+        await self._append((UNSAVE, user_id, recipe_id))
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+            "fsyncs": self.fsyncs,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        async with self._log_lock:
+            events, self._pending = self._pending, []
+            segments = await self._rotate_log()
+
+        try:
+            try:
+                async with self.session_maker() as session:
+                    await apply_events(session, events)
+                applied, retry = events, []
+            except Exception:
+                logger.exception("Failed to flush %d buffered saved recipe events, retrying one by one", len(events))
+                applied, retry = await self._apply_one_by_one(events)
+        except asyncio.CancelledError:
+            # події вже підтверджені клієнтам; повтор безпечний, бо save і unsave ідемпотентні
+            self._pending[:0] = events
+            raise
+        if retry:
+            # повертаємо події в чергу, сегменти журналу лишаються на диску
+            self._pending[:0] = retry
+        if applied:
+            self.flushes += 1
+            self.flushed_events += len(applied)
+            # лічильники збережень змінюються лише тут, а не в момент прийому події;
+            # одна подія на кожне значення delta, у форматі маршрутів saved_recipe
+            by_delta: Dict[int, List[int]] = {}
+            for recipe_id, delta in sorted(recipe_deltas(applied).items()):
+                by_delta.setdefault(delta, []).append(recipe_id)
+            for delta, recipe_ids in by_delta.items():
+                await invalidations.publish("recipe_saves", {"recipe_ids": recipe_ids, "delta": delta})
+        if not retry:
+            for segment in segments:
+                self._segments.remove(segment)
+                os.remove(segment)
+
+    async def _apply_one_by_one(self, events: List[Event]) -> Tuple[List[Event], List[Event]]:
+        # одна зламана подія не повинна блокувати решту; повертає (застосовані, для повтору)
+        applied = []
+        for position, event in enumerate(events):
+            try:
+                async with self.session_maker() as session:
+                    await apply_events(session, [event])
+            except PERMANENT_ERRORS:
+                logger.exception("Dead-lettering buffered saved recipe event %s", event)
+                self._dead_letter(event)
+            except Exception:
+                # БД недоступна - ця і решта подій чекають наступного flush
+                return applied, events[position:]
+            else:
+                applied.append(event)
+        return applied, []
+
+    def _dead_letter(self, event: Event) -> None:
+        self.dead_lettered += 1
+        if self.log_path:
+            with open(f"{self.log_path}.dead", "a") as dead_file:
+                dead_file.write(json.dumps(event) + "\n")
+
+    async def _append(self, event: Event) -> None:
+        async with self._log_lock:
+            self._pending.append(event)
+            written = self._log_fd is not None
+            if written:
+                os.write(self._log_fd, (json.dumps(event) + "\n").encode())
+        if written and self.fsync:
+            await self._wait_for_fsync()
+        if len(self._pending) >= self.flush_max_events:
+            self._wake.set()
+
+    async def _wait_for_fsync(self) -> None:
+        # group commit: один fsync покриває всі записи, зроблені до його початку
+        waiter = asyncio.get_running_loop().create_future()
+        self._sync_waiters.append(waiter)
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._fsync_waiters())
+        await waiter
+
+    async def _fsync_waiters(self) -> None:
+        try:
+            while self._sync_waiters:
+                waiters, self._sync_waiters = self._sync_waiters, []
+                error = None
+                if self._log_fd is not None:
+                    # дублікат лишається дійсним, навіть якщо ротація закриє основний дескриптор
+                    fd = os.dup(self._log_fd)
+                    try:
+                        await asyncio.to_thread(os.fsync, fd)
+                        self.fsyncs += 1
+                    except OSError as exc:
+                        error = exc
+                    finally:
+                        os.close(fd)
+                for waiter in waiters:
+                    if waiter.done():
+                        continue
+                    if error is None:
+                        waiter.set_result(None)
+                    else:
+                        waiter.set_exception(error)
+        finally:
+            self._sync_task = None
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._stopping:
+                await self.flush()
+
+    def _open_log(self) -> None:
+        self._log_fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+
+    async def _rotate_log(self) -> List[str]:
+        if self._log_fd is None:
+            return []
+        if self.fsync:
+            # записи старого файлу могли ще не потрапити в спільний fsync
+            await asyncio.to_thread(os.fsync, self._log_fd)
+        os.close(self._log_fd)
+        self._segment_id += 1
+        segment = f"{self.log_path}.{self._segment_id}"
+        os.replace(self.log_path, segment)
+        self._segments.append(segment)
+        self._open_log()
+        return list(self._segments)
+
+    def _replay_log(self) -> None:
+        segments = sorted(
+            (path for path in glob.glob(f"{glob.escape(self.log_path)}.*") if path.rsplit(".", 1)[1].isdigit()),
+            key=lambda path: int(path.rsplit(".", 1)[1]),
+        )
+        paths = segments + ([self.log_path] if os.path.exists(self.log_path) else [])
+        for path in paths:
+            with open(path) as log_file:
+                for line in log_file:
+                    try:
+                        action, user_id, recipe_id = json.loads(line)
+                    except ValueError:
+                        # обірваний останній рядок після падіння
+                        continue
+                    self._pending.append((action, user_id, recipe_id))
+        self._segments = segments
+        self._segment_id = int(segments[-1].rsplit(".", 1)[1]) if segments else 0
+        if os.path.exists(self.log_path):
+            self._segment_id += 1
+            segment = f"{self.log_path}.{self._segment_id}"
+            os.replace(self.log_path, segment)
+            self._segments.append(segment)
+
+
+save_buffer = SaveBuffer()
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class AutocompleteItemSchema(BaseModel):
+    id: int
+    name: str
+    popularity: int
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+
+
+class PairIngredientSchema(BaseModel):
+    id: int
+    name: str
+
+
+class IngredientPairSchema(BaseModel):
+    ingredient: PairIngredientSchema
+    # у скількох рецептах інгредієнти зустрічаються разом
+    recipes: int
+    lift: float
+    pmi: float
+
+
+class CategoryPairSchema(BaseModel):
+    first: PairIngredientSchema
+    second: PairIngredientSchema
+    recipes: int
+    lift: float
+    pmi: float
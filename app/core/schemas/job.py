@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+
+class JobCreateSchema(BaseModel):
+    type: str = Field(max_length=50)
+    params: dict = Field(default_factory=dict)
+
+
+class JobResponseSchema(BaseModel):
+    id: int
+    type: str
+    status: str
+    progress: float
+    params: dict
+    result: Optional[Any]
+    error: Optional[str]
+    created_at: Optional[datetime]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
@@ -0,0 +1,23 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.core.schemas.recipe import RecipeResponseSchema
+
+
+class MealPlanGenerateSchema(BaseModel):
+    count: int = Field(default=3, ge=1, le=10)
+    daily_calories: float = Field(gt=0)
+    max_cooking_time_minutes: Optional[int] = Field(default=None, gt=0)
+    category_ids: List[int] = Field(default_factory=list)
+
+
+class MealPlanItemSchema(BaseModel):
+    recipe: RecipeResponseSchema
+    calories: float
+
+
+class MealPlanResponseSchema(BaseModel):
+    items: List[MealPlanItemSchema]
+    total_calories: float
+    calorie_deviation: float
@@ -0,0 +1,31 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class ShoppingListRecipeSchema(BaseModel):
+    recipe_id: int = Field(gt=0)
+    servings: float = Field(default=1, gt=0, le=100)
+
+
+class ShoppingListCreateSchema(BaseModel):
+    recipes: List[ShoppingListRecipeSchema] = Field(min_length=1, max_length=100)
+
+
+class ShoppingListItemSchema(BaseModel):
+    ingredient_id: int
+    name: str
+    amount: float
+    unit: str
+
+
+class ShoppingListUnquantifiedSchema(BaseModel):
+    ingredient_id: int
+    name: str
+    amounts: List[str]
+
+
+class ShoppingListResponseSchema(BaseModel):
+    items: List[ShoppingListItemSchema]
+    unquantified: List[ShoppingListUnquantifiedSchema]
+    total_calories: float
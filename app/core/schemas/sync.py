@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel
+
+
+class SyncChangeSchema(BaseModel):
+    seq: int
+    entity: str
+    op: Literal["upsert", "delete"]
+    # для delete - лише первинний ключ рядка
+    data: dict
+    updated_at: Optional[datetime]
+
+
+class SyncResponseSchema(BaseModel):
+    changes: List[SyncChangeSchema]
+    next: int
+    has_more: bool
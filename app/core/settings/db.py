@@ -1,20 +1,127 @@
-from typing import AsyncGenerator
+import asyncio
+import logging
+from typing import AsyncGenerator, Awaitable, Callable, List, Optional, Tuple, TypeVar
 
 
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteUnit = Callable[[AsyncSession], Awaitable[T]]
+
+
+def _configure_sqlite(engine: AsyncEngine, begin: Optional[str] = None):
+   # WAL дозволяє читачам працювати паралельно з єдиним писачем
+   @event.listens_for(engine.sync_engine, "connect")
+   def on_connect(dbapi_connection, _connection_record):
+       cursor = dbapi_connection.cursor()
+       cursor.execute("PRAGMA journal_mode=WAL")
+       cursor.execute("PRAGMA busy_timeout=5000")
+       cursor.close()
+       if begin:
+           # pysqlite сам керує транзакціями і ламає SAVEPOINT, тому BEGIN видаємо самі
+           dbapi_connection.isolation_level = None
+
+   if begin:
+       @event.listens_for(engine.sync_engine, "begin")
+       def on_begin(connection):
+           connection.exec_driver_sql(begin)
+
+
+class WriteLane:
+   def __init__(self, session_maker: async_sessionmaker, max_batch: int):
+       self.session_maker = session_maker
+       self.max_batch = max_batch
+       self._queue: "asyncio.Queue[Tuple[WriteUnit, asyncio.Future]]" = asyncio.Queue()
+       self._task: Optional[asyncio.Task] = None
+       self.batches = 0
+       self.units = 0
+
+   def start(self):
+       self._task = asyncio.create_task(self._run())
+
+   async def stop(self):
+       if self._task:
+           self._task.cancel()
+           try:
+               await self._task
+           except asyncio.CancelledError:
+               pass
+           self._task = None
+       while not self._queue.empty():
+           _unit, future = self._queue.get_nowait()
+           if not future.done():
+               future.set_exception(RuntimeError("Write lane stopped"))
+
+   async def submit(self, unit: WriteUnit) -> T:
+       future = asyncio.get_running_loop().create_future()
+       self._queue.put_nowait((unit, future))
+       return await future
+
+   def stats(self) -> dict:
+       return {"batches": self.batches, "units": self.units, "queued": self._queue.qsize()}
+
+   async def _run(self):
+       while True:
+           batch = [await self._queue.get()]
+           while len(batch) < self.max_batch and not self._queue.empty():
+               batch.append(self._queue.get_nowait())
+           batch = [(unit, future) for unit, future in batch if not future.cancelled()]
+           if not batch:
+               continue
+           if not await self._try_commit(batch) and len(batch) > 1:
+               # одна погана транзакція не повинна валити всю пачку
+               logger.warning("Group commit of %d units failed, retrying one by one", len(batch))
+               for item in batch:
+                   if not item[1].done():
+                       await self._try_commit([item])
+
+   async def _try_commit(self, batch: List[Tuple[WriteUnit, asyncio.Future]]) -> bool:
+       try:
+           await self._commit_batch(batch)
+           return True
+       except Exception as exc:
+           if len(batch) == 1 and not batch[0][1].done():
+               batch[0][1].set_exception(exc)
+           return False
+
+   async def _commit_batch(self, batch: List[Tuple[WriteUnit, asyncio.Future]]):
+       # кожна одиниця роботи у власному SAVEPOINT, один COMMIT на всю пачку
+       done = []
+       async with self.session_maker() as session:
+           for unit, future in batch:
+               try:
+                   async with session.begin_nested():
+                       result = await unit(session)
+               except Exception as exc:
+                   if not future.done():
+                       future.set_exception(exc)
+                   continue
+               done.append((future, result))
+           await session.commit()
+
+       self.batches += 1
+       self.units += len(done)
+       for future, result in done:
+           if not future.done():
+               future.set_result(result)
 
 
 class Database:
-   def __init__(self, url: str):
+   def __init__(self, url: str, write_lane: bool = False, write_lane_max_batch: int = 64):
        self.url = url
+       self.write_lane_enabled = write_lane
+       self.write_lane_max_batch = write_lane_max_batch
 
 
        self.engine = None
        self.session_maker = None
+       self.write_engine = None
+       self.write_lane = None
 
 
    async def connect(self):
@@ -25,9 +132,31 @@ class Database:
            expire_on_commit=False,
            class_=AsyncSession,
        )
+       if self.write_lane_enabled:
+           # одне виділене з'єднання для всіх записів, читачі - окремі WAL з'єднання
+           self.write_engine = create_async_engine(self.url, echo=False, pool_size=1, max_overflow=0)
+           if self.engine.dialect.name == "sqlite":
+               _configure_sqlite(self.engine)
+               _configure_sqlite(self.write_engine, begin="BEGIN IMMEDIATE")
+           self.write_lane = WriteLane(
+               async_sessionmaker(
+                   bind=self.write_engine,
+                   autoflush=False,
+                   expire_on_commit=False,
+                   class_=AsyncSession,
+               ),
+               max_batch=self.write_lane_max_batch,
+           )
+           self.write_lane.start()
 
 
    async def disconnect(self):
+       if self.write_lane:
+           await self.write_lane.stop()
+           self.write_lane = None
+       if self.write_engine:
+           await self.write_engine.dispose()
+           self.write_engine = None
        if self.engine:
            await self.engine.dispose()
            self.engine = None
@@ -41,6 +170,15 @@ class Database:
            yield session
 
 
+   async def write(self, session: AsyncSession, unit: WriteUnit) -> T:
+       # unit робить flush/refresh сам; commit - або тут, або груповий у write lane
+       if self.write_lane is None:
+           result = await unit(session)
+           await session.commit()
+           return result
+       return await self.write_lane.submit(unit)
+
+
    async def ping(self) -> bool:
        if not self.engine:
            raise RuntimeError("Database not connected. Call connect() first.")
@@ -53,5 +191,6 @@ class Database:
 
 
 DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+WRITE_LANE_ENABLED = False
 
-db = Database(url=DATABASE_URL)
\ No newline at end of file
+db = Database(url=DATABASE_URL, write_lane=WRITE_LANE_ENABLED)
@@ -0,0 +1,107 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+# одиниця -> (канонічна одиниця, множник)
+UNITS: Dict[str, Tuple[str, float]] = {
+    "г": ("g", 1), "гр": ("g", 1), "g": ("g", 1), "gr": ("g", 1),
+    "кг": ("g", 1000), "kg": ("g", 1000),
+    "мг": ("g", 0.001), "mg": ("g", 0.001),
+    "мл": ("ml", 1), "ml": ("ml", 1),
+    "л": ("ml", 1000), "l": ("ml", 1000),
+    "шт": ("pcs", 1), "pcs": ("pcs", 1), "pc": ("pcs", 1),
+    "стл": ("tbsp", 1), "tbsp": ("tbsp", 1),
+    "чл": ("tsp", 1), "tsp": ("tsp", 1),
+    "cup": ("cup", 1), "cups": ("cup", 1),
+}
+
+# "1 1/2 cup" - ціле і дріб; одразу після числа не може йти ще одне число чи експонента ("1e5 g")
+AMOUNT_PATTERN = re.compile(
+    r"^\s*(?:(\d+)\s+(?=\d+\s*/))?(\d+(?:[.,]\d+)?)(?:\s*/\s*(\d+))?(?![eE][+-]?\d|\s*[\d/.,])\s*(.*?)\s*$"
+)
+
+
+@lru_cache(maxsize=4096)
+def parse_amount(amount: Optional[str]) -> Optional[Tuple[float, str]]:
+    # "1.5 кг" -> (1500.0, "g"); "за смаком" -> None
+    if not amount:
+        return None
+    match = AMOUNT_PATTERN.match(amount)
+    if not match:
+        return None
+    whole, number, denominator, unit = match.groups()
+    quantity = float(number.replace(",", "."))
+    if denominator:
+        # "1/0 cup" у базі не повинен ламати список покупок чи побудову ознак меню
+        if int(denominator) == 0:
+            return None
+        quantity /= int(denominator)
+    if whole:
+        quantity += int(whole)
+    unit_key = unit.casefold().replace(" ", "").replace(".", "")
+    if not unit_key:
+        return quantity, "pcs"
+    canonical, factor = UNITS.get(unit_key, (unit_key, 1))
+    return quantity * factor, canonical
+
+
+def aggregate_shopping_list(
+        rows: Iterable[Tuple[int, int, Optional[str], str, Optional[int]]],
+        servings: Dict[int, float],
+) -> dict:
+    # rows: (recipe_id, ingredient_id, amount, ingredient name, calories_per_100g)
+    names: Dict[int, str] = {}
+    calories: Dict[int, Optional[int]] = {}
+    unquantified: Dict[int, list] = {}
+    ingredient_ids, units, quantities = [], [], []
+
+    for recipe_id, ingredient_id, amount, name, calories_per_100g in rows:
+        names[ingredient_id] = name
+        calories[ingredient_id] = calories_per_100g
+        parsed = parse_amount(amount)
+        if parsed is None:
+            unquantified.setdefault(ingredient_id, []).append(amount)
+            continue
+        ingredient_ids.append(ingredient_id)
+        units.append(parsed[1])
+        quantities.append(parsed[0] * servings[recipe_id])
+
+    items = []
+    total_calories = 0.0
+    if ingredient_ids:
+        ingredient_array = np.asarray(ingredient_ids, dtype=np.int64)
+        quantity_array = np.asarray(quantities, dtype=np.float64)
+        unit_names, unit_codes = np.unique(np.asarray(units), return_inverse=True)
+
+        # групуємо за (інгредієнт, одиниця) і сумуємо кількості
+        keys = ingredient_array * len(unit_names) + unit_codes
+        group_keys, group_index = np.unique(keys, return_inverse=True)
+        totals = np.bincount(group_index, weights=quantity_array)
+
+        for key, total in zip(group_keys.tolist(), totals.tolist()):
+            ingredient_id, unit_code = divmod(key, len(unit_names))
+            items.append({
+                "ingredient_id": ingredient_id,
+                "name": names[ingredient_id],
+                "amount": round(total, 3),
+                "unit": str(unit_names[unit_code]),
+            })
+
+        grams_code = np.searchsorted(unit_names, "g")
+        if grams_code < len(unit_names) and unit_names[grams_code] == "g":
+            calories_array = np.asarray(
+                [calories[ingredient_id] or 0 for ingredient_id in ingredient_ids], dtype=np.float64
+            )
+            grams_mask = unit_codes == grams_code
+            total_calories = float(np.dot(quantity_array[grams_mask], calories_array[grams_mask]) / 100)
+
+    return {
+        "items": items,
+        "unquantified": [
+            {"ingredient_id": ingredient_id, "name": names[ingredient_id], "amounts": amounts}
+            for ingredient_id, amounts in unquantified.items()
+        ],
+        "total_calories": round(total_calories, 1),
+    }
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+SINGLE_FLIGHT_TTL_SECONDS = 0.05
+SINGLE_FLIGHT_MAX_CACHED = 1024
+
+
+# Конкурентні однакові читання (ключ - маршрут і параметри) чекають на один
+# запит до БД замість того, щоб кожне виконувати власний SELECT.
+class SingleFlight:
+    def __init__(self, ttl: float = SINGLE_FLIGHT_TTL_SECONDS, max_cached: int = SINGLE_FLIGHT_MAX_CACHED):
+        self.ttl = ttl
+        self.max_cached = max_cached
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+
+        cached = self._results.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self.cache_hits += 1
+                return cached[1]
+            del self._results[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # скасували лідера, а не нас - пробуємо ще раз
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.do(key, fn)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        # щоб не було "exception was never retrieved", якщо ніхто не чекав
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            # forget() під час запиту означає, що результат міг застаріти
+            if self.ttl > 0 and self._inflight.get(key) is future:
+                self._store(key, result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def forget(self, key: Hashable) -> None:
+        self._results.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._results.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "inflight": len(self._inflight),
+            "ttl_seconds": self.ttl,
+        }
+
+    def _store(self, key: Hashable, result: Any) -> None:
+        if len(self._results) >= self.max_cached:
+            now = time.monotonic()
+            self._results = {k: v for k, v in self._results.items() if v[0] > now}
+            if len(self._results) >= self.max_cached:
+                return
+        self._results[key] = (time.monotonic() + self.ttl, result)
+
+
+reads = SingleFlight()
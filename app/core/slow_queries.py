@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_MAX_FINGERPRINTS = 200
+SLOW_QUERY_MAX_ROUTES = 20
+
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+# ASGI scope поточного запиту; маршрут у ньому з'являється після роутингу
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+# IN з різною кількістю параметрів - той самий запит
+_PARAMETER_LIST = re.compile(r"\(\s*(?:\?|%s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%s|\$\d+|:\w+))*\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    return _PARAMETER_LIST.sub("(?...)", normalized)
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode()).hexdigest()[:16]
+
+
+def redact(parameters: Any) -> Any:
+    # значення можуть містити email, хеші паролів і токени - лишаємо тільки типи
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact(value) for value in parameters]
+    if parameters is None:
+        return None
+    return f"<{type(parameters).__name__}>"
+
+
+def is_full_scan(plan: List[str], dialect: str) -> bool:
+    if dialect == "postgresql":
+        return any("Seq Scan" in line for line in plan)
+    # SQLite: "SCAN recipes" - повний прохід, "SCAN ... USING INDEX" - прохід по індексу
+    return any(line.startswith("SCAN ") and " INDEX " not in f"{line} " for line in plan)
+
+
+def current_route() -> Optional[str]:
+    scope = current_scope.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope.get('method', '')} {getattr(route, 'path', scope.get('path'))}".strip()
+
+
+class SlowQueryLog:
+    def __init__(
+            self,
+            threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+            max_fingerprints: int = SLOW_QUERY_MAX_FINGERPRINTS,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self.engine: Optional[AsyncEngine] = None
+        self._entries: Dict[str, dict] = {}
+        self._explaining: Set[asyncio.Task] = set()
+
+    def install(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def uninstall(self) -> None:
+        if self.engine is None:
+            return
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.remove(self.engine.sync_engine, "after_cursor_execute", self._after_execute)
+        event.remove(self.engine.sync_engine, "handle_error", self._on_error)
+        self.engine = None
+
+    def entries(self, full_scans_only: bool = False) -> List[dict]:
+        entries = [
+            {**entry, "total_ms": round(entry["total_ms"], 2), "max_ms": round(entry["max_ms"], 2)}
+            for entry in self._entries.values()
+            if not full_scans_only or entry["full_scan"]
+        ]
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        self._entries.clear()
+
+    async def drain(self) -> None:
+        if self._explaining:
+            await asyncio.gather(*self._explaining, return_exceptions=True)
+
+    def record(self, statement: str, parameters: Any, elapsed: float, route: Optional[str]) -> Optional[dict]:
+        key = fingerprint(statement)
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_fingerprints:
+                cheapest = min(self._entries, key=lambda existing: self._entries[existing]["total_ms"])
+                del self._entries[cheapest]
+            entry = self._entries[key] = {
+                "fingerprint": key,
+                "statement": normalize_statement(statement),
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": {},
+                "last_parameters": None,
+                "last_seen": None,
+                "plan": None,
+                "full_scan": None,
+            }
+        elapsed_ms = elapsed * 1000
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["last_parameters"] = redact(parameters)
+        entry["last_seen"] = time.time()
+        if route is not None and (route in entry["routes"] or len(entry["routes"]) < SLOW_QUERY_MAX_ROUTES):
+            entry["routes"][route] = entry["routes"].get(route, 0) + 1
+        return entry
+
+    def _before_execute(self, conn, _cursor, _statement, _parameters, _context, _executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, _cursor, statement, parameters, _context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        if elapsed < self.threshold or statement.startswith("EXPLAIN"):
+            return
+        entry = self.record(statement, parameters, elapsed, current_route())
+        if entry["plan"] is None and not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+            entry["plan"] = []
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            # EXPLAIN на окремому з'єднанні і поза запитом, щоб не додавати затримки клієнту
+            task = loop.create_task(self._explain(entry, statement, parameters))
+            self._explaining.add(task)
+            task.add_done_callback(self._explaining.discard)
+
+    def _on_error(self, context):
+        # after_cursor_execute для запиту, що впав, не викликається: інакше стек росте на з'єднаннях пулу
+        connection = context.connection
+        if connection is not None and context.execution_context is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+    async def _explain(self, entry: dict, statement: str, parameters: Any) -> None:
+        engine = self.engine
+        if engine is None:
+            return
+        dialect = engine.dialect.name
+        prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+        try:
+            async with engine.connect() as connection:
+                result = await connection.exec_driver_sql(prefix + statement, parameters)
+                rows = result.all()
+        except Exception:
+            logger.warning("Could not explain slow query %s", entry["fingerprint"], exc_info=True)
+            return
+        # SQLite: (id, parent, notused, detail); Postgres: один текстовий стовпець
+        entry["plan"] = [str(row[-1]) for row in rows]
+        entry["full_scan"] = is_full_scan(entry["plan"], dialect)
+        if entry["full_scan"]:
+            logger.warning("Slow query %s does a full scan: %s", entry["fingerprint"], entry["statement"])
+
+
+class QueryScopeMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+
+
+slow_queries = SlowQueryLog()
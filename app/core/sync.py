@@ -0,0 +1,63 @@
+import heapq
+import json
+from typing import List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.models.category import CategoryModel
+from app.core.models.ingredient import IngredientModel
+from app.core.models.recipe import RecipeModel
+from app.core.models.recipe_ingredient import RecipeIngredientModel
+from app.core.models.sync import TombstoneModel
+from app.core.schemas.category import CategoryResponseSchema
+from app.core.schemas.ingredient import IngredientResponseSchema
+from app.core.schemas.recipe import RecipeResponseSchema
+from app.core.schemas.recipe_ingredient import RecipeIngredientResponseSchema
+
+# сутності, які синхронізує клієнт: таблиця -> (модель, схема відповіді)
+SYNC_ENTITIES = {
+    "categories": (CategoryModel, CategoryResponseSchema),
+    "ingredients": (IngredientModel, IngredientResponseSchema),
+    "recipes": (RecipeModel, RecipeResponseSchema),
+    "recipe_ingredients": (RecipeIngredientModel, RecipeIngredientResponseSchema),
+}
+
+
+async def read_changes(session: AsyncSession, since: int, limit: int) -> Tuple[List[dict], bool]:
+    # кожна таблиця читається по індексу change_seq, далі злиття за номером зміни
+    streams = []
+    for entity, (model, schema) in SYNC_ENTITIES.items():
+        result = await session.execute(
+            select(model).where(model.change_seq > since).order_by(model.change_seq).limit(limit + 1)
+        )
+        streams.append([
+            {
+                "seq": row.change_seq,
+                "entity": entity,
+                "op": "upsert",
+                "data": schema.model_validate(row, from_attributes=True).model_dump(mode="json"),
+                "updated_at": row.updated_at,
+            }
+            for row in result.scalars().all()
+        ])
+
+    tombstones = await session.execute(
+        select(TombstoneModel)
+        .where(TombstoneModel.change_seq > since)
+        .order_by(TombstoneModel.change_seq)
+        .limit(limit + 1)
+    )
+    streams.append([
+        {
+            "seq": tombstone.change_seq,
+            "entity": tombstone.entity,
+            "op": "delete",
+            "data": json.loads(tombstone.key),
+            "updated_at": tombstone.deleted_at,
+        }
+        for tombstone in tombstones.scalars().all()
+    ])
+
+    changes = list(heapq.merge(*streams, key=lambda change: change["seq"]))
+    return changes[:limit], len(changes) > limit
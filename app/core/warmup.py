@@ -0,0 +1,62 @@
+import logging
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core import queries
+from app.core.jobs import jobs
+
+logger = logging.getLogger(__name__)
+
+# ті самі запити, що й у GET /<entity>/{id}: після виконання їх SQL лежить у кеші компіляції
+WARMUP_STATEMENTS = [
+    (queries.RECIPE_BY_ID, {"id": 0}),
+    (queries.INGREDIENT_BY_ID, {"id": 0}),
+    (queries.CATEGORY_BY_ID, {"id": 0}),
+    (queries.USER_BY_ID, {"id": 0}),
+    (queries.USER_BY_USERNAME, {"username": ""}),
+]
+
+
+class Readiness:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.ready_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    @property
+    def startup_ms(self) -> Optional[float]:
+        if self.ready_at is None:
+            return None
+        return round((self.ready_at - self.started_at) * 1000, 1)
+
+    def begin(self) -> None:
+        self.started_at = time.perf_counter()
+        self.ready_at = None
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.perf_counter()
+        logger.info("Ready to serve in %.1f ms", self.startup_ms)
+
+
+readiness = Readiness()
+
+
+async def warm_up(app: FastAPI, session_maker: async_sessionmaker, rebuild_job_id: Optional[int] = None) -> None:
+    try:
+        # інакше схему будує перший запит до /docs або /openapi.json
+        app.openapi()
+        async with session_maker() as session:
+            for statement, parameters in WARMUP_STATEMENTS:
+                await session.execute(statement, parameters)
+        if rebuild_job_id is not None:
+            await jobs.wait(rebuild_job_id)
+    except Exception:
+        # прогрів лише пришвидшує перші запити, сервер працює і без нього
+        logger.exception("Warm-up failed")
+    readiness.mark_ready()
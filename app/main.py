@@ -1,30 +1,118 @@
+import asyncio
+import os
 from typing import Union
 from fastapi import FastAPI
+from fastapi.exceptions import RequestValidationError
+from starlette.exceptions import HTTPException
 
-from app.core.models.base import BaseModel
 from app.core.settings.db import Database
 from contextlib import asynccontextmanager
 from app.core.settings.db import db
+from app.core.revocation import REVOCATION_PRUNE_INTERVAL_SECONDS, load_revoked_tokens
+from app.core.singleflight import reads
+from app.core.save_buffer import save_buffer
+from app.core.cooccurrence import ingredient_pairs
+from app.core.meal_plan import meal_plan_features
+from app.core.live import live
+from app.core.jobs import jobs, prune_finished_jobs_forever, submit_forever
+from app.core.invalidation import invalidations
+from app.core.warmup import readiness, warm_up
+from app.core.health import loop_lag
+from app.core.slow_queries import QueryScopeMiddleware, slow_queries
+from app.core.profiling import ProfilingMiddleware, request_profiler
+from app.core.queries import compiled_cache
+from app.core.concurrency import ConcurrencyLimitMiddleware, limiter
+from app.core.deadlines import DeadlineMiddleware, deadlines
+from app.core.rate_limit import rate_limiter
+from app.core.idempotency import IdempotencyMiddleware, idempotency
+from app.core.negotiation import (
+    ContentNegotiationMiddleware, NegotiatedResponse, negotiated_http_exception, negotiated_validation_error
+)
+from app.core.compression import CompressionMiddleware, compression_cache
+from app.migrate import check_schema_version, check_sync_schema
 
-from app.core.routers import category, ingredient, recipe, recipe_ingredient, saved_recipe, user, auth
+from app.core.routers import (
+    category, ingredient, recipe, recipe_ingredient, saved_recipe, user, auth, autocomplete, shopping_list,
+    meal_plan, sync, live as live_router, job, health, admin
+)
 from app.core.models import (
     user as user_model,
     category as category_model,
     recipe as recipe_model,
     ingredient as ingredient_model,
     recipe_ingredient as recipe_ingredient_model,
-    saved_recipe as saved_recipe_model
+    saved_recipe as saved_recipe_model,
+    refresh_token as refresh_token_model,
+    revoked_token as revoked_token_model,
+    sync as sync_model,
+    job as job_model,
+    invalidation as invalidation_model,
+    idempotency_key as idempotency_key_model
 )
 
+# кількість процесів uvicorn; з кількома воркерами кеші узгоджуються через таблицю invalidations
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
 @asynccontextmanager
-async def lifespan(_fastapi_app: FastAPI):
+async def lifespan(fastapi_app: FastAPI):
+   readiness.begin()
+   loop_lag.start()
    await db.connect()
-   async with db.engine.begin() as connection:
-       await connection.run_sync(BaseModel.metadata.create_all)
+   slow_queries.install(db.engine)
+   request_profiler.install(db.engine)
+   compiled_cache.install(db.engine)
+   deadlines.install(db.engine)
+   reads.clear()
+   compression_cache.clear()
+   rate_limiter.open()
+   meal_plan_features.clear()
+   ingredient_pairs.clear()
+   # схему міняє лише `python -m app.migrate`, тут одна перевірка версії
+   async with db.engine.connect() as connection:
+       await connection.run_sync(check_schema_version)
+       await connection.run_sync(check_sync_schema)
+   async with db.session_maker() as session:
+       await load_revoked_tokens(session)
+   if WORKERS > 1:
+       await invalidations.start(db.session_maker)
+   await jobs.start(db.session_maker)
+   # перебудова індексів не блокує старт, але /health не скаже ready, поки вона не завершиться
+   rebuild_job = await jobs.submit("rebuild_autocomplete")
+   warmup_task = asyncio.create_task(warm_up(fastapi_app, db.session_maker, rebuild_job.id))
+   prune_task = asyncio.create_task(submit_forever("prune_expired_tokens", REVOCATION_PRUNE_INTERVAL_SECONDS))
+   job_prune_task = asyncio.create_task(prune_finished_jobs_forever(db.session_maker))
+   if save_buffer.enabled:
+       await save_buffer.start(db.session_maker, workers=WORKERS)
+   live.start(db.session_maker)
+   idempotency.start(db.session_maker)
    yield
+   warmup_task.cancel()
+   await jobs.stop()
+   await live.stop()
+   await invalidations.stop()
+   prune_task.cancel()
+   job_prune_task.cancel()
+   if save_buffer.enabled:
+       await save_buffer.stop()
+   slow_queries.uninstall()
+   request_profiler.uninstall()
+   compiled_cache.uninstall()
+   deadlines.uninstall()
+   rate_limiter.close()
    await db.disconnect()
+   await loop_lag.stop()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=NegotiatedResponse)
+app.add_exception_handler(HTTPException, negotiated_http_exception)
+app.add_exception_handler(RequestValidationError, negotiated_validation_error)
+app.add_middleware(ContentNegotiationMiddleware)
+app.add_middleware(IdempotencyMiddleware)
+app.add_middleware(QueryScopeMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(CompressionMiddleware)
+# зовнішній шар: відкинутий запит не доходить ні до профілювання, ні до пулу з'єднань
+app.add_middleware(ConcurrencyLimitMiddleware)
 
 
 app.include_router(category.router)
@@ -34,22 +122,42 @@ app.include_router(recipe_ingredient.router)
 app.include_router(saved_recipe.router)
 app.include_router(user.router)
 app.include_router(auth.router)
+app.include_router(autocomplete.router)
+app.include_router(shopping_list.router)
+app.include_router(meal_plan.router)
+app.include_router(sync.router)
+app.include_router(live_router.router)
+app.include_router(job.router)
+app.include_router(health.router)
+app.include_router(admin.router)
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
 
-@app.get(path="/health", tags=["System"])
-async def health():
-   ok = await db.ping()
-   return {"status": "ok" if ok else "error"}
+@app.get(path="/metrics", tags=["System"])
+async def metrics():
+   return {
+       "singleflight": reads.stats(),
+       "write_lane": db.write_lane.stats() if db.write_lane else None,
+       "save_buffer": save_buffer.stats() if save_buffer.enabled else None,
+       "live": live.stats(),
+       "invalidations": invalidations.stats(),
+       "compiled_cache": compiled_cache.stats(),
+       "concurrency": limiter.stats(),
+       "deadlines": deadlines.stats(),
+       "rate_limit": {"rejected": rate_limiter.rejected},
+       "idempotency": idempotency.stats(),
+       "compression": compression_cache.stats(),
+   }
 
 
 if __name__ == "__main__":
     import uvicorn
 
     uvicorn.run(
-        app,
+        "app.main:app",
         port=8000,
         log_level="info",
         use_colors=False,
+        workers=WORKERS,
     )
\ No newline at end of file
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import (
+    Column, Connection, DateTime, Float, ForeignKey, Integer, LargeBinary, MetaData, String, Table, Text,
+    UniqueConstraint, bindparam, column, func, inspect, select, table, text,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.models.schema_version import SchemaVersionModel
+from app.core.settings.db import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# схеми кроків заморожені: зміна моделей сюди не потрапляє, для неї пишеться нова міграція
+BASELINE = MetaData()
+Table(
+    "users", BASELINE,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, nullable=False),
+    Column("email", String(100), unique=True, nullable=False),
+    Column("password", String(255), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+Table(
+    "categories", BASELINE,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(30), unique=True, nullable=False),
+)
+Table(
+    "ingredients", BASELINE,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), unique=True, nullable=False),
+    Column("calories_per_100g", Integer),
+)
+Table(
+    "recipes", BASELINE,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("author_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("category_id", Integer, ForeignKey("categories.id"), nullable=False),
+    Column("name", String(100), nullable=False),
+    Column("description", Text),
+    Column("instructions", Text),
+    Column("cooking_time_minutes", Integer),
+    Column("image_url", String(255)),
+    Column("created_at", DateTime, nullable=False),
+)
+Table(
+    "recipe_ingredients", BASELINE,
+    Column("recipe_id", Integer, ForeignKey("recipes.id"), primary_key=True),
+    Column("ingredient_id", Integer, ForeignKey("ingredients.id"), primary_key=True),
+    Column("amount", String(50), nullable=False),
+)
+Table(
+    "saved_recipes", BASELINE,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("recipe_id", Integer, ForeignKey("recipes.id"), nullable=False),
+    Column("saved_at", DateTime, nullable=False),
+    UniqueConstraint("user_id", "recipe_id", name="_user_recipe_uc"),
+)
+Table(
+    "refresh_tokens", BASELINE,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), index=True, nullable=False),
+    Column("token_hash", String(64), unique=True, index=True, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
+Table(
+    "revoked_tokens", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("jti", String(32), unique=True, index=True, nullable=False),
+    Column("expires_at", DateTime, index=True, nullable=False),
+)
+Table(
+    "jobs", BASELINE,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("type", String(50), nullable=False),
+    Column("status", String(20), index=True, nullable=False),
+    Column("progress", Float, nullable=False),
+    Column("params", Text),
+    Column("result", Text),
+    Column("error", Text),
+    Column("created_at", DateTime, nullable=False),
+    Column("started_at", DateTime),
+    Column("finished_at", DateTime),
+)
+Table(
+    "invalidations", BASELINE,
+    Column("id", Integer, primary_key=True),
+    Column("origin", String(32), nullable=False),
+    Column("kind", String(30), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("created_at", Float, index=True, nullable=False),
+    sqlite_autoincrement=True,
+)
+
+SYNC_TABLES = MetaData()
+Table(
+    "change_sequence", SYNC_TABLES,
+    Column("id", Integer, primary_key=True),
+    Column("value", Integer, nullable=False),
+)
+Table(
+    "tombstones", SYNC_TABLES,
+    Column("id", Integer, primary_key=True),
+    Column("entity", String(50), nullable=False),
+    Column("key", String(255), nullable=False),
+    Column("change_seq", Integer, index=True, nullable=False),
+    Column("deleted_at", DateTime, nullable=False),
+)
+# таблиця каталогу -> її первинний ключ
+SYNCED_TABLES: Dict[str, Tuple[str, ...]] = {
+    "categories": ("id",),
+    "ingredients": ("id",),
+    "recipes": ("id",),
+    "recipe_ingredients": ("recipe_id", "ingredient_id"),
+}
+
+IDEMPOTENCY_TABLES = MetaData()
+Table(
+    "idempotency_keys", IDEMPOTENCY_TABLES,
+    Column("key", String(64), primary_key=True),
+    Column("request_hash", String(64), nullable=False),
+    Column("status_code", Integer),
+    Column("headers", Text),
+    Column("body", LargeBinary),
+    Column("expires_at", Float, index=True, nullable=False),
+)
+
+
+def create_baseline(connection: Connection) -> None:
+    # на порожній базі - схема версії 1, на існуючій - лише відсутні таблиці
+    BASELINE.create_all(connection)
+
+
+def add_sync_columns(connection: Connection) -> None:
+    SYNC_TABLES.create_all(connection)
+    inspector = inspect(connection)
+    updated_at = DateTime().compile(dialect=connection.dialect)
+    for table_name in SYNCED_TABLES:
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        if "updated_at" not in existing:
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN updated_at {updated_at}"))
+        if "change_seq" not in existing:
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"))
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_change_seq ON {table_name} (change_seq)"))
+    backfill_change_seq(connection)
+
+
+def backfill_change_seq(connection: Connection) -> None:
+    # рядки, що існували до міграції, отримують номери з послідовності, інакше /sync?since=0 їх не бачить
+    sequence = SYNC_TABLES.tables["change_sequence"]
+    seq = connection.execute(select(sequence.c.value).where(sequence.c.id == 1)).scalar()
+    exists = seq is not None
+    seq = seq or 0
+    for table_name, key_names in SYNCED_TABLES.items():
+        synced = table(table_name, column("change_seq"), column("updated_at"), *[column(name) for name in key_names])
+        key_columns = [synced.c[name] for name in key_names]
+        rows = connection.execute(
+            select(*key_columns).where(synced.c.change_seq == 0).order_by(*key_columns)
+        ).all()
+        if not rows:
+            continue
+        statement = (
+            synced.update()
+            .where(*[key == bindparam(f"key_{key.name}") for key in key_columns])
+            .values(change_seq=bindparam("seq"), updated_at=func.coalesce(synced.c.updated_at, func.now()))
+        )
+        parameters = []
+        for row in rows:
+            seq += 1
+            parameters.append({"seq": seq, **{f"key_{key.name}": value for key, value in zip(key_columns, row)}})
+        connection.execute(statement, parameters)
+    if exists:
+        connection.execute(sequence.update().where(sequence.c.id == 1).values(value=seq))
+    elif seq:
+        connection.execute(sequence.insert().values(id=1, value=seq))
+
+
+def add_idempotency_keys(connection: Connection) -> None:
+    IDEMPOTENCY_TABLES.create_all(connection)
+
+
+def add_idempotency_lease(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("idempotency_keys")}
+    if "claimed_at" not in existing:
+        connection.execute(text("ALTER TABLE idempotency_keys ADD COLUMN claimed_at FLOAT"))
+
+
+def add_job_heartbeat(connection: Connection) -> None:
+    existing = {column["name"] for column in inspect(connection).get_columns("jobs")}
+    if "heartbeat_at" not in existing:
+        heartbeat_at = DateTime().compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE jobs ADD COLUMN heartbeat_at {heartbeat_at}"))
+
+
+# (версія, опис, крок); кожен крок має бути безпечним для бази, створеної baseline
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline schema", create_baseline),
+    (2, "sync columns on catalog tables", add_sync_columns),
+    (3, "idempotency keys", add_idempotency_keys),
+    (4, "idempotency claim lease", add_idempotency_lease),
+    (5, "job heartbeat lease", add_job_heartbeat),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table(SchemaVersionModel.__tablename__):
+        return 0
+    return connection.execute(select(SchemaVersionModel.version).where(SchemaVersionModel.id == 1)).scalar() or 0
+
+
+def check_schema_version(connection: Connection) -> None:
+    # один запит на старті замість рефлексії всіх таблиць у create_all
+    try:
+        version = connection.execute(
+            select(SchemaVersionModel.version).where(SchemaVersionModel.id == 1)
+        ).scalar() or 0
+    except DBAPIError:
+        version = 0
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {SCHEMA_VERSION}. Run `python -m app.migrate` first."
+        )
+
+
+def check_sync_schema(connection: Connection) -> None:
+    # GET /sync і кожен запис каталогу покладаються на колонки міграції 2; без них - відмова на старті,
+    # а не помилка на першому запиті
+    inspector = inspect(connection)
+    missing = [name for name in SYNC_TABLES.tables if not inspector.has_table(name)]
+    for table_name in SYNCED_TABLES:
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        missing += [f"{table_name}.{name}" for name in ("updated_at", "change_seq") if name not in existing]
+    if missing:
+        raise RuntimeError(
+            f"Database is missing sync schema ({', '.join(missing)}). Run `python -m app.migrate` first."
+        )
+
+
+def apply_migrations(connection: Connection) -> List[int]:
+    version = current_version(connection)
+    SchemaVersionModel.__table__.create(connection, checkfirst=True)
+    applied = []
+    for migration_version, description, step in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        logger.info("Applying migration %d: %s", migration_version, description)
+        step(connection)
+        applied.append(migration_version)
+
+    if applied:
+        if version == 0:
+            connection.execute(SchemaVersionModel.__table__.insert().values(id=1, version=SCHEMA_VERSION))
+        else:
+            connection.execute(
+                SchemaVersionModel.__table__.update().where(SchemaVersionModel.id == 1).values(version=SCHEMA_VERSION)
+            )
+    return applied
+
+
+async def migrate(url: str = DATABASE_URL) -> List[int]:
+    engine = create_async_engine(url, echo=False)
+    try:
+        async with engine.begin() as connection:
+            return await connection.run_sync(apply_migrations)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    applied_versions = asyncio.run(migrate())
+    print(f"Schema is at version {SCHEMA_VERSION}" + (f", applied {applied_versions}" if applied_versions else ", nothing to apply"))
@@ -0,0 +1,67 @@
+"""Мікробенчмарк гарячих запитів: select, що будується на кожен виклик, проти app.core.queries.
+
+    python -m benchmarks.hot_queries [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import queries
+from app.core.models.base import BaseModel
+from app.core.models import (  # noqa: F401
+    user, category, recipe, ingredient, recipe_ingredient, saved_recipe, refresh_token, revoked_token, sync, job,
+    invalidation
+)
+from app.core.models.recipe import RecipeModel
+from app.core.queries import CompiledCacheStats
+
+
+def per_call_us(started: float, iterations: int) -> float:
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def bench_cache_key(iterations: int) -> None:
+    # лише Python: побудова виразу і ключа кешу, без драйвера
+    started = time.perf_counter()
+    for i in range(iterations):
+        select(RecipeModel).where(RecipeModel.id == i)._generate_cache_key()
+    inline = per_call_us(started, iterations)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        queries.RECIPE_BY_ID._generate_cache_key()
+    prebuilt = per_call_us(started, iterations)
+    print(f"build + cache key   inline {inline:8.2f} us   prebuilt {prebuilt:8.2f} us")
+
+
+async def bench_execute(iterations: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    cache = CompiledCacheStats()
+    cache.install(engine)
+    async with engine.begin() as connection:
+        await connection.run_sync(BaseModel.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with session_maker() as session:
+        started = time.perf_counter()
+        for i in range(iterations):
+            await session.execute(select(RecipeModel).where(RecipeModel.id == i))
+        inline = per_call_us(started, iterations)
+
+        started = time.perf_counter()
+        for i in range(iterations):
+            await session.execute(queries.RECIPE_BY_ID, {"id": i})
+        prebuilt = per_call_us(started, iterations)
+    print(f"session.execute     inline {inline:8.2f} us   prebuilt {prebuilt:8.2f} us")
+    print(f"compiled cache      {cache.stats()}")
+    cache.uninstall()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    bench_cache_key(count)
+    asyncio.run(bench_execute(count // 4))
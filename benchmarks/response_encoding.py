@@ -0,0 +1,60 @@
+"""Розмір і час кодування списку рецептів: JSON (як у JSONResponse) проти MessagePack.
+
+    python -m benchmarks.response_encoding [recipes] [rounds]
+"""
+import json
+import sys
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.core.schemas.recipe import RecipeResponseSchema
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def make_recipes(count: int) -> list:
+    return [
+        RecipeResponseSchema.model_validate({
+            "id": i + 1,
+            "author_id": i % 50 + 1,
+            "category_id": i % 12 + 1,
+            "name": f"Recipe {i}",
+            "description": "A hearty dish with seasonal vegetables. " * 3,
+            "instructions": "Chop, simmer for twenty minutes, season and serve warm. " * 5,
+            "cooking_time_minutes": 30 + i % 60,
+            "image_url": None,
+            "created_at": datetime(2024, 1, 1),
+        })
+        for i in range(count)
+    ]
+
+
+def bench(name: str, encode, decode, content, rounds: int) -> None:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        body = encode(content)
+    encoded_ms = (time.perf_counter() - started) / rounds * 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        decode(body)
+    decoded_ms = (time.perf_counter() - started) / rounds * 1000
+    print(f"{name:8} {len(body):>10} bytes   encode {encoded_ms:7.2f} ms   decode {decoded_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    # так само, як FastAPI: схема -> jsonable_encoder -> render класу відповіді
+    content = jsonable_encoder(make_recipes(count))
+    json_response = JSONResponse(content=None)
+    bench("json", json_response.render, json.loads, content, rounds)
+    if msgpack is None:
+        print("msgpack is not installed: pip install msgpack")
+    else:
+        bench("msgpack", msgpack.packb, msgpack.unpackb, content, rounds)
@@ -7,17 +7,33 @@ from httpx import AsyncClient, ASGITransport
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from app.core.models.base import BaseModel
+from app.core.models.schema_version import SchemaVersionModel
 from app.main import app
+from app.migrate import migrate
 from app.core.settings.db import db
 
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+   # окремий файл на сесію: і тести, і фонові підсистеми застосунку працюють з тією самою базою
+   return f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}"
+
+
+@pytest_asyncio.fixture(scope="session", autouse=True)
+async def migrated_database(database_url):
+   # lifespan лише перевіряє версію схеми, тому базу застосунку мігруємо явно
+   await migrate(database_url)
+   url, db.url = db.url, database_url
+   yield
+   db.url = url
 
 
 @pytest_asyncio.fixture(scope="session")
-async def db_engine():
-   engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+async def db_engine(database_url, migrated_database):
+   engine = create_async_engine(database_url, echo=False)
    async with engine.begin() as conn:
-       await conn.run_sync(BaseModel.metadata.create_all)
+       # читачі тестів не блокують записи задач і шини інвалідацій
+       await conn.exec_driver_sql("PRAGMA journal_mode=WAL")
    yield engine
    await engine.dispose()
 
@@ -33,7 +49,9 @@ async def db_session(db_engine):
 @pytest_asyncio.fixture(autouse=True)
 async def clear_db(db_session: AsyncSession):
    for table in reversed(BaseModel.metadata.sorted_tables):
-       await db_session.execute(table.delete())
+       # версію схеми перевіряє lifespan кожного тесту
+       if table is not SchemaVersionModel.__table__:
+           await db_session.execute(table.delete())
    await db_session.commit()
 
 
@@ -0,0 +1,56 @@
+from app.core.autocomplete import NameIndex
+
+
+def make_index():
+    index = NameIndex()
+    index.load([
+        (1, "Tomato Soup", 5),
+        (2, "Tomato Salad", 20),
+        (3, "Grilled Tomatoes", 1),
+        (4, "Potato Pancakes", 50),
+    ])
+    return index
+
+
+def test_prefix_matches_ranked_by_popularity():
+    index = make_index()
+
+    names = [item["name"] for item in index.search("tom", limit=3)]
+    assert names == ["Tomato Salad", "Tomato Soup", "Grilled Tomatoes"]
+
+
+def test_fuzzy_fallback_for_typos():
+    index = make_index()
+
+    names = [item["name"] for item in index.search("tomatto soup", limit=1)]
+    assert names == ["Tomato Soup"]
+
+
+def test_add_update_and_remove():
+    index = make_index()
+    index.bump(3, 100)
+    index.add(3, "Roasted Tomatoes")
+
+    assert all(item["id"] != 3 for item in index.search("grilled"))
+    assert index.search("roasted")[0] == {"id": 3, "name": "Roasted Tomatoes", "popularity": 101}
+
+    index.remove(3)
+    assert all(item["id"] != 3 for item in index.search("roasted tomatoes"))
+    assert len(index) == 3
+
+
+def test_short_prefix_finds_popular_item_past_many_keys():
+    index = NameIndex()
+    index.load([(item_id, f"Taa {item_id:05d}", 0) for item_id in range(1, 3000)] + [(5000, "Tzz Popular", 10)])
+
+    assert index.search("t", limit=1)[0]["id"] == 5000
+
+    # популярність змінюється без перебудови індексу
+    index.bump(7, 20)
+    assert [item["id"] for item in index.search("ta", limit=2)] == [7, 1]
+    index.bump(7, -20)
+    assert [item["id"] for item in index.search("ta", limit=2)] == [1, 2]
+    index.bump(2999, 50)
+    assert [item["id"] for item in index.search("t", limit=2)] == [2999, 5000]
+    index.remove(2999)
+    assert index.search("t", limit=1)[0]["id"] == 5000
@@ -0,0 +1,92 @@
+import gzip
+import sqlite3
+import threading
+
+import pytest
+
+from app import backup
+
+
+def make_database(path, rows=2000):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    connection.executemany("INSERT INTO items (name) VALUES (?)", [(f"item {i}" * 10,) for i in range(rows)])
+    connection.commit()
+    connection.close()
+
+
+def count_items(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT count(*) FROM items").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_snapshot_is_consistent_while_writers_run(tmp_path):
+    source = tmp_path / "live.db"
+    make_database(source)
+    stop = threading.Event()
+
+    def writer():
+        connection = sqlite3.connect(source, timeout=5)
+        while not stop.is_set():
+            connection.execute("INSERT INTO items (name) VALUES ('concurrent')")
+            connection.commit()
+        connection.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        backup.snapshot(str(source), str(tmp_path / "copy.db"), pages=4, pause=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    copy = sqlite3.connect(tmp_path / "copy.db")
+    assert copy.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    assert copy.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    assert copy.execute("SELECT count(*) FROM items WHERE name != 'concurrent'").fetchone()[0] == 2000
+    copy.close()
+
+
+@pytest.mark.asyncio
+async def test_streamed_snapshot_restores_on_a_fresh_node(tmp_path):
+    make_database(tmp_path / "live.db")
+
+    chunks = [chunk async for chunk in backup.stream_snapshot(f"sqlite+aiosqlite:///{tmp_path}/live.db")]
+    archive = tmp_path / "snapshot.db.gz"
+    archive.write_bytes(b"".join(chunks))
+    assert gzip.decompress(archive.read_bytes()).startswith(b"SQLite format 3\x00")
+
+    fresh = f"sqlite+aiosqlite:///{tmp_path}/node/fresh.db"
+    backup.restore(str(archive), fresh)
+    assert count_items(tmp_path / "node" / "fresh.db") == 2000
+    with pytest.raises(FileExistsError):
+        backup.restore(str(archive), fresh)
+
+
+def test_restore_rejects_a_corrupt_snapshot(tmp_path):
+    make_database(tmp_path / "live.db", rows=10)
+    archive = tmp_path / "broken.db.gz"
+    archive.write_bytes(gzip.compress(b"not a database" * 100))
+
+    with pytest.raises(sqlite3.DatabaseError):
+        backup.restore(str(archive), f"sqlite:///{tmp_path}/live.db", force=True)
+    assert count_items(tmp_path / "live.db") == 10
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".restore"] == []
+
+
+def test_throttle_spreads_bytes_over_time():
+    throttle = backup.Throttle(bytes_per_second=1000)
+    assert throttle.delay(500) == pytest.approx(0.5, abs=0.05)
+    assert throttle.delay(500) == pytest.approx(1.0, abs=0.05)
+    assert backup.Throttle(0).delay(10 ** 9) == 0.0
+
+
+def test_only_file_databases_can_be_snapshotted():
+    with pytest.raises(ValueError):
+        backup.database_path("sqlite+aiosqlite:///:memory:")
+    with pytest.raises(ValueError):
+        backup.database_path("postgresql+asyncpg://localhost/app")
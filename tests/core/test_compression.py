@@ -0,0 +1,114 @@
+import gzip
+import zlib
+
+import pytest
+
+from app.core.compression import CompressionCache, CompressionMiddleware, choose_encoding, etag_matches
+from app.core import compression
+
+BODY = b'{"instructions": "' + b"Chop, simmer and serve. " * 200 + b'"}'
+
+
+def make_scope(path="/recipes/", headers=((b"accept-encoding", b"gzip"),)):
+    return {"type": "http", "method": "GET", "path": path, "headers": list(headers)}
+
+
+async def call(app, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await CompressionMiddleware(app)(scope, receive, send)
+    return sent[0], sent[1:]
+
+
+def json_app(body):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def test_encoding_negotiation():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("*") is not None
+    assert choose_encoding("") is None
+
+
+@pytest.mark.asyncio
+async def test_tagged_body_is_compressed_once_and_revalidated(monkeypatch):
+    cache = CompressionCache()
+    monkeypatch.setattr(compression, "compression_cache", cache)
+    handled = []
+    inner = json_app(BODY)
+
+    async def app(scope, receive, send):
+        handled.append(scope["path"])
+        await inner(scope, receive, send)
+
+    start, [body] = await call(app, make_scope())
+    again_start, [again] = await call(app, make_scope())
+
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert gzip.decompress(body["body"]) == BODY
+    assert again["body"] == body["body"]
+    assert cache.compressions == 1 and cache.hits == 1
+
+    etag = headers[b"etag"]
+    assert etag_matches(etag.decode(), etag.decode())
+    not_modified, [empty] = await call(app, make_scope(headers=[
+        (b"accept-encoding", b"gzip"), (b"if-none-match", etag),
+    ]))
+    assert not_modified["status"] == 304
+    assert dict(not_modified["headers"])[b"vary"] == b"Accept-Encoding"
+    assert empty["body"] == b""
+    # ETag рахується з готового тіла: обробник виконується і для повтору, і для 304
+    assert len(handled) == 3
+
+
+@pytest.mark.asyncio
+async def test_small_and_streaming_responses():
+    start, [body] = await call(json_app(b"{}"), make_scope("/users/1"))
+    assert b"content-encoding" not in dict(start["headers"])
+    assert body["body"] == b"{}"
+
+    async def streaming_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        for chunk in (b"first ", b"second ", b"third"):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    start, chunks = await call(streaming_app, make_scope("/export"))
+    decompressor = zlib.decompressobj(31)
+    # кожен шматок розпаковується одразу, без очікування кінця потоку
+    assert decompressor.decompress(chunks[0]["body"]) == b"first "
+    rest = b"".join(decompressor.decompress(chunk["body"]) for chunk in chunks[1:])
+    assert rest == b"second third"
+    assert dict(start["headers"])[b"content-encoding"] == b"gzip"
+
+
+@pytest.mark.asyncio
+async def test_vary_is_sent_whether_or_not_the_body_is_compressed():
+    for body, headers in ((b"{}", [(b"accept-encoding", b"gzip")]), (BODY, [])):
+        start, _ = await call(json_app(body), make_scope("/users/1", headers))
+        headers = dict(start["headers"])
+        assert b"content-encoding" not in headers
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+    async def negotiated_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"application/json"), (b"vary", b"Accept"),
+        ]})
+        await send({"type": "http.response.body", "body": BODY})
+
+    start, _ = await call(negotiated_app, make_scope("/users/1"))
+    assert [value for key, value in start["headers"] if key == b"vary"] == [b"Accept, Accept-Encoding"]
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app.core import concurrency
+from app.core.concurrency import CRITICAL, LOW, NORMAL, AdaptiveLimiter, ConcurrencyLimitMiddleware, route_priority
+
+
+@pytest.mark.asyncio
+async def test_request_is_shed_after_queue_timeout():
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, queue_timeout_ms={CRITICAL: 1000, NORMAL: 50, LOW: 10})
+    assert await limiter.acquire(NORMAL)
+
+    assert not await limiter.acquire(LOW)
+    limiter.release(0.001)
+
+    stats = limiter.stats()
+    assert stats["shed"]["low"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["queued"] == 0
+    # відкинутий очікувач не блокує наступних
+    assert await limiter.acquire(LOW)
+
+
+@pytest.mark.asyncio
+async def test_freed_slot_goes_to_higher_priority_first():
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1)
+    assert await limiter.acquire(NORMAL)
+    admitted = []
+
+    async def wait(priority):
+        if await limiter.acquire(priority):
+            admitted.append(priority)
+
+    low = asyncio.create_task(wait(LOW))
+    await asyncio.sleep(0)
+    critical = asyncio.create_task(wait(CRITICAL))
+    await asyncio.sleep(0)
+    limiter.release(0.001)
+    await critical
+    assert admitted == [CRITICAL]
+
+    limiter.release(0.001)
+    await low
+    assert admitted == [CRITICAL, LOW]
+
+
+@pytest.mark.asyncio
+async def test_limit_backs_off_on_slow_responses_and_grows_when_saturated():
+    limiter = AdaptiveLimiter(initial_limit=10, latency_target_ms=100)
+    for _ in range(10):
+        await limiter.acquire(NORMAL)
+    limiter.release(0.5)
+    assert limiter.stats()["limit"] == 9
+
+    for _ in range(9):
+        limiter.release(0.01)
+    grown = limiter.limit
+    assert grown > 9
+    for _ in range(20):
+        await limiter.acquire(NORMAL)
+        limiter.release(0.01)
+    # без навантаження ліміт не росте
+    assert limiter.limit == grown
+
+
+def test_route_priorities():
+    assert route_priority("/health/ready") == CRITICAL
+    assert route_priority("/auth/login") == CRITICAL
+    assert route_priority("/recipes/1") == NORMAL
+    assert route_priority("/sync") == LOW
+
+
+@pytest.mark.asyncio
+async def test_long_streams_bypass_the_limiter(monkeypatch):
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, queue_timeout_ms={CRITICAL: 10, NORMAL: 10, LOW: 10})
+    monkeypatch.setattr(concurrency, "limiter", limiter)
+    assert await limiter.acquire(NORMAL)
+    statuses = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        statuses.append(message.get("status"))
+
+    for path in ("/admin/backup", "/live/recipes", "/admin/cache"):
+        await ConcurrencyLimitMiddleware(app)({"type": "http", "path": path, "headers": []}, None, send)
+    assert statuses[:3] == [200, 200, 503]
+    assert limiter.in_flight == 1
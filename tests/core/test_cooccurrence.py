@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+
+from app.core.cooccurrence import IngredientPairs, pair_positions
+
+
+INGREDIENTS = [(1, "Flour"), (2, "Egg"), (3, "Sugar"), (4, "Salt")]
+# (рецепт, категорія, інгредієнт)
+LINKS = [
+    (10, 100, 1), (10, 100, 2), (10, 100, 3),
+    (11, 100, 1), (11, 100, 2),
+    (12, 100, 1), (12, 100, 3),
+    (13, 200, 1), (13, 200, 4),
+    (14, 200, 2), (14, 200, 3),
+    (15, 200, 2), (15, 200, 3),
+]
+
+
+def test_pair_positions_cover_every_recipe_pair():
+    recipes = np.asarray([0, 0, 0, 1, 1, 2])
+    ingredients = np.asarray([2, 0, 1, 0, 1, 3])
+    first, second = pair_positions(recipes, ingredients)
+
+    pairs = sorted(zip(ingredients[first].tolist(), ingredients[second].tolist()))
+    assert pairs == [(0, 1), (0, 1), (0, 2), (1, 2)]
+
+
+def test_lift_and_pmi():
+    pairs = IngredientPairs.build(INGREDIENTS, LINKS)
+
+    assert pairs.recipes == 6
+    # борошно і яйце: разом у 2 з 6 рецептів, кожен окремо - у 4
+    [(other, together, lift, pmi)] = [pair for pair in pairs.pairs[1] if pair[0] == 2]
+    assert (other, together) == (2, 2)
+    assert lift == 0.75
+    assert pmi == round(math.log2(0.75), 4)
+    # пари з одного рецепту відкинуті через мінімальну підтримку
+    assert 4 not in pairs.pairs
+    # яйце і цукор: найвищий lift серед партнерів яйця
+    assert pairs.pairs[2][0][:2] == (3, 3)
+
+
+def test_category_pairs_use_category_probabilities():
+    pairs = IngredientPairs.build(INGREDIENTS, LINKS)
+
+    assert [pair[:3] for pair in pairs.category_pairs[100]] == [(1, 2, 2), (1, 3, 2)]
+    # у категорії 200 яйце і цукор завжди разом
+    [(first, second, together, lift, _pmi)] = pairs.category_pairs[200]
+    assert (first, second, together) == (2, 3, 2)
+    assert lift == 1.5
+
+
+def test_top_k_limits_each_list():
+    links = [(recipe, 1, ingredient) for recipe in range(3) for ingredient in range(10)]
+    pairs = IngredientPairs.build([], links, top_k=3, category_top=5)
+
+    assert all(len(partners) == 3 for partners in pairs.pairs.values())
+    assert len(pairs.category_pairs[1]) == 5
+
+
+def test_empty_catalog():
+    pairs = IngredientPairs.build(INGREDIENTS, [])
+
+    assert pairs.recipes == 0
+    assert pairs.pairs == {} and pairs.category_pairs == {}
+
+
+def test_both_lists_rank_by_lift_first():
+    rng = np.random.default_rng(7)
+    links = sorted({
+        (int(recipe), int(recipe % 3), int(ingredient))
+        for recipe in range(60) for ingredient in rng.choice(12, size=4, replace=False)
+    })
+    pairs = IngredientPairs.build([], links)
+
+    lists = [[lift for _, _, lift, _ in partners] for partners in pairs.pairs.values()]
+    lists += [[lift for _, _, _, lift, _ in partners] for partners in pairs.category_pairs.values()]
+    assert all(lifts == sorted(lifts, reverse=True) for lifts in lists)
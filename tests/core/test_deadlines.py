@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.deadlines import DeadlineMiddleware, DeadlineTracker, RequestDeadline, current_deadline, deadline_budget
+
+SLOW_QUERY = text(
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 100000000) SELECT count(*) FROM n"
+)
+
+
+def make_scope(path="/recipes/", headers=()):
+    return {"type": "http", "method": "GET", "path": path, "headers": list(headers)}
+
+
+def test_header_can_only_shorten_route_deadline():
+    assert deadline_budget(make_scope()) == 10
+    assert deadline_budget(make_scope(headers=[(b"x-request-deadline", b"250")])) == 0.25
+    assert deadline_budget(make_scope("/health", [(b"x-request-deadline", b"60000")])) == 1
+    assert deadline_budget(make_scope(headers=[(b"x-request-deadline", b"soon")])) == 10
+
+
+@pytest.mark.asyncio
+async def test_running_sqlite_statement_is_interrupted(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'deadline.db'}")
+    tracker = DeadlineTracker()
+    tracker.install(engine)
+    deadline = RequestDeadline(0.05)
+
+    async def run_query():
+        current_deadline.set(deadline)
+        async with engine.connect() as connection:
+            await connection.execute(SLOW_QUERY)
+
+    query = asyncio.create_task(run_query())
+    await asyncio.sleep(0.1)
+    await tracker.cancel(deadline)
+
+    with pytest.raises(OperationalError, match="interrupted"):
+        await asyncio.wait_for(query, timeout=5)
+    assert tracker.interrupted == 1
+    assert engine.pool.checkedout() == 0
+    # з'єднання повернулось у пул придатним
+    async with engine.connect() as connection:
+        assert (await connection.execute(text("SELECT 1"))).scalar() == 1
+    tracker.uninstall()
+    await engine.dispose()
+
+
+async def run_middleware(app, scope, receive):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    await DeadlineMiddleware(app)(scope, receive, send)
+    return sent
+
+
+@pytest.mark.asyncio
+async def test_expired_request_gets_504():
+    cancelled = []
+
+    async def slow_app(scope, receive, send):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    sent = await run_middleware(slow_app, make_scope(headers=[(b"x-request-deadline", b"20")]), receive)
+
+    assert cancelled == [True]
+    assert sent[0]["status"] == 504
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_handler():
+    cancelled = []
+
+    async def slow_app(scope, receive, send):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def receive():
+        await asyncio.sleep(0.02)
+        return {"type": "http.disconnect"}
+
+    sent = await run_middleware(slow_app, make_scope(), receive)
+
+    assert cancelled == [True]
+    assert sent == []
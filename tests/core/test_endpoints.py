@@ -1,3 +1,6 @@
+import asyncio
+import json
+
 import pytest
 import pytest_asyncio
 from app.core.utils import get_password_hash
@@ -128,6 +131,21 @@ async def saved_recipe_factory(db_session, user_factory, recipe_factory):
 
 # ДОПОМІЖНІ ФІКСТУРИ
 
+async def wait_for_rebuild(job_type):
+    # фонова перебудова, поставлена запитом або інвалідацією; у базі тесту вона єдина незавершена
+    from sqlalchemy import select
+
+    from app.core.jobs import FINISHED, jobs
+    from app.core.models.job import JobModel
+    from app.core.settings.db import db
+
+    async with db.session_maker() as session:
+        [job_id] = (await session.execute(
+            select(JobModel.id).where(JobModel.type == job_type, JobModel.status.not_in(FINISHED))
+        )).scalars().all()
+    await jobs.wait(job_id)
+
+
 @pytest_asyncio.fixture
 async def auth_headers(client, user_factory):
     """Створює юзера, логіниться і повертає заголовок з токеном"""
@@ -159,6 +177,133 @@ async def test_health(client):
     assert response.json()["status"] == "ok"
 
 
+@pytest.mark.asyncio
+async def test_health_probes(client, auth_headers, monkeypatch):
+    live = await client.get("/health/live")
+    assert live.json() == {"status": "ok"}
+
+    ready = await client.get("/health/ready")
+    assert ready.status_code in (200, 503)
+    assert ready.json()["database"] is True
+
+    assert (await client.get("/health/diagnostics")).status_code == 401
+    assert (await client.get("/health/diagnostics", headers=auth_headers)).status_code == 403
+    monkeypatch.setattr("app.core.auth.ADMIN_USERNAMES", frozenset({"tester"}))
+    diagnostics = await client.get("/health/diagnostics", headers=auth_headers)
+    assert diagnostics.status_code == 200
+    assert "checkedout" in diagnostics.json()["pool"]
+    assert "histogram" in diagnostics.json()["loop_lag"]
+
+
+@pytest.mark.asyncio
+async def test_admin_slow_queries_requires_admin(client, auth_headers, monkeypatch):
+    from app.core.slow_queries import SLOW_QUERY_MAX_FINGERPRINTS
+
+    response = await client.get("/admin/slow_queries", headers=auth_headers)
+    assert response.status_code == 403
+
+    monkeypatch.setattr("app.core.auth.ADMIN_USERNAMES", frozenset({"tester"}))
+    response = await client.get("/admin/slow_queries", headers=auth_headers)
+    assert response.status_code == 200
+    assert "queries" in response.json()
+    # журнал тримає не більше SLOW_QUERY_MAX_FINGERPRINTS записів
+    for limit in (0, -1, SLOW_QUERY_MAX_FINGERPRINTS + 1):
+        response = await client.get("/admin/slow_queries", params={"limit": limit}, headers=auth_headers)
+        assert response.status_code == 422
+
+    response = await client.delete("/admin/slow_queries", headers=auth_headers)
+    assert response.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_profiled_request_is_listed_for_admin(client, auth_headers, recipe_factory, monkeypatch, tmp_path):
+    from app.core.profiling import request_profiler
+
+    recipe = await recipe_factory()
+    monkeypatch.setattr(request_profiler, "token", "secret")
+    monkeypatch.setattr(request_profiler, "directory", tmp_path)
+    monkeypatch.setattr("app.core.auth.ADMIN_USERNAMES", frozenset({"tester"}))
+
+    response = await client.get(f"/recipes/{recipe.id}", headers={"X-Profile": "secret"})
+    profile_id = response.headers["x-profile-id"]
+
+    listing = await client.get("/admin/profiles", headers=auth_headers)
+    assert listing.status_code == 200
+    [profile] = listing.json()["profiles"]
+    assert profile["id"] == profile_id
+    assert profile["route"] == "/recipes/{recipe_id}"
+
+    download = await client.get(f"/admin/profiles/{profile_id}", headers=auth_headers)
+    assert download.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_admin_downloads_database_snapshot(client, auth_headers, recipe_factory, monkeypatch):
+    import gzip
+
+    await recipe_factory()
+    monkeypatch.setattr("app.core.auth.ADMIN_USERNAMES", frozenset({"tester"}))
+
+    response = await client.get("/admin/backup", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"].startswith('attachment; filename="snapshot-')
+    assert gzip.decompress(response.content).startswith(b"SQLite format 3\x00")
+
+
+@pytest.mark.asyncio
+async def test_jobs_require_admin(client, auth_headers, monkeypatch):
+    response = await client.post("/jobs/", json={"type": "prune_expired_tokens"}, headers=auth_headers)
+    assert response.status_code == 403
+    assert (await client.post("/jobs/1/cancel", headers=auth_headers)).status_code == 403
+
+    monkeypatch.setattr("app.core.auth.ADMIN_USERNAMES", frozenset({"tester"}))
+    response = await client.post("/jobs/", json={"type": "prune_expired_tokens"}, headers=auth_headers)
+    assert response.status_code == 202
+
+
+@pytest.mark.asyncio
+async def test_overloaded_server_sheds_with_retry_after(client, monkeypatch):
+    from app.core.concurrency import CRITICAL, LOW, NORMAL, AdaptiveLimiter
+
+    saturated = AdaptiveLimiter(initial_limit=1, min_limit=1, queue_timeout_ms={CRITICAL: 10, NORMAL: 10, LOW: 10})
+    await saturated.acquire(NORMAL)
+    monkeypatch.setattr("app.core.concurrency.limiter", saturated)
+
+    response = await client.get("/sync")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert saturated.stats()["shed"]["low"] == 1
+
+
+@pytest.mark.asyncio
+async def test_metrics(client, recipe_factory):
+    recipe = await recipe_factory()
+
+    await client.get(f"/recipes/{recipe.id}")
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.json()["singleflight"]["calls"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_login_is_rate_limited_per_username_before_bcrypt(client, user_factory, monkeypatch):
+    await user_factory(username="victim", email="victim@test.com")
+    verified = []
+    monkeypatch.setattr("app.core.routers.auth.verify_password", lambda *args: verified.append(1) or False)
+
+    for _ in range(5):
+        response = await client.post("/auth/login", data={"username": "victim", "password": "guess"})
+        assert response.status_code == 401
+
+    response = await client.post("/auth/login", data={"username": "Victim", "password": "guess"})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert response.headers["ratelimit-limit"] == "5"
+    assert response.headers["ratelimit-remaining"] == "0"
+    assert len(verified) == 5
+
+
 @pytest.mark.asyncio
 async def test_login_success(client, user_factory):
     password = "password"
@@ -170,6 +315,63 @@ async def test_login_success(client, user_factory):
     })
     assert response.status_code == 200
     assert "access_token" in response.json()
+    assert "refresh_token" in response.json()
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation(client, user_factory):
+    password = "password"
+    await user_factory(username="refreshuser", email="refresh@test.com", password=get_password_hash(password))
+
+    login_response = await client.post("/auth/login", data={
+        "username": "refreshuser",
+        "password": password
+    })
+    refresh_token = login_response.json()["refresh_token"]
+
+    response = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+    assert response.json()["refresh_token"] != refresh_token
+
+    # старий refresh токен одноразовий
+    reuse_response = await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+    assert reuse_response.status_code == 401
+
+    # новий access токен працює
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    category = await client.post("/categories/", json={"name": "Refreshed"})
+    delete_response = await client.delete(f"/categories/{category.json()['id']}", headers=headers)
+    assert delete_response.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_invalid(client):
+    response = await client.post("/auth/refresh", json={"refresh_token": "garbage"})
+    assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_logout_revokes_tokens(client, user_factory):
+    password = "password"
+    await user_factory(username="logoutuser", email="logout@test.com", password=get_password_hash(password))
+
+    login_response = await client.post("/auth/login", data={
+        "username": "logoutuser",
+        "password": password
+    })
+    tokens = login_response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = await client.post("/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == 204
+
+    # відкликаний access токен більше не приймається
+    user_response = await client.delete("/users/999", headers=headers)
+    assert user_response.status_code == 401
+
+    refresh_response = await client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refresh_response.status_code == 401
 
 
 # 2. ТЕСТИ USERS (/users)
@@ -296,6 +498,89 @@ async def test_crud_ingredient(client, auth_headers):
     assert delete_response.status_code == 204
 
 
+@pytest.mark.asyncio
+async def test_autocomplete_ingredients(client, auth_headers):
+    for name in ["Tomato", "Tomatillo", "Potato"]:
+        await client.post("/ingredients/", json={"name": name, "calories_per_100g": 20})
+
+    response = await client.get("/autocomplete", params={"q": "tom", "kind": "ingredient"})
+    assert response.status_code == 200
+    assert {item["name"] for item in response.json()} == {"Tomato", "Tomatillo"}
+
+    # помилка в запиті - нечіткий пошук за триграмами
+    fuzzy_response = await client.get("/autocomplete", params={"q": "potatto", "kind": "ingredient", "limit": 1})
+    assert fuzzy_response.json()[0]["name"] == "Potato"
+
+    ingredient_id = response.json()[0]["id"]
+    await client.delete(f"/ingredients/{ingredient_id}", headers=auth_headers)
+    after_delete = await client.get("/autocomplete", params={"q": "tom", "kind": "ingredient"})
+    assert ingredient_id not in [item["id"] for item in after_delete.json()]
+
+
+@pytest.mark.asyncio
+async def test_ingredient_pairs(
+        client, auth_headers, category_factory, recipe_factory, ingredient_factory, recipe_ingredient_factory, monkeypatch
+):
+    from app.core.cooccurrence import ingredient_pairs
+    from app.core.jobs import refresh_ingredient_pairs
+
+    category = await category_factory()
+    flour = await ingredient_factory(name="Flour")
+    egg = await ingredient_factory(name="Egg")
+    sugar = await ingredient_factory(name="Sugar")
+    recipes = [await recipe_factory(category_id=category.id) for _ in range(3)]
+    for recipe in recipes[:2]:
+        await recipe_ingredient_factory(recipe_id=recipe.id, ingredient_id=flour.id)
+        await recipe_ingredient_factory(recipe_id=recipe.id, ingredient_id=egg.id)
+    await recipe_ingredient_factory(recipe_id=recipes[2].id, ingredient_id=sugar.id)
+
+    # першу модель будує фонова задача, а запит не чекає на неї
+    building = await client.get(f"/ingredients/{flour.id}/pairs")
+    assert building.status_code == 503
+    assert building.headers["retry-after"]
+    assert (await client.get(f"/categories/{category.id}/top_pairs")).status_code == 503
+    await wait_for_rebuild("rebuild_ingredient_pairs")
+
+    response = await client.get(f"/ingredients/{flour.id}/pairs")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"ingredient": {"id": egg.id, "name": "Egg"}, "recipes": 2, "lift": 1.5, "pmi": 0.585}
+    ]
+    assert (await client.get(f"/ingredients/{sugar.id}/pairs")).json() == []
+    assert (await client.get("/ingredients/999999/pairs")).status_code == 404
+
+    top_pairs = await client.get(f"/categories/{category.id}/top_pairs")
+    assert top_pairs.status_code == 200
+    assert [(pair["first"]["name"], pair["second"]["name"]) for pair in top_pairs.json()] == [("Flour", "Egg")]
+    assert (await client.get("/categories/999999/top_pairs")).status_code == 404
+
+    # зміна каталогу ставить перебудову; поки вона триває, віддається попередня модель
+    release = asyncio.Event()
+    load = ingredient_pairs.load
+
+    async def held_load(session):
+        await release.wait()
+        return await load(session)
+
+    monkeypatch.setattr(ingredient_pairs, "load", held_load)
+    await client.post(
+        "/recipe_ingredients/",
+        json={"recipe_id": recipes[1].id, "ingredient_id": sugar.id, "amount": "1 g"},
+        headers=auth_headers,
+    )
+    assert ingredient_pairs.stale and ingredient_pairs.refreshing
+    stale = await client.get(f"/ingredients/{sugar.id}/pairs")
+    assert stale.json() == []
+
+    # ще один запит не ставить другу перебудову в чергу
+    await client.get(f"/ingredients/{sugar.id}/pairs")
+    assert await refresh_ingredient_pairs() is None
+    release.set()
+    await wait_for_rebuild("rebuild_ingredient_pairs")
+    assert not ingredient_pairs.refreshing
+    assert not ingredient_pairs.stale
+
+
 # 5. ТЕСТИ RECIPES (/recipes)
 
 @pytest.mark.asyncio
@@ -314,6 +599,139 @@ async def test_create_recipe(client, auth_headers, category_factory):
     assert response.json()["name"] == "Test Recipe"
 
 
+@pytest.mark.asyncio
+async def test_create_recipe_with_idempotency_key_runs_once(client, auth_headers, category_factory):
+    category = await category_factory()
+    payload = {
+        "category_id": category.id,
+        "name": "Retried Recipe",
+        "description": "Desc",
+        "instructions": "Do it",
+        "cooking_time_minutes": 10
+    }
+    headers = {**auth_headers, "Idempotency-Key": "create-retried-recipe"}
+
+    first, duplicate = await asyncio.gather(
+        client.post("/recipes/", json=payload, headers=headers),
+        client.post("/recipes/", json=payload, headers=headers),
+    )
+    retry = await client.post("/recipes/", json=payload, headers=headers)
+
+    assert first.status_code == duplicate.status_code == retry.status_code == 201
+    assert first.json()["id"] == duplicate.json()["id"] == retry.json()["id"]
+    assert retry.headers["idempotent-replayed"] == "true"
+    recipes = await client.get("/recipes/")
+    assert [recipe["name"] for recipe in recipes.json()].count("Retried Recipe") == 1
+
+    changed = await client.post("/recipes/", json={**payload, "name": "Other"}, headers=headers)
+    assert changed.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_survives_token_refresh_and_abandoned_claims(client, auth_headers, category_factory):
+    import hashlib
+    import time
+
+    from app.core.idempotency import idempotency, scoped_key
+    from app.core.models.idempotency_key import IdempotencyKeyModel
+    from app.core.settings.db import db
+
+    category = await category_factory()
+    payload = {"category_id": category.id, "name": "Refreshed", "description": "D", "instructions": "I"}
+    first = await client.post("/recipes/", json=payload, headers={**auth_headers, "Idempotency-Key": "refresh"})
+
+    login = await client.post("/auth/login", data={"username": "tester", "password": "password"})
+    new_headers = {"Authorization": f"Bearer {login.json()['access_token']}", "Idempotency-Key": "refresh"}
+    retry = await client.post("/recipes/", json=payload, headers=new_headers)
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json()["id"] == first.json()["id"]
+
+    # запис, який лишив упалий воркер, не блокує ключ до кінця TTL
+    body = json.dumps({**payload, "name": "Abandoned"}).encode()
+    scope = {
+        "method": "POST", "path": "/recipes/",
+        "headers": [(b"authorization", new_headers["Authorization"].encode()), (b"accept", b"*/*")],
+    }
+    async with db.session_maker() as session:
+        session.add(IdempotencyKeyModel(
+            key=scoped_key(scope, b"abandoned"), request_hash=hashlib.sha256(body).hexdigest(),
+            expires_at=time.time() + 3600, claimed_at=time.time() - idempotency.lease - 1,
+        ))
+        await session.commit()
+    taken_over = await client.post(
+        "/recipes/", content=body,
+        headers={**new_headers, "Idempotency-Key": "abandoned", "Content-Type": "application/json", "Accept": "*/*"},
+    )
+    assert taken_over.status_code == 201
+    assert "idempotent-replayed" not in taken_over.headers
+
+
+@pytest.mark.asyncio
+async def test_recipes_round_trip_as_msgpack(client, auth_headers, recipe_factory):
+    msgpack = pytest.importorskip("msgpack")
+    await recipe_factory()
+
+    as_json = await client.get("/recipes/")
+    as_msgpack = await client.get("/recipes/", headers={"Accept": "application/msgpack"})
+    assert as_msgpack.headers["content-type"] == "application/msgpack"
+    assert as_msgpack.headers["vary"] == "Accept, Accept-Encoding"
+    assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+
+    created = await client.post(
+        "/categories/",
+        content=msgpack.packb({"name": "packed"}),
+        headers={**auth_headers, "Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+    )
+    assert created.status_code == 201
+    assert msgpack.unpackb(created.content)["name"] == "packed"
+
+
+@pytest.mark.asyncio
+async def test_errors_follow_the_negotiated_format(client, auth_headers):
+    msgpack = pytest.importorskip("msgpack")
+    accept = {"Accept": "application/msgpack"}
+    missing = await client.get("/recipes/999999", headers=accept)
+    assert missing.status_code == 404
+    assert missing.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(missing.content) == {"detail": "Recipe not found"}
+
+    invalid = await client.post(
+        "/categories/", content=msgpack.packb({}),
+        headers={**auth_headers, **accept, "Content-Type": "application/msgpack"},
+    )
+    assert invalid.status_code == 422
+    assert msgpack.unpackb(invalid.content)["detail"][0]["loc"] == ["body", "name"]
+
+    # без Accept помилки лишаються JSON
+    assert (await client.get("/recipes/999999")).json() == {"detail": "Recipe not found"}
+
+
+@pytest.mark.asyncio
+async def test_msgpack_is_refused_without_the_codec(client, auth_headers, monkeypatch):
+    # msgpack - необов'язковий кодек, як brotli і zstandard: без нього API лишається на JSON
+    monkeypatch.setattr("app.core.negotiation.msgpack", None)
+    listed = await client.get("/recipes/", headers={"Accept": "application/msgpack"})
+    assert listed.headers["content-type"] == "application/json"
+
+    refused = await client.post(
+        "/categories/", content=b"\x81", headers={**auth_headers, "Content-Type": "application/msgpack"}
+    )
+    assert refused.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_recipe_list_is_compressed_and_revalidated(client, recipe_factory):
+    for _ in range(10):
+        await recipe_factory()
+
+    response = await client.get("/recipes/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 10
+
+    revalidated = await client.get("/recipes/", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
 @pytest.mark.asyncio
 async def test_update_recipe(client, recipe_factory):
     recipe = await recipe_factory()
@@ -410,4 +828,151 @@ async def test_saved_recipes_flow(client, auth_headers, recipe_factory):
 
     # 4. Delete
     delete_response = await client.delete(f"/saved_recipes/{saved_id}", headers=auth_headers)
-    assert delete_response.status_code == 204
\ No newline at end of file
+    assert delete_response.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_unsave_recipe(client, auth_headers, recipe_factory):
+    recipe = await recipe_factory()
+
+    await client.post("/saved_recipes/", json={"recipe_id": recipe.id}, headers=auth_headers)
+    response = await client.delete(f"/saved_recipes/recipe/{recipe.id}", headers=auth_headers)
+    assert response.status_code == 204
+
+    missing_response = await client.delete(f"/saved_recipes/recipe/{recipe.id}", headers=auth_headers)
+    assert missing_response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_buffered_save_is_accepted(client, auth_headers, recipe_factory, monkeypatch):
+    from app.core.routers import saved_recipe as saved_recipe_router
+    from app.core.save_buffer import SaveBuffer
+
+    buffer = SaveBuffer(enabled=True)
+    monkeypatch.setattr(saved_recipe_router, "save_buffer", buffer)
+    recipe = await recipe_factory()
+
+    response = await client.post("/saved_recipes/", json={"recipe_id": recipe.id}, headers=auth_headers)
+    assert response.status_code == 202
+    assert buffer.stats()["pending"] == 1
+
+
+# 8. ТЕСТИ SHOPPING LIST
+
+@pytest.mark.asyncio
+async def test_shopping_list(client, recipe_factory, ingredient_factory, recipe_ingredient_factory):
+    first = await recipe_factory()
+    second = await recipe_factory()
+    flour = await ingredient_factory(name="Flour", calories_per_100g=364)
+    await recipe_ingredient_factory(recipe_id=first.id, ingredient_id=flour.id, amount="200 g")
+    await recipe_ingredient_factory(recipe_id=second.id, ingredient_id=flour.id, amount="0.5 kg")
+
+    response = await client.post("/shopping_list", json={"recipes": [
+        {"recipe_id": first.id, "servings": 2},
+        {"recipe_id": second.id},
+    ]})
+    assert response.status_code == 200
+    assert response.json()["items"] == [
+        {"ingredient_id": flour.id, "name": "Flour", "amount": 900.0, "unit": "g"}
+    ]
+    assert response.json()["total_calories"] == 3276.0
+
+
+# 9. ТЕСТИ MEAL PLANS
+
+@pytest.mark.asyncio
+async def test_generate_meal_plan(client, auth_headers, recipe_factory, ingredient_factory, recipe_ingredient_factory):
+    rice = await ingredient_factory(name="Rice", calories_per_100g=100)
+    for grams in [300, 500, 700, 900]:
+        recipe = await recipe_factory(cooking_time_minutes=30)
+        await recipe_ingredient_factory(recipe_id=recipe.id, ingredient_id=rice.id, amount=f"{grams} g")
+
+    request = {"count": 2, "daily_calories": 1200, "max_cooking_time_minutes": 45}
+    building = await client.post("/meal_plans/generate", json=request, headers=auth_headers)
+    assert building.status_code == 503
+    assert building.headers["retry-after"]
+    await wait_for_rebuild("rebuild_meal_plan_features")
+
+    response = await client.post("/meal_plans/generate", json=request, headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+    assert response.json()["total_calories"] == 1200
+
+    too_many = await client.post(
+        "/meal_plans/generate",
+        json={"count": 5, "daily_calories": 1200},
+        headers=auth_headers,
+    )
+    assert too_many.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_meal_plan_matrix_is_rebuilt_in_the_background(
+        client, auth_headers, recipe_factory, ingredient_factory, recipe_ingredient_factory, monkeypatch
+):
+    from app.core.meal_plan import meal_plan_features
+
+    rice = await ingredient_factory(name="Rice", calories_per_100g=100)
+    recipes = [await recipe_factory(cooking_time_minutes=30) for _ in range(3)]
+    for recipe, grams in zip(recipes[:2], [400, 800]):
+        await recipe_ingredient_factory(recipe_id=recipe.id, ingredient_id=rice.id, amount=f"{grams} g")
+    await client.post("/meal_plans/generate", json={"count": 2, "daily_calories": 1200}, headers=auth_headers)
+    await wait_for_rebuild("rebuild_meal_plan_features")
+
+    # кожна перебудова спершу читає каталог; задача чекає, доки тест не перевірить застарілу матрицю
+    loads = []
+    release = asyncio.Event()
+    load = meal_plan_features.load
+
+    async def held_load(session):
+        loads.append(session)
+        await release.wait()
+        return await load(session)
+
+    monkeypatch.setattr(meal_plan_features, "load", held_load)
+    created = await client.post(
+        "/recipe_ingredients/",
+        json={"recipe_id": recipes[2].id, "ingredient_id": rice.id, "amount": "300 g"},
+        headers=auth_headers,
+    )
+    assert created.status_code == 201
+    # інвалідація вже поставила перебудову; до її кінця генерація бачить попередню матрицю
+    assert meal_plan_features.stale and meal_plan_features.refreshing
+    stale = await client.post("/meal_plans/generate", json={"count": 3, "daily_calories": 1500}, headers=auth_headers)
+    assert stale.status_code == 422
+
+    release.set()
+    await wait_for_rebuild("rebuild_meal_plan_features")
+    assert not meal_plan_features.stale and not meal_plan_features.refreshing
+    fresh = await client.post("/meal_plans/generate", json={"count": 3, "daily_calories": 1500}, headers=auth_headers)
+    assert fresh.status_code == 200
+    assert fresh.json()["total_calories"] == 1500
+    assert len(loads) == 1
+
+
+# 10. ТЕСТИ SYNC
+
+@pytest.mark.asyncio
+async def test_sync_returns_only_changes_since_token(client, auth_headers, category_factory, ingredient_factory):
+    category = await category_factory(name="Soups")
+    ingredient = await ingredient_factory(name="Salt")
+
+    first = await client.get("/sync")
+    assert first.status_code == 200
+    assert [change["entity"] for change in first.json()["changes"]] == ["categories", "ingredients"]
+    token = first.json()["next"]
+
+    await client.patch(f"/ingredients/{ingredient.id}", json={"calories_per_100g": 0}, headers=auth_headers)
+    await client.delete(f"/categories/{category.id}", headers=auth_headers)
+
+    second = await client.get("/sync", params={"since": token})
+    changes = second.json()["changes"]
+    assert [(change["entity"], change["op"]) for change in changes] == [
+        ("ingredients", "upsert"), ("categories", "delete")
+    ]
+    assert changes[0]["data"]["calories_per_100g"] == 0
+    assert changes[1]["data"] == {"id": category.id}
+
+    page = await client.get("/sync", params={"limit": 1})
+    assert len(page.json()["changes"]) == 1
+    assert page.json()["has_more"] is True
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app.core.health import CachedCheck, LoopLagMonitor
+
+
+@pytest.mark.asyncio
+async def test_cached_check_runs_once_per_ttl():
+    calls = []
+
+    async def check():
+        calls.append(1)
+        return True
+
+    cached = CachedCheck(check, ttl=60)
+    results = await asyncio.gather(*(cached.get() for _ in range(10)))
+
+    assert all(results)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_measured_and_its_stack_logged(caplog):
+    monitor = LoopLagMonitor(interval_ms=20, stack_threshold_ms=50)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.health"):
+        time.sleep(0.3)  # так само блокує цикл, як синхронний bcrypt
+        await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["max_ms"] >= 200
+    assert stats["stalls"] == 1
+    assert stats["histogram"]["le_500ms"] >= 1
+    assert "test_blocking_call_is_measured_and_its_stack_logged" in caplog.text
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.invalidation import InvalidationBus
+
+
+def make_bus(seen):
+    bus = InvalidationBus(poll_interval_ms=5)
+
+    @bus.handler("recipe")
+    def forget(payload):
+        seen.append(payload["id"])
+
+    return bus
+
+
+@pytest.mark.asyncio
+async def test_other_workers_apply_published_invalidations(db_engine):
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession)
+    seen_first, seen_second = [], []
+    first, second = make_bus(seen_first), make_bus(seen_second)
+    await first.start(session_maker)
+    await second.start(session_maker)
+
+    await first.publish("recipe", {"id": 7})
+    # локально застосовується одразу, у сусіда - після наступного опитування
+    assert seen_first == [7]
+    for _ in range(100):
+        if seen_second:
+            break
+        await asyncio.sleep(0.01)
+
+    await first.stop()
+    await second.stop()
+    assert seen_first == [7]
+    assert seen_second == [7]
+    assert second.stats() == {"enabled": False, "published": 0, "received": 1}
+
+
+@pytest.mark.asyncio
+async def test_disabled_bus_only_applies_locally(db_engine):
+    seen = []
+    bus = make_bus(seen)
+
+    await bus.publish("recipe", {"id": 3})
+
+    assert seen == [3]
+    assert not bus.enabled
@@ -0,0 +1,220 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.jobs import JobRunner
+from app.core.models.job import JobModel
+
+
+def make_runner(db_engine, concurrency=None):
+    runner = JobRunner(concurrency=concurrency or {})
+    runner.session_maker = async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession)
+    return runner
+
+
+async def load_job(db_session, job_id):
+    result = await db_session.execute(select(JobModel).where(JobModel.id == job_id).execution_options(populate_existing=True))
+    return result.scalars().one()
+
+
+@pytest.mark.asyncio
+async def test_job_reports_progress_and_result(db_engine, db_session):
+    runner = make_runner(db_engine)
+
+    @runner.handler("count")
+    async def count(ctx, params):
+        for step in range(params["steps"]):
+            await ctx.report((step + 1) / params["steps"])
+        return {"counted": params["steps"]}
+
+    job = await runner.submit("count", {"steps": 3})
+    await runner.wait(job.id)
+
+    stored = await load_job(db_session, job.id)
+    assert stored.status == "succeeded"
+    assert stored.progress == 1.0
+    assert json.loads(stored.result) == {"counted": 3}
+
+    with pytest.raises(ValueError):
+        await runner.submit("missing")
+
+
+@pytest.mark.asyncio
+async def test_concurrency_per_type_and_cancellation(db_engine, db_session):
+    runner = make_runner(db_engine, concurrency={"slow": 1})
+    release = asyncio.Event()
+    running = []
+
+    @runner.handler("slow")
+    async def slow(ctx, _params):
+        running.append(ctx.job_id)
+        await release.wait()
+
+    first = await runner.submit("slow")
+    second = await runner.submit("slow")
+    await asyncio.sleep(0.05)
+    # друга задача чекає на семафорі свого типу
+    assert running == [first.id]
+
+    assert await runner.cancel(second.id)
+    await runner.wait(second.id)
+    release.set()
+    await runner.wait(first.id)
+
+    assert (await load_job(db_session, first.id)).status == "succeeded"
+    assert (await load_job(db_session, second.id)).status == "cancelled"
+    assert running == [first.id]
+
+
+@pytest.mark.asyncio
+async def test_finished_callbacks_run_on_every_outcome(db_engine, db_session):
+    runner = make_runner(db_engine)
+    finished = []
+    runner.on_finished("flaky")(finished.append)
+
+    @runner.handler("flaky")
+    async def flaky(_ctx, params):
+        if params["fail"]:
+            raise ValueError("boom")
+
+    succeeded = await runner.submit("flaky", {"fail": False})
+    await runner.wait(succeeded.id)
+    failed = await runner.submit("flaky", {"fail": True})
+    await runner.wait(failed.id)
+    # скасування до першого кроку задачі: її finally так і не виконується
+    cancelled = await runner.submit("flaky", {"fail": False})
+    assert await runner.cancel(cancelled.id)
+    await runner.wait(cancelled.id)
+
+    assert finished == [succeeded.id, failed.id, cancelled.id]
+    assert (await load_job(db_session, failed.id)).status == "failed"
+
+
+@pytest.mark.asyncio
+async def test_stop_requeues_running_jobs(db_engine, db_session):
+    runner = make_runner(db_engine)
+
+    @runner.handler("endless")
+    async def endless(_ctx, _params):
+        await asyncio.Event().wait()
+
+    job = await runner.submit("endless")
+    await asyncio.sleep(0.05)
+    await runner.stop()
+
+    assert (await load_job(db_session, job.id)).status == "queued"
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_are_pruned_after_retention(db_session):
+    from datetime import timedelta
+
+    from app.core.jobs import prune_finished_jobs
+    from app.core.revocation import utcnow
+
+    old = utcnow() - timedelta(days=30)
+    db_session.add_all([
+        JobModel(type="count", status="succeeded", finished_at=old),
+        JobModel(type="count", status="failed", finished_at=utcnow()),
+        JobModel(type="count", status="queued"),
+    ])
+    await db_session.commit()
+
+    assert await prune_finished_jobs(db_session, retention=24 * 3600) == 1
+    statuses = (await db_session.execute(select(JobModel.status))).scalars().all()
+    assert sorted(statuses) == ["failed", "queued"]
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_reclaimed_by_any_worker(db_engine, db_session):
+    from datetime import timedelta
+
+    from app.core.revocation import utcnow
+
+    runner = make_runner(db_engine)
+    runner.local_types.add("rebuild")
+    ran = []
+
+    @runner.handler("count")
+    async def count(ctx, _params):
+        ran.append(ctx.job_id)
+
+    runner.handler("rebuild")(count)
+    stale = utcnow() - timedelta(seconds=runner.lease + 1)
+    # процес-власник впав посеред задачі, а його локальна перебудова лишилась у черзі
+    crashed = JobModel(type="count", status="running", started_at=stale, heartbeat_at=stale)
+    orphaned = JobModel(type="rebuild", status="queued", heartbeat_at=stale)
+    # задача живого сусіда
+    alive = JobModel(type="count", status="running", started_at=utcnow(), heartbeat_at=utcnow())
+    db_session.add_all([crashed, orphaned, alive])
+    await db_session.commit()
+
+    assert await runner.reclaim_expired() == [crashed.id]
+    await runner.wait(crashed.id)
+    # другий воркер бачить свіжий lease і задачу не чіпає
+    assert await make_runner(db_engine).reclaim_expired() == []
+
+    assert ran == [crashed.id]
+    assert (await load_job(db_session, crashed.id)).status == "succeeded"
+    assert (await load_job(db_session, orphaned.id)).status == "cancelled"
+    assert (await load_job(db_session, alive.id)).status == "running"
+
+
+@pytest.mark.asyncio
+async def test_running_jobs_keep_their_lease(db_engine, db_session):
+    runner = JobRunner(concurrency={}, heartbeat=0.05, lease=0.2)
+    session_maker = async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession)
+    await runner.start(session_maker)
+    release = asyncio.Event()
+
+    @runner.handler("slow")
+    async def slow(_ctx, _params):
+        await release.wait()
+
+    job = await runner.submit("slow")
+    await asyncio.sleep(0.3)
+    first = (await load_job(db_session, job.id)).heartbeat_at
+    await asyncio.sleep(0.3)
+    stored = await load_job(db_session, job.id)
+    # lease давно минув би, але heartbeat власника його продовжує
+    assert stored.status == "running"
+    assert stored.heartbeat_at > first
+
+    release.set()
+    await runner.wait(job.id)
+    await runner.stop()
+    assert (await load_job(db_session, job.id)).status == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_periodic_job_waits_for_the_pending_one(db_engine, db_session, monkeypatch):
+    from app.core import jobs as jobs_module
+
+    runner = make_runner(db_engine)
+    release = asyncio.Event()
+
+    @runner.handler("prune")
+    async def prune(_ctx, _params):
+        await release.wait()
+
+    monkeypatch.setattr(jobs_module, "jobs", runner)
+    loop = asyncio.create_task(jobs_module.submit_forever("prune", 0.02))
+    await asyncio.sleep(0.2)
+    # поки попередня задача не завершилась, нова в чергу не стає
+    statuses = (await db_session.execute(select(JobModel.status).where(JobModel.type == "prune"))).scalars().all()
+    assert statuses == ["running"]
+
+    release.set()
+    await asyncio.sleep(0.2)
+    loop.cancel()
+    await asyncio.gather(loop, return_exceptions=True)
+    for task in list(runner._tasks.values()):
+        await task
+    statuses = (await db_session.execute(
+        select(JobModel.status).where(JobModel.type == "prune").execution_options(populate_existing=True)
+    )).scalars().all()
+    # скасований цикл міг лишити останню задачу в черзі - її підбере lease
+    assert statuses.count("succeeded") > 1
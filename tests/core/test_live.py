@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.live import LiveBroker, Subscriber
+from app.core.models.category import CategoryModel
+from app.core.models.recipe import RecipeModel
+from app.core.models.saved_recipe import SavedRecipeModel
+
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_and_routes_by_topic(db_engine, db_session):
+    db_session.add(CategoryModel(id=1, name="Soups"))
+    db_session.add(RecipeModel(id=10, author_id=1, category_id=1, name="Borscht"))
+    db_session.add(SavedRecipeModel(user_id=1, recipe_id=10))
+    db_session.add(SavedRecipeModel(user_id=2, recipe_id=10))
+    await db_session.commit()
+
+    broker = LiveBroker()
+    broker.session_maker = async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession)
+    by_recipe, by_category, unrelated = broker.connect(), broker.connect(), broker.connect()
+    broker.subscribe(by_recipe, [("recipe", 10)])
+    broker.subscribe(by_category, [("category", 1)])
+    broker.subscribe(unrelated, [("recipe", 11)])
+
+    # кілька записів між flush дають одне оновлення
+    broker.notify(10)
+    broker.notify(10)
+    broker.notify(10)
+    await broker.flush()
+
+    for subscriber in (by_recipe, by_category):
+        updates = await subscriber.get(timeout=0)
+        assert [(update["recipe_id"], update["save_count"]) for update in updates] == [(10, 2)]
+        assert updates[0]["recipe"]["name"] == "Borscht"
+    assert await unrelated.get(timeout=0) == []
+
+    broker.notify(11, 1)
+    await broker.flush()
+    deleted = await by_category.get(timeout=0)
+    assert deleted == [{"recipe_id": 11, "deleted": True, "recipe": None, "save_count": 0}]
+
+    broker.disconnect(by_recipe)
+    assert await by_recipe.get() is None
+    assert broker.stats()["connections"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_keeps_latest_state_and_overflows():
+    subscriber = Subscriber(max_pending=2)
+    subscriber.offer({"recipe_id": 1, "save_count": 1})
+    subscriber.offer({"recipe_id": 1, "save_count": 5})
+    assert await subscriber.get() == [{"recipe_id": 1, "save_count": 5}]
+
+    for recipe_id in range(3):
+        subscriber.offer({"recipe_id": recipe_id, "save_count": 0})
+    assert subscriber.overflowed
+    assert await subscriber.get() is None
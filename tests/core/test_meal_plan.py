@@ -0,0 +1,49 @@
+import itertools
+
+import numpy as np
+
+from app.core.meal_plan import RecipeFeatures, solve_meal_plan
+
+
+def make_features():
+    recipes = [(1, 10, 20), (2, 10, 90), (3, 20, 15), (4, 20, None), (5, 30, 30)]
+    links = [
+        (1, "200 g", 100),   # 200 ккал
+        (2, "1 kg", 50),     # 500 ккал
+        (3, "300 g", 200),   # 600 ккал
+        (4, "100 g", 300),   # 300 ккал
+        (5, "2 шт.", 100),   # не в грамах - 0 ккал
+    ]
+    return RecipeFeatures.build(recipes, links)
+
+
+def test_features_matrix():
+    features = make_features()
+
+    assert features.calories.tolist() == [200, 500, 600, 300, 0]
+    assert features.categories.sum(axis=0).tolist() == [2, 2, 1]
+
+
+def test_unparseable_amount_does_not_break_the_build():
+    features = RecipeFeatures.build([(1, 10, 20)], [(1, "1/0 g", 100), (1, "1 1/2 g", 100)])
+
+    assert features.calories.tolist() == [1.5]
+
+
+def test_candidates_filtering():
+    features = make_features()
+
+    assert features.ids[features.candidates()].tolist() == [1, 2, 3, 4]
+    assert features.ids[features.candidates(max_cooking_time=30)].tolist() == [1, 3]
+    assert features.ids[features.candidates(category_ids=[20])].tolist() == [3, 4]
+    assert features.ids[features.candidates(exclude_ids=[1, 3])].tolist() == [2, 4]
+
+
+def test_solver_hits_target():
+    calories = np.asarray([150, 320, 410, 505, 610, 720, 800, 950], dtype=np.float64)
+
+    chosen = solve_meal_plan(calories, count=3, target=1500)
+
+    best = min(abs(sum(combination) - 1500) for combination in itertools.combinations(calories, 3))
+    assert len(set(chosen)) == 3
+    assert abs(calories[chosen].sum() - 1500) == best
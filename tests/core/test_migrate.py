@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.models.category import CategoryModel
+from app.core.sync import read_changes
+from app.migrate import SCHEMA_VERSION, check_schema_version, check_sync_schema, migrate
+
+
+@pytest.mark.asyncio
+async def test_migrate_is_idempotent_and_checked_at_startup(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'app.db'}"
+    engine = create_async_engine(url)
+
+    async with engine.connect() as connection:
+        with pytest.raises(RuntimeError, match="python -m app.migrate"):
+            await connection.run_sync(check_schema_version)
+
+    assert await migrate(url) == list(range(1, SCHEMA_VERSION + 1))
+    assert await migrate(url) == []
+
+    async with engine.connect() as connection:
+        await connection.run_sync(check_schema_version)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_migrate_upgrades_database_created_before_versioning(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_async_engine(url)
+    async with engine.begin() as connection:
+        await connection.execute(text("CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR(30) NOT NULL UNIQUE)"))
+        await connection.execute(text("INSERT INTO categories (id, name) VALUES (1, 'Soups')"))
+
+    await migrate(url)
+
+    async with engine.connect() as connection:
+        columns = await connection.run_sync(
+            lambda sync_connection: {column["name"] for column in inspect(sync_connection).get_columns("categories")}
+        )
+        change_seq = (await connection.execute(text("SELECT change_seq FROM categories"))).scalar()
+    await engine.dispose()
+    assert {"updated_at", "change_seq"} <= columns
+    assert change_seq == 1
+
+
+@pytest.mark.asyncio
+async def test_rows_from_before_sync_columns_are_visible_to_full_sync(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'baseline.db'}"
+    engine = create_async_engine(url)
+    async with engine.begin() as connection:
+        await connection.execute(text("CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR(30) NOT NULL UNIQUE)"))
+        await connection.execute(text("INSERT INTO categories (id, name) VALUES (1, 'Soups'), (2, 'Salads')"))
+        await connection.execute(text(
+            "CREATE TABLE ingredients (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, calories_per_100g INTEGER)"
+        ))
+        await connection.execute(text("INSERT INTO ingredients (id, name) VALUES (1, 'Salt')"))
+
+    await migrate(url)
+
+    async with AsyncSession(engine) as session:
+        changes, has_more = await read_changes(session, 0, 100)
+        session.add(CategoryModel(name="Desserts"))
+        await session.commit()
+        newer, _has_more = await read_changes(session, changes[-1]["seq"], 100)
+    await engine.dispose()
+    assert not has_more
+    assert [(change["entity"], change["data"]["id"]) for change in changes] == [
+        ("categories", 1), ("categories", 2), ("ingredients", 1)
+    ]
+    assert [change["seq"] for change in changes] == [1, 2, 3]
+    # нові зміни продовжують послідовність, а не повторюють номери
+    assert [(change["seq"], change["data"]["name"]) for change in newer] == [(4, "Desserts")]
+
+
+@pytest.mark.asyncio
+async def test_migrations_build_the_schema_the_models_expect(tmp_path):
+    from app.core.models.base import BaseModel
+
+    def describe(sync_connection):
+        inspector = inspect(sync_connection)
+        return {
+            table_name: (
+                sorted(column["name"] for column in inspector.get_columns(table_name)),
+                sorted(index["name"] for index in inspector.get_indexes(table_name)),
+            )
+            for table_name in inspector.get_table_names()
+            if table_name != "sqlite_sequence"
+        }
+
+    url = f"sqlite+aiosqlite:///{tmp_path / 'migrated.db'}"
+    await migrate(url)
+    migrated_engine = create_async_engine(url)
+    models_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'models.db'}")
+    async with models_engine.begin() as connection:
+        await connection.run_sync(BaseModel.metadata.create_all)
+    async with migrated_engine.connect() as migrated, models_engine.connect() as models:
+        assert await migrated.run_sync(describe) == await models.run_sync(describe)
+    await migrated_engine.dispose()
+    await models_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_startup_refuses_catalog_without_sync_columns(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'stamped.db'}"
+    await migrate(url)
+    engine = create_async_engine(url)
+    async with engine.connect() as connection:
+        await connection.run_sync(check_sync_schema)
+    async with engine.begin() as connection:
+        # версія проставлена, але каталог створено ще без колонок /sync
+        await connection.execute(text("DROP INDEX ix_categories_change_seq"))
+        await connection.execute(text("ALTER TABLE categories DROP COLUMN change_seq"))
+    async with engine.connect() as connection:
+        await connection.run_sync(check_schema_version)
+        with pytest.raises(RuntimeError, match="categories.change_seq"):
+            await connection.run_sync(check_sync_schema)
+    await engine.dispose()
@@ -0,0 +1,18 @@
+from app.core import negotiation
+from app.core.negotiation import JSON, MSGPACK, preferred_format
+
+
+def test_json_stays_default_without_msgpack(monkeypatch):
+    monkeypatch.setattr(negotiation, "msgpack", None)
+    assert preferred_format("application/msgpack") == JSON
+
+
+def test_accept_header_negotiation(monkeypatch):
+    # вибір формату залежить лише від наявності кодека, не від його версії
+    monkeypatch.setattr(negotiation, "msgpack", object())
+    assert preferred_format("") == JSON
+    assert preferred_format("*/*") == JSON
+    assert preferred_format("application/msgpack") == MSGPACK
+    assert preferred_format("application/json;q=0.5, application/msgpack") == MSGPACK
+    assert preferred_format("application/json, application/msgpack;q=0.5") == JSON
+    assert preferred_format("application/msgpack;q=0") == JSON
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.profiling import RequestProfiler
+
+
+def make_scope(headers=()):
+    return {"type": "http", "method": "GET", "path": "/recipes/1", "headers": list(headers)}
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+@pytest.mark.asyncio
+async def test_profile_is_saved_with_sql_counts_and_ring_is_bounded(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}")
+    profiler = RequestProfiler(token="secret", directory=str(tmp_path / "profiles"), max_files=2)
+    profiler.install(engine)
+    sent = []
+
+    async def app(scope, receive, send):
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            await connection.execute(text("SELECT 2"))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = make_scope([(b"x-profile", b"secret")])
+    assert profiler.should_profile(scope)
+    for _ in range(3):
+        await profiler.run(app, scope, receive, send)
+    await engine.dispose()
+
+    profiles = profiler.profiles()
+    assert len(profiles) == 2
+    assert profiles[0]["status"] == 200
+    assert profiles[0]["sql_count"] == 2
+    assert profiler.artifact(profiles[0]["id"]).is_file()
+    assert (b"x-profile-id", profiles[0]["id"].encode()) in sent[-2]["headers"]
+    assert len(list((tmp_path / "profiles").iterdir())) == 4
+
+
+def test_only_authorized_requests_are_profiled(tmp_path):
+    profiler = RequestProfiler(token="secret", sample_rate=0, directory=str(tmp_path))
+
+    assert not profiler.should_profile(make_scope())
+    assert not profiler.should_profile(make_scope([(b"x-profile", b"guess")]))
+    assert profiler.artifact("../../etc/passwd") is None
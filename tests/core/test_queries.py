@@ -0,0 +1,26 @@
+import pytest
+
+from app.core import queries
+from app.core.models.category import CategoryModel
+from app.core.queries import CompiledCacheStats
+
+
+@pytest.mark.asyncio
+async def test_prebuilt_statement_is_compiled_once(db_engine, db_session):
+    category = CategoryModel(name="soups")
+    db_session.add(category)
+    await db_session.commit()
+    cache = CompiledCacheStats()
+    cache.install(db_engine)
+    try:
+        for _ in range(3):
+            result = await db_session.execute(queries.CATEGORY_BY_ID, {"id": category.id})
+            assert result.scalars().first().name == "soups"
+        missing = await db_session.execute(queries.CATEGORY_BY_ID, {"id": category.id + 1000})
+        assert missing.scalars().first() is None
+    finally:
+        cache.uninstall()
+
+    stats = cache.stats()
+    assert stats["misses"] <= 1
+    assert stats["hits"] >= 3
@@ -0,0 +1,38 @@
+import pytest
+
+from app.core.rate_limit import MemoryBucketStore, SQLiteBucketStore, take_token
+
+
+def test_bucket_refills_over_time():
+    bucket, decision = take_token(None, now=0, capacity=2, period=10)
+    assert decision.allowed and decision.remaining == 1
+    bucket, decision = take_token(bucket, now=0, capacity=2, period=10)
+    assert decision.allowed and decision.remaining == 0
+    bucket, decision = take_token(bucket, now=1, capacity=2, period=10)
+    assert not decision.allowed
+    assert decision.retry_after == 4
+
+    _bucket, decision = take_token(bucket, now=6, capacity=2, period=10)
+    assert decision.allowed
+
+
+@pytest.mark.asyncio
+async def test_full_buckets_are_evicted():
+    store = MemoryBucketStore()
+    await store.take("a", 5, 0.001)
+    await store.take("b", 5, 3600)
+
+    store.sweep(now=float("inf"))
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+
+    assert (await first.take("login:user:bob", 2, 60)).allowed
+    assert (await second.take("login:user:bob", 2, 60)).allowed
+    assert not (await first.take("login:user:bob", 2, 60)).allowed
+    first.close()
+    second.close()
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from app.core.revocation import BloomFilter, RevocationList
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(1000))
+    assert false_positives < 50
+
+
+def test_revocation_list_prune():
+    now = datetime(2026, 1, 1)
+    revoked = RevocationList(capacity=10)
+    revoked.add("expired", now - timedelta(minutes=1))
+    revoked.add("active", now + timedelta(minutes=1))
+
+    assert revoked.is_revoked("expired")
+    assert not revoked.is_revoked("unknown")
+
+    assert revoked.prune(now) == 1
+    assert not revoked.is_revoked("expired")
+    assert revoked.is_revoked("active")
+
+
+def test_revocation_list_grows_past_capacity():
+    revoked = RevocationList(capacity=4)
+    expires_at = datetime(2030, 1, 1)
+    for i in range(20):
+        revoked.add(f"jti-{i}", expires_at)
+
+    assert len(revoked) == 20
+    assert all(revoked.is_revoked(f"jti-{i}") for i in range(20))
+
+
+def test_revocation_list_drops_expired_before_growing():
+    now = datetime.utcnow()
+    revoked = RevocationList(capacity=4)
+    for i in range(4):
+        revoked.add(f"expired-{i}", now - timedelta(minutes=1))
+    revoked.add("active", now + timedelta(minutes=1))
+
+    # прострочені звільняють місце замість подвоєння фільтра
+    assert len(revoked) == 1
+    assert revoked._filter.capacity == 4
+    assert revoked.is_revoked("active")
@@ -0,0 +1,160 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.models.saved_recipe import SavedRecipeModel
+from app.core.save_buffer import SaveBuffer, collapse_events, recipe_deltas
+
+
+def test_collapse_events_keeps_last_action():
+    saves, unsaves = collapse_events([
+        ("save", 1, 1),
+        ("save", 1, 1),
+        ("save", 1, 2),
+        ("unsave", 1, 2),
+        ("unsave", 2, 1),
+        ("save", 2, 1),
+    ])
+
+    assert sorted(saves) == [(1, 1), (2, 1)]
+    assert unsaves == [(1, 2)]
+
+
+def test_recipe_deltas_count_net_saves():
+    assert recipe_deltas([
+        ("save", 1, 1),
+        ("save", 1, 1),
+        ("save", 2, 1),
+        ("unsave", 3, 2),
+        ("save", 4, 3),
+        ("unsave", 4, 3),
+        ("unsave", 5, 3),
+    ]) == {1: 2, 2: -1, 3: -2}
+
+
+@pytest.mark.asyncio
+async def test_flush_publishes_net_save_deltas(db_engine, monkeypatch):
+    published = []
+
+    async def publish(kind, payload):
+        published.append((kind, payload))
+
+    monkeypatch.setattr("app.core.save_buffer.invalidations.publish", publish)
+    buffer = SaveBuffer(enabled=True)
+    buffer.session_maker = async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession)
+    await buffer.save(1, 21)
+    await buffer.save(2, 21)
+    await buffer.unsave(1, 22)
+    await buffer.flush()
+
+    assert sorted(published, key=lambda item: item[1]["delta"]) == [
+        ("recipe_saves", {"recipe_ids": [22], "delta": -1}),
+        ("recipe_saves", {"recipe_ids": [21], "delta": 2}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_flush_is_set_wise(db_engine, db_session):
+    db_session.add(SavedRecipeModel(user_id=3, recipe_id=1))
+    db_session.add(SavedRecipeModel(user_id=4, recipe_id=1))
+    await db_session.commit()
+
+    buffer = SaveBuffer(enabled=True)
+    buffer.session_maker = async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession)
+    await buffer.save(1, 1)
+    await buffer.save(1, 1)
+    await buffer.save(3, 1)  # вже збережено - ON CONFLICT DO NOTHING
+    await buffer.unsave(4, 1)
+    await buffer.flush()
+
+    result = await db_session.execute(select(SavedRecipeModel.user_id, SavedRecipeModel.recipe_id))
+    assert sorted(result.all()) == [(1, 1), (3, 1)]
+    assert buffer.stats() == {"pending": 0, "flushes": 1, "flushed_events": 4, "fsyncs": 0, "dead_lettered": 0}
+
+
+@pytest.mark.asyncio
+async def test_unflushed_events_are_replayed_from_log(db_engine, db_session, tmp_path):
+    log_path = str(tmp_path / "saves.log")
+    crashed = SaveBuffer(enabled=True, log_path=log_path)
+    crashed._open_log()
+    await crashed.save(5, 7)
+    await crashed.save(6, 7)
+    os.close(crashed._log_fd)
+
+    buffer = SaveBuffer(enabled=True, log_path=log_path)
+    await buffer.start(async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession))
+    await buffer.stop()
+
+    result = await db_session.execute(select(SavedRecipeModel.user_id).where(SavedRecipeModel.recipe_id == 7))
+    assert sorted(result.scalars().all()) == [5, 6]
+    assert os.listdir(tmp_path) == ["saves.log"]
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_the_flush_in_progress(db_engine, db_session, monkeypatch):
+    from app.core.save_buffer import apply_events
+
+    entered, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_apply(session, events):
+        entered.set()
+        await release.wait()
+        await apply_events(session, events)
+
+    monkeypatch.setattr("app.core.save_buffer.apply_events", slow_apply)
+    # без журналу: події, забрані з черги поточним flush, існують лише в пам'яті
+    buffer = SaveBuffer(enabled=True, flush_interval_ms=1)
+    await buffer.start(async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession))
+    await buffer.save(11, 12)
+    await entered.wait()
+
+    stopping = asyncio.create_task(buffer.stop())
+    await asyncio.sleep(0.01)
+    release.set()
+    await stopping
+
+    result = await db_session.execute(select(SavedRecipeModel.user_id).where(SavedRecipeModel.recipe_id == 12))
+    assert result.scalars().all() == [11]
+
+
+@pytest.mark.asyncio
+async def test_bad_event_is_dead_lettered_and_the_rest_flushed(db_engine, db_session, tmp_path):
+    log_path = str(tmp_path / "saves.log")
+    buffer = SaveBuffer(enabled=True, log_path=log_path)
+    await buffer.start(async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession))
+    await buffer.save(8, 9)
+    await buffer.save(None, 9)  # NOT NULL user_id - не пройде ніколи
+    await buffer.save(10, 9)
+    await buffer.stop()
+
+    result = await db_session.execute(select(SavedRecipeModel.user_id).where(SavedRecipeModel.recipe_id == 9))
+    assert sorted(result.scalars().all()) == [8, 10]
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["dead_lettered"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["saves.log", "saves.log.dead"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_saves_share_one_fsync(db_engine, tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr("app.core.save_buffer.os.fsync", synced.append)
+    buffer = SaveBuffer(enabled=True, log_path=str(tmp_path / "saves.log"))
+    buffer._open_log()
+
+    await asyncio.gather(*(buffer.save(user_id, 1) for user_id in range(20)))
+    os.close(buffer._log_fd)
+
+    assert len(synced) < 20
+    assert buffer.stats()["fsyncs"] == len(synced)
+
+
+@pytest.mark.asyncio
+async def test_log_is_refused_with_several_workers(db_engine, tmp_path):
+    buffer = SaveBuffer(enabled=True, log_path=str(tmp_path / "saves.log"))
+
+    with pytest.raises(RuntimeError, match="WEB_CONCURRENCY"):
+        await buffer.start(async_sessionmaker(db_engine, class_=AsyncSession), workers=2)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,38 @@
+import pytest
+
+from app.core.shopping_list import aggregate_shopping_list, parse_amount
+
+
+@pytest.mark.parametrize("amount, expected", [
+    ("100 г", (100.0, "g")),
+    ("1.5 кг", (1500.0, "g")),
+    ("200 мл", (200.0, "ml")),
+    ("1 ст. л.", (1.0, "tbsp")),
+    ("2 шт.", (2.0, "pcs")),
+    ("1/2 cup", (0.5, "cup")),
+    ("1 1/2 cup", (1.5, "cup")),
+    ("1/0 cup", None),
+    ("1e5 g", None),
+    ("1 2 cup", None),
+    ("3", (3.0, "pcs")),
+    ("за смаком", None),
+])
+def test_parse_amount(amount, expected):
+    assert parse_amount(amount) == expected
+
+
+def test_aggregate_sums_per_ingredient_and_unit():
+    rows = [
+        (1, 10, "200 г", "Flour", 364),
+        (2, 10, "1 кг", "Flour", 364),
+        (2, 11, "2 шт.", "Egg", None),
+        (1, 11, "100 г", "Egg", None),
+        (1, 12, "за смаком", "Salt", 0),
+    ]
+
+    result = aggregate_shopping_list(rows, servings={1: 2, 2: 0.5})
+
+    items = {(item["name"], item["unit"]): item["amount"] for item in result["items"]}
+    assert items == {("Flour", "g"): 900.0, ("Egg", "pcs"): 1.0, ("Egg", "g"): 200.0}
+    assert result["unquantified"] == [{"ingredient_id": 12, "name": "Salt", "amounts": ["за смаком"]}]
+    assert result["total_calories"] == pytest.approx(900 * 3.64)
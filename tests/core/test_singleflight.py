@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(ttl=0)
+    executions = 0
+
+    async def load():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    results = await asyncio.gather(*(flight.do(("recipe", 1), load) for _ in range(50)))
+
+    assert executions == 1
+    assert all(result == {"id": 1} for result in results)
+    assert flight.stats()["coalesced"] == 49
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight(ttl=10)
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise LookupError("missing")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, LookupError) for result in results)
+
+    async def load():
+        return "found"
+
+    assert await flight.do("key", load) == "found"
+
+
+@pytest.mark.asyncio
+async def test_micro_ttl_and_forget():
+    flight = SingleFlight(ttl=10)
+    values = iter(["first", "second"])
+
+    async def load():
+        return next(values)
+
+    assert await flight.do("key", load) == "first"
+    assert await flight.do("key", load) == "first"
+    assert flight.stats()["cache_hits"] == 1
+
+    flight.forget("key")
+    assert await flight.do("key", load) == "second"
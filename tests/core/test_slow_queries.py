@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.slow_queries import SlowQueryLog, fingerprint, normalize_statement
+
+
+def test_fingerprint_ignores_literals_and_in_list_length():
+    assert normalize_statement("SELECT *\n  FROM recipes WHERE id = 5 AND name = 'x'") == \
+        "SELECT * FROM recipes WHERE id = ? AND name = ?"
+    assert fingerprint("SELECT * FROM recipes WHERE id IN (?, ?, ?)") == \
+        fingerprint("SELECT * FROM recipes WHERE id IN (?)")
+    assert fingerprint("SELECT * FROM recipes") != fingerprint("SELECT * FROM users")
+
+
+@pytest.mark.asyncio
+async def test_slow_query_is_grouped_explained_and_redacted(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}")
+    log = SlowQueryLog(threshold_ms=0)
+    async with engine.begin() as connection:
+        await connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, owner TEXT)"))
+    log.install(engine)
+
+    async with engine.connect() as connection:
+        for owner in ("alice@example.com", "bob@example.com"):
+            await connection.execute(text("SELECT id FROM items WHERE owner = :owner"), {"owner": owner})
+    await log.drain()
+    log.uninstall()
+    await engine.dispose()
+
+    [entry] = [entry for entry in log.entries() if "FROM items" in entry["statement"]]
+    assert entry["count"] == 2
+    assert entry["last_parameters"] == ["<str>"]
+    assert "alice" not in str(log.entries())
+    assert entry["full_scan"] is True
+    assert any(line.startswith("SCAN items") for line in entry["plan"])
+    assert entry["fingerprint"] in {full_scan["fingerprint"] for full_scan in log.entries(full_scans_only=True)}
+
+
+@pytest.mark.asyncio
+async def test_failed_statements_do_not_leak_timers(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'errors.db'}")
+    log = SlowQueryLog(threshold_ms=10_000)
+    log.install(engine)
+
+    async with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await connection.execute(text("SELECT * FROM missing_table"))
+        started = await connection.run_sync(lambda sync_connection: list(sync_connection.info["query_started"]))
+    log.uninstall()
+    await engine.dispose()
+
+    assert started == []
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, func
+
+from app.core.models.base import BaseModel
+from app.core.models.category import CategoryModel
+from app.core.settings.db import Database
+
+
+@pytest.mark.asyncio
+async def test_write_lane_group_commits_concurrent_units(tmp_path):
+    database = Database(url=f"sqlite+aiosqlite:///{tmp_path / 'lane.db'}", write_lane=True)
+    await database.connect()
+    async with database.engine.begin() as connection:
+        await connection.run_sync(BaseModel.metadata.create_all)
+
+    async def create(i):
+        async def unit(write_session):
+            if i == 3:
+                raise HTTPException(status_code=404, detail="Category not found")
+            # 5 конфліктує з 4 за унікальним name
+            new_category = CategoryModel(name=f"category{4 if i == 5 else i}")
+            write_session.add(new_category)
+            await write_session.flush()
+            await write_session.refresh(new_category)
+            return new_category
+
+        async with database.session_maker() as session:
+            return await database.write(session, unit)
+
+    try:
+        results = await asyncio.gather(*(create(i) for i in range(30)), return_exceptions=True)
+
+        assert isinstance(results[3], HTTPException)
+        assert isinstance(results[5], Exception)
+        assert all(isinstance(results[i], CategoryModel) for i in range(30) if i not in (3, 5))
+
+        stats = database.write_lane.stats()
+        assert stats["units"] == 28
+        assert stats["batches"] < 28
+
+        async with database.session_maker() as session:
+            count = await session.execute(select(func.count()).select_from(CategoryModel))
+            assert count.scalar() == 28
+    finally:
+        await database.disconnect()